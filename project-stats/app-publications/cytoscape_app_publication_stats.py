@@ -5,17 +5,21 @@ import sys
 import argparse
 import logging
 import re
-import pandas
-import requests
 import time
 import json
 import datetime
 import csv
-from tqdm import tqdm
 
-import matplotlib
-import matplotlib.pyplot as plt
-import matplotlib.ticker as mtick
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir))
+from statscommon import plotting
+from statscommon import profiling
+from statscommon.lazyimport import lazy_import
+
+# pandas and requests are imported the first time they are used
+# so --help starts quickly
+pandas = lazy_import('pandas')
+requests = lazy_import('requests')
 
 
 class Formatter(argparse.ArgumentDefaultsHelpFormatter,
@@ -76,12 +80,18 @@ def _parse_arguments(desc, args):
                         help='Output directory')
     parser.add_argument('--matplotlibgui', default='svg',
                         help='Library to use for plotting')
+    parser.add_argument('--no-plots', action='store_true',
+                        help='If set, only CSV and text files are written. '
+                             'No figures are made and matplotlib is never '
+                             'imported')
     parser.add_argument('--email', required=True,
                         help='A valid email address to send to the ncbi web api,'
                              'as required in the documentation.')
     parser.add_argument('--name', help='Used as tool name in figures and '
                                        'tables',
                         default='Cytoscape')
+    plotting.add_plot_arguments(parser)
+    profiling.add_profile_arguments(parser)
     parser.add_argument('--logconf', default=None,
                         help='Path to python logging configuration file in '
                              'this format: '
@@ -455,6 +465,8 @@ def merge_medline_files(outfile=None, batch_medlinefiles=None):
     :param batch_medlinefiles:
     :return:
     """
+    from tqdm import tqdm
+
     pmid_set = set()
     with open(outfile, 'w') as out_stream:
         for medlinefile in tqdm(batch_medlinefiles):
@@ -484,6 +496,8 @@ def plot_journal_summary(inputfile=None, tool_name='Cytoscape',
     :type outfile: str
     :return:
     """
+    import matplotlib.pyplot as plt
+
     df = pandas.read_csv(inputfile, delimiter=',', header=0)
     df.set_index('Journal', inplace=True)
     num_journals = len(df)
@@ -509,8 +523,7 @@ def plot_journal_summary(inputfile=None, tool_name='Cytoscape',
                                       transform=fig.transFigure,
                                       figure=fig, linewidth=2.0)])
     fig.set_tight_layout(True)
-    plt.savefig(outfile)
-    plt.close()
+    plotting.save_figure(fig, outfile)
 
 
 def plot_grant_summary(inputfile=None, tool_name='Cytoscape',
@@ -525,6 +538,8 @@ def plot_grant_summary(inputfile=None, tool_name='Cytoscape',
     :type outfile: str
     :return:
     """
+    import matplotlib.pyplot as plt
+
     df = pandas.read_csv(inputfile, delimiter=',', header=0)
     df.set_index('Grant', inplace=True)
     num_agencies = len(df)
@@ -551,8 +566,7 @@ def plot_grant_summary(inputfile=None, tool_name='Cytoscape',
                                       transform=fig.transFigure,
                                       figure=fig, linewidth=2.0)])
     fig.set_tight_layout(True)
-    plt.savefig(outfile)
-    plt.close()
+    plotting.save_figure(fig, outfile)
 
 
 def plot_publishdate_summary(inputfile=None, tool_name='Cytoscape',
@@ -567,6 +581,8 @@ def plot_publishdate_summary(inputfile=None, tool_name='Cytoscape',
     :type outfile: str
     :return:
     """
+    import matplotlib.pyplot as plt
+
     df = pandas.read_csv(inputfile, delimiter=',', header=0)
     df.set_index('PublishYear', inplace=True)
 
@@ -601,8 +617,7 @@ def plot_publishdate_summary(inputfile=None, tool_name='Cytoscape',
 
     # redo layout to not have lots of white space
     fig.set_tight_layout(True)
-    plt.savefig(outfile)
-    plt.close()
+    plotting.save_figure(fig, outfile)
 
 
 def main(args):
@@ -708,11 +723,14 @@ def main(args):
     # setup logging
     _setup_logging(theargs)
 
-    matplotlib.use(theargs.matplotlibgui)
+    from tqdm import tqdm
 
     toolargs = '&tool=cytoscapeAppPubStats&email=' + theargs.email
     urlprefix = 'https://eutils.ncbi.nlm.nih.gov/entrez/eutils/'
-    citation_dict = get_app_citations_from_file_as_dict(theargs.queryfile)
+    profiler = profiling.StageProfiler.from_args(theargs, outdir)
+    with profiler.stage('read_query_file') as stage:
+        citation_dict = get_app_citations_from_file_as_dict(theargs.queryfile)
+        stage['items'] = len(citation_dict)
 
     total_cite_count = 0
     unique_citations = set()
@@ -723,17 +741,21 @@ def main(args):
         LOGGER.debug('Examining: ' + key)
         medlinefile = os.path.join(data_outdir, key + '.medline')
         if not os.path.isfile(medlinefile):
-            download_medline_for_publications(urlprefix=urlprefix,
-                                              outfile=medlinefile,
-                                              toolargs=toolargs,
-                                              the_ids=citation_dict[key][0])
+            with profiler.stage('ncbi_fetch_app_medline') as stage:
+                download_medline_for_publications(urlprefix=urlprefix,
+                                                  outfile=medlinefile,
+                                                  toolargs=toolargs,
+                                                  the_ids=citation_dict[key][0])
+                stage['items'] = 1
 
         # get id of publications citing Cytoscape App publication
         cited_json = os.path.join(data_outdir, key + '.cited.json')
-        download_citing_publications(urlprefix=urlprefix,
-                                     outfile=cited_json,
-                                     toolargs=toolargs,
-                                     the_ids=citation_dict[key][0])
+        with profiler.stage('ncbi_fetch_citing_ids') as stage:
+            download_citing_publications(urlprefix=urlprefix,
+                                         outfile=cited_json,
+                                         toolargs=toolargs,
+                                         the_ids=citation_dict[key][0])
+            stage['items'] = 1
 
         # get count of publications citing Cytoscape App publication
         cited_pub_ids = get_ids_of_citing_publications(cited_json)
@@ -759,77 +781,91 @@ def main(args):
                 for entry in batched_pub_ids:
                     if first_entry is False:
                         write_mode = 'a'
-                    download_medline_for_publications(urlprefix=urlprefix,
-                                                      outfile=ofile,
-                                                      toolargs=toolargs,
-                                                      the_ids=','.join(entry),
-                                                      filewrite_mode=write_mode)
+                    with profiler.stage('ncbi_fetch_cited_medline') as stage:
+                        download_medline_for_publications(urlprefix=urlprefix,
+                                                          outfile=ofile,
+                                                          toolargs=toolargs,
+                                                          the_ids=','.join(entry),
+                                                          filewrite_mode=write_mode)
+                        stage['items'] = len(entry)
                     first_entry = False
 
         # get information from medline about Cytoscape App publication
-        article_dict = get_article_info_from_medline(medlinefile=medlinefile)
+        with profiler.stage('get_article_info_from_medline') as stage:
+            article_dict = get_article_info_from_medline(medlinefile=medlinefile)
+            stage['items'] = 1
 
         # add article information to citation_dict tuple
         citation_dict[key] = (citation_dict[key][0], citation_dict[key][1],
                               article_dict)
 
     # write summary report of Cytoscape App publications
-    write_app_report_csv(outfile=os.path.join(outdir, 'app_summary_report.csv'),
-                         citation_dict=citation_dict, cited_pubs=cited_pubs)
+    with profiler.stage('write_app_report_csv') as stage:
+        write_app_report_csv(outfile=os.path.join(outdir, 'app_summary_report.csv'),
+                             citation_dict=citation_dict, cited_pubs=cited_pubs)
+        stage['items'] = len(citation_dict)
 
     merged_medline_file = os.path.join(outdir, 'unique_set_of_cited_publication.medline')
     if not os.path.isfile(merged_medline_file) or update_merged_medlines is True:
-        merge_medline_files(outfile=merged_medline_file, batch_medlinefiles=batch_medlinefiles)
-
-    # write origin summary file
-    write_count_summary(outfile=os.path.join(outdir,
-                                             'cited_publications_country_of_origin.csv'),
-                        medlinefile=merged_medline_file,
-                        fieldprefix=LABEL_TO_MEDLINE['origin'],
-                        fieldlabel='Country')
-
-    # write grant summary file
-    grant_summary = os.path.join(outdir,
-                                 'cited_publications_grants.csv')
-    write_count_summary(outfile=grant_summary,
-                        medlinefile=merged_medline_file,
-                        fieldprefix=LABEL_TO_MEDLINE['grant'],
-                        fieldlabel='Grant',
-                        value_cleanup_func=grant_value_cleanup_func)
-
-    # write journal summary file
-    journal_summary = os.path.join(outdir, 'cited_publications_journal.csv')
-    write_count_summary(outfile=journal_summary,
-                        medlinefile=merged_medline_file,
-                        fieldprefix=LABEL_TO_MEDLINE['journal'],
-                        fieldlabel='Journal',
-                        value_cleanup_func=None)
-
-    # write author summary file
-    author_summary = os.path.join(outdir, 'cited_publications_author.csv')
-    write_count_summary(outfile=author_summary,
-                        medlinefile=merged_medline_file,
-                        fieldprefix=LABEL_TO_MEDLINE['fullauthor'],
-                        fieldlabel='Author',
-                        value_cleanup_func=None)
-
-    # write articles published summary file
-    published_date_summary = os.path.join(outdir, 'cited_publications_per_year.csv')
-    write_count_summary(outfile=published_date_summary,
-                        medlinefile=merged_medline_file,
-                        fieldprefix=LABEL_TO_MEDLINE['publishdate'],
-                        fieldlabel='PublishYear',
-                        value_cleanup_func=get_year_from_publishdate)
-
-    plot_publishdate_summary(inputfile=published_date_summary, tool_name=theargs.name,
-                             outfile=os.path.join(outdir,
-                                                  'cited_publications_per_year.svg'))
-    plot_journal_summary(inputfile=journal_summary, tool_name=theargs.name,
-                         outfile=os.path.join(outdir,
-                                              'top_cited_publications_journal.svg'))
-    plot_grant_summary(inputfile=grant_summary, tool_name=theargs.name,
-                       outfile=os.path.join(outdir,
-                                            'top_cited_publications_grants.svg'))
+        with profiler.stage('merge_medline_files') as stage:
+            merge_medline_files(outfile=merged_medline_file, batch_medlinefiles=batch_medlinefiles)
+            stage['items'] = len(batch_medlinefiles)
+
+    with profiler.stage('write_count_summaries'):
+        # write origin summary file
+        write_count_summary(outfile=os.path.join(outdir,
+                                                 'cited_publications_country_of_origin.csv'),
+                            medlinefile=merged_medline_file,
+                            fieldprefix=LABEL_TO_MEDLINE['origin'],
+                            fieldlabel='Country')
+
+        # write grant summary file
+        grant_summary = os.path.join(outdir,
+                                     'cited_publications_grants.csv')
+        write_count_summary(outfile=grant_summary,
+                            medlinefile=merged_medline_file,
+                            fieldprefix=LABEL_TO_MEDLINE['grant'],
+                            fieldlabel='Grant',
+                            value_cleanup_func=grant_value_cleanup_func)
+
+        # write journal summary file
+        journal_summary = os.path.join(outdir, 'cited_publications_journal.csv')
+        write_count_summary(outfile=journal_summary,
+                            medlinefile=merged_medline_file,
+                            fieldprefix=LABEL_TO_MEDLINE['journal'],
+                            fieldlabel='Journal',
+                            value_cleanup_func=None)
+
+        # write author summary file
+        author_summary = os.path.join(outdir, 'cited_publications_author.csv')
+        write_count_summary(outfile=author_summary,
+                            medlinefile=merged_medline_file,
+                            fieldprefix=LABEL_TO_MEDLINE['fullauthor'],
+                            fieldlabel='Author',
+                            value_cleanup_func=None)
+
+        # write articles published summary file
+        published_date_summary = os.path.join(outdir, 'cited_publications_per_year.csv')
+        write_count_summary(outfile=published_date_summary,
+                            medlinefile=merged_medline_file,
+                            fieldprefix=LABEL_TO_MEDLINE['publishdate'],
+                            fieldlabel='PublishYear',
+                            value_cleanup_func=get_year_from_publishdate)
+
+    if theargs.no_plots is False:
+        jobs = [('plot_publishdate_summary', plot_publishdate_summary,
+                 {'inputfile': published_date_summary, 'tool_name': theargs.name,
+                  'outfile': os.path.join(outdir, 'cited_publications_per_year.svg')}),
+                ('plot_journal_summary', plot_journal_summary,
+                 {'inputfile': journal_summary, 'tool_name': theargs.name,
+                  'outfile': os.path.join(outdir, 'top_cited_publications_journal.svg')}),
+                ('plot_grant_summary', plot_grant_summary,
+                 {'inputfile': grant_summary, 'tool_name': theargs.name,
+                  'outfile': os.path.join(outdir, 'top_cited_publications_grants.svg')})]
+        with profiler.stage('render_figures') as stage:
+            plotting.render_figures(jobs, workers=theargs.plot_workers,
+                                    backend=theargs.matplotlibgui)
+            stage['items'] = len(jobs)
 
     # output some summary statistics
     with open(os.path.join(outdir, 'summary.txt'), 'w') as f:
@@ -838,6 +874,7 @@ def main(args):
         f.write('Number of Cytoscape App Publications: ' + str(len(citation_dict.keys())) + '\n')
         f.write('Total citations: ' + str(total_cite_count) + '\n')
         f.write('Total unique citations: ' + str(len(unique_citations)) + '\n')
+    profiler.write_report()
 
 
 if __name__ == '__main__':  # pragma: no cover
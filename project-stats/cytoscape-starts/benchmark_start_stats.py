@@ -0,0 +1,480 @@
+#!/usr/bin/env python
+
+import os
+import sys
+import argparse
+import logging
+import random
+import json
+import time
+import platform
+import multiprocessing
+import gzip
+import bz2
+import lzma
+from datetime import datetime, timedelta
+
+import cytoscape_start_stats
+# importing cytoscape_start_stats puts statscommon on sys.path
+from statscommon.profiling import get_peak_rss_mb
+
+
+class Formatter(argparse.ArgumentDefaultsHelpFormatter,
+                argparse.RawDescriptionHelpFormatter):
+    pass
+
+
+LOG_FORMAT = "%(asctime)-15s %(levelname)s %(relativeCreated)dms " \
+             "%(filename)s::%(funcName)s():%(lineno)d %(message)s"
+
+LOGGER = logging.getLogger(__name__)
+
+
+GENERATOR_FILE = 'generator.json'
+"""
+File written to the synthetic log directory recording the parameters
+used to generate the logs so they can be reused by later runs
+"""
+
+COMPRESSION_OPENERS = {'none': (open, ''),
+                       'gzip': (gzip.open, '.gz'),
+                       'bz2': (bz2.open, '.bz2'),
+                       'xz': (lzma.open, '.xz')}
+"""
+Function to open a synthetic log for writing and file
+name suffix for each --compression
+"""
+
+START_USER_AGENTS = ['Java/1.8.0_181', 'Java/11.0.6', 'Java/11.0.12',
+                     'Java/17.0.2']
+"""
+User agents of Cytoscape requesting the news page
+"""
+
+BOT_USER_AGENTS = ['Mozilla/5.0 (compatible; Googlebot/2.1; '
+                   '+http://www.google.com/bot.html)',
+                   'Mozilla/5.0 (compatible; bingbot/2.0; '
+                   '+http://www.bing.com/bingbot.htm)',
+                   'Mozilla/5.0 (compatible; AhrefsBot/7.0; '
+                   '+http://ahrefs.com/robot/)',
+                   'Mozilla/5.0 (compatible; Yahoo! Slurp; '
+                   'http://help.yahoo.com/help/us/ysearch/slurp)',
+                   'curl/7.68.0', 'python-requests/2.27.1',
+                   'facebookexternalhit/1.1']
+"""
+User agents matching rules in the default bot_rules.ini
+"""
+
+BROWSER_USER_AGENTS = ['Mozilla/5.0 (Windows NT 10.0; Win64; x64) '
+                       'AppleWebKit/537.36 (KHTML, like Gecko) '
+                       'Chrome/120.0.0.0 Safari/537.36',
+                       'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) '
+                       'AppleWebKit/605.1.15 (KHTML, like Gecko) '
+                       'Version/17.1 Safari/605.1.15',
+                       'Mozilla/5.0 (X11; Linux x86_64; rv:121.0) '
+                       'Gecko/20100101 Firefox/121.0']
+"""
+User agents of people browsing the site
+"""
+
+OTHER_REQUESTS = ['GET / HTTP/1.1', 'GET /download.html HTTP/1.1',
+                  'GET /css/main.css HTTP/1.1',
+                  'GET /images/logo.png HTTP/1.1',
+                  'GET /js/jquery.min.js HTTP/1.1',
+                  'GET /cytoscape-news/feed.xml HTTP/1.1',
+                  'GET /favicon.ico HTTP/1.1',
+                  'POST /cgi-bin/register.cgi HTTP/1.1']
+"""
+Requests other than the news page
+"""
+
+
+def _parse_arguments(desc, args):
+    """
+    Parses command line arguments
+
+    :param desc:
+    :param args:
+    :return:
+    """
+    parser = argparse.ArgumentParser(description=desc,
+                                     formatter_class=Formatter)
+    parser.add_argument('outdir', help='Directory to write synthetic logs, '
+                                       'reports and benchmark results to, '
+                                       'directory will be created if '
+                                       'it does not exist')
+    parser.add_argument('--size-mb', type=float, default=100,
+                        help='Total uncompressed size of synthetic access '
+                             'logs in megabytes')
+    parser.add_argument('--files', type=int, default=4,
+                        help='Number of access log files to split the '
+                             'synthetic logs across')
+    parser.add_argument('--match-ratio', type=float, default=0.3,
+                        help='Fraction of lines that are requests for the '
+                             'Cytoscape news page')
+    parser.add_argument('--bot-ratio', type=float, default=0.05,
+                        help='Fraction of news page requests made by bots')
+    parser.add_argument('--compression', choices=list(COMPRESSION_OPENERS.keys()),
+                        default='none',
+                        help='Compression of synthetic access logs')
+    parser.add_argument('--days', type=int, default=365,
+                        help='Number of days the synthetic logs span')
+    parser.add_argument('--seed', type=int, default=1,
+                        help='Seed for random number generator')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Passed to --workers of cytoscape_start_stats.py')
+    parser.add_argument('--chunk-mb', type=int, default=256,
+                        help='Passed to --chunk-mb of cytoscape_start_stats.py')
+    parser.add_argument('--results', default=None,
+                        help='Path to write JSON results to. If unset, '
+                             'results are written to '
+                             'benchmark_<date and time>.json in <outdir>')
+    parser.add_argument('--logconf', default=None,
+                        help='Path to python logging configuration file in '
+                             'this format: '
+                             'https://docs.python.org/3/library/'
+                             'logging.config.html#logging-config-fileformat'
+                             '. Setting this overrides -v parameter '
+                             'which uses default logger.')
+    parser.add_argument('--verbose', '-v', action='count', default=0,
+                        help='Increases verbosity of logger to standard '
+                             'error for log messages '
+                             'in this module and in. Messages are output '
+                             'at these python logging levels -v = ERROR, '
+                             '-vv = WARNING, -vvv = INFO, '
+                             '-vvvv = DEBUG, -vvvvv = NOTSET')
+
+    return parser.parse_args(args)
+
+
+def _setup_logging(args):
+    """
+    Sets up logging based on parsed command line arguments.
+    If args.logconf is set use that configuration otherwise look
+    at args.verbose and set logging for this module
+    :param args: parsed command line arguments from argparse
+    :raises AttributeError: If args is None or args.logconf is None
+    :return: None
+    """
+
+    if args is None or args.logconf is None:
+        level = (50 - (10 * args.verbose))
+        logging.basicConfig(format=LOG_FORMAT,
+                            level=level)
+        LOGGER.setLevel(level)
+        cytoscape_start_stats.LOGGER.setLevel(level)
+        return
+
+    # logconf was set use that file
+    logging.config.fileConfig(args.logconf,
+                              disable_existing_loggers=False)
+
+
+def generate_access_logs(logdir=None, size_mb=100, files=4,
+                         match_ratio=0.3, bot_ratio=0.05,
+                         compression='none', days=365, seed=1):
+    """
+    Writes synthetic Apache access logs, in combined log format,
+    totaling **size_mb** uncompressed megabytes to **logdir**.
+    Timestamps increase through each file and files are named like
+    rotated logs, ``access.log.<N>``, with the oldest having the
+    highest N.
+
+    Parameters and the number of lines, bytes and expected starts
+    are written to :py:const:`GENERATOR_FILE` in **logdir**. If that
+    file already exists with the same parameters the logs are not
+    generated again.
+
+    :param logdir: Directory to write logs to
+    :type logdir: str
+    :param size_mb: total uncompressed size of logs in megabytes
+    :type size_mb: float
+    :param files: number of log files
+    :type files: int
+    :param match_ratio: fraction of lines requesting the news page
+    :type match_ratio: float
+    :param bot_ratio: fraction of news page requests made by bots
+    :type bot_ratio: float
+    :param compression: ``none``, ``gzip``, ``bz2`` or ``xz``
+    :type compression: str
+    :param days: number of days logs span
+    :type days: int
+    :param seed: seed for random number generator
+    :type seed: int
+    :return: parameters along with ``lines``, ``bytes``,
+             ``compressed_bytes`` and ``expected_starts``
+    :rtype: dict
+    """
+    params = {'size_mb': size_mb, 'files': files,
+              'match_ratio': match_ratio, 'bot_ratio': bot_ratio,
+              'compression': compression, 'days': days, 'seed': seed}
+    generator_file = os.path.join(logdir, GENERATOR_FILE)
+    if os.path.isfile(generator_file):
+        with open(generator_file, 'r') as f:
+            existing = json.load(f)
+        if existing['parameters'] == params:
+            LOGGER.info('Reusing synthetic logs in ' + logdir)
+            return existing
+        for entry in os.listdir(logdir):
+            if entry.startswith('access'):
+                os.remove(os.path.join(logdir, entry))
+
+    if not os.path.isdir(logdir):
+        os.makedirs(logdir, mode=0o755)
+    rng = random.Random(seed)
+    open_func, suffix = COMPRESSION_OPENERS[compression]
+    total_bytes = int(size_mb * 1024 * 1024)
+    file_bytes = total_bytes // files
+    first_day = datetime(2021, 1, 1)
+    span_seconds = days * 86400
+    clients = ['{}.{}.{}.{}'.format(rng.randint(1, 223), rng.randint(0, 255),
+                                    rng.randint(0, 255), rng.randint(1, 254))
+               for _ in range(5000)]
+    line_count = 0
+    bytes_written = 0
+    expected_starts = 0
+    day_prefixes = {}
+    for file_index in range(files):
+        log_name = 'access.log.' + str(files - file_index) + suffix
+        with open_func(os.path.join(logdir, log_name), 'wb') as f:
+            file_written = 0
+            lines = []
+            while file_written < file_bytes:
+                seconds = int(span_seconds * bytes_written / total_bytes)
+                day_index, day_seconds = divmod(seconds, 86400)
+                prefix = day_prefixes.get(day_index)
+                if prefix is None:
+                    prefix = (first_day + timedelta(days=day_index)).strftime('%d/%b/%Y')
+                    day_prefixes[day_index] = prefix
+                timestamp = '{}:{:02d}:{:02d}:{:02d} -0700'.format(prefix,
+                                                                   day_seconds // 3600,
+                                                                   day_seconds % 3600 // 60,
+                                                                   day_seconds % 60)
+                if rng.random() < match_ratio:
+                    request = 'GET /cytoscape-news/news.html HTTP/1.1'
+                    if rng.random() < bot_ratio:
+                        user_agent = rng.choice(BOT_USER_AGENTS)
+                    else:
+                        user_agent = rng.choice(START_USER_AGENTS)
+                        expected_starts += 1
+                    status = 200
+                else:
+                    request = rng.choice(OTHER_REQUESTS)
+                    user_agent = rng.choice(BROWSER_USER_AGENTS)
+                    status = rng.choice((200, 200, 200, 304, 404))
+                line = '{} - - [{}] "{}" {} {} "-" "{}"\n'.format(rng.choice(clients),
+                                                                 timestamp, request,
+                                                                 status,
+                                                                 rng.randint(200, 60000),
+                                                                 user_agent).encode('ascii')
+                lines.append(line)
+                line_count += 1
+                file_written += len(line)
+                bytes_written += len(line)
+                if len(lines) >= 10000:
+                    f.write(b''.join(lines))
+                    lines = []
+            f.write(b''.join(lines))
+
+    compressed_bytes = sum(os.path.getsize(os.path.join(logdir, entry))
+                           for entry in os.listdir(logdir)
+                           if entry.startswith('access'))
+    result = {'parameters': params, 'lines': line_count,
+              'bytes': bytes_written, 'compressed_bytes': compressed_bytes,
+              'expected_starts': expected_starts}
+    with open(generator_file, 'w') as f:
+        json.dump(result, f, indent=2)
+    return result
+
+
+def _round_rss_mb(rss_mb):
+    """
+    :param rss_mb: peak RSS from :py:func:`get_peak_rss_mb`
+    :type rss_mb: float
+    :return: **rss_mb** rounded to one decimal, ``None`` if not
+             available on this platform
+    :rtype: float
+    """
+    if rss_mb is None:
+        return None
+    return round(rss_mb, 1)
+
+
+def time_stage(name, func, stages, lines=None, num_bytes=None):
+    """
+    Runs **func** recording wall time, CPU time of this process and
+    any child processes, and peak RSS as a dict appended to **stages**
+
+    :param name: name of stage
+    :type name: str
+    :param func: function taking no arguments
+    :param stages: list to append stage results to
+    :type stages: list
+    :param lines: if set, number of lines processed by stage used
+                  to compute ``lines_per_second``
+    :type lines: int
+    :param num_bytes: if set, number of bytes processed by stage used
+                      to compute ``mb_per_second``
+    :type num_bytes: int
+    :return: value returned by **func**
+    """
+    LOGGER.info('Running stage ' + name)
+    start_usage = os.times()
+    start_wall = time.perf_counter()
+    result = func()
+    wall_seconds = time.perf_counter() - start_wall
+    end_usage = os.times()
+    cpu_seconds = (end_usage.user - start_usage.user +
+                   end_usage.system - start_usage.system +
+                   end_usage.children_user - start_usage.children_user +
+                   end_usage.children_system - start_usage.children_system)
+    peak_rss, peak_child_rss = get_peak_rss_mb()
+    stage = {'name': name,
+             'wall_seconds': round(wall_seconds, 4),
+             'cpu_seconds': round(cpu_seconds, 4),
+             'peak_rss_mb': _round_rss_mb(peak_rss),
+             'peak_child_rss_mb': _round_rss_mb(peak_child_rss)}
+    if lines is not None and wall_seconds > 0:
+        stage['lines_per_second'] = round(lines / wall_seconds)
+    if num_bytes is not None and wall_seconds > 0:
+        stage['mb_per_second'] = round(num_bytes / (1024 * 1024) /
+                                       wall_seconds, 2)
+    stages.append(stage)
+    LOGGER.info('Stage ' + name + ' took ' + str(stage['wall_seconds']) +
+                ' seconds')
+    return result
+
+
+def run_benchmark(logdir=None, reportdir=None, log_info=None,
+                  workers=1, chunk_mb=256):
+    """
+    Runs the stages of cytoscape_start_stats.py, parsing, aggregation,
+    writing CSV files and plotting, against logs in **logdir** timing
+    each stage with :py:func:`time_stage`
+
+    :param logdir: Directory containing access logs
+    :type logdir: str
+    :param reportdir: Directory to write reports to
+    :type reportdir: str
+    :param log_info: result of :py:func:`generate_access_logs`
+    :type log_info: dict
+    :param workers: Number of processes to parse logs with
+    :type workers: int
+    :param chunk_mb: size in megabytes logs are split into
+                     when **workers** > 1
+    :type chunk_mb: int
+    :return: (stage results, number of starts counted)
+    :rtype: tuple
+    """
+    stages = []
+    bot_classifier = cytoscape_start_stats.BotClassifier.from_config(cytoscape_start_stats.DEFAULT_BOT_RULES)
+    start_dict = {}
+    skip_counts = {}
+    time_stage('parse',
+               lambda: cytoscape_start_stats.process_access_logs(logdir,
+                                                                 start_dict=start_dict,
+                                                                 workers=workers,
+                                                                 chunk_bytes=chunk_mb * 1024 * 1024,
+                                                                 bot_classifier=bot_classifier,
+                                                                 skip_counts=skip_counts),
+               stages, lines=log_info['lines'], num_bytes=log_info['bytes'])
+    daily_counts = time_stage('aggregate',
+                              lambda: cytoscape_start_stats.DailyCounts.from_dict(start_dict),
+                              stages)
+
+    def write_csv():
+        cytoscape_start_stats.save_bot_skip_counts(skip_counts, outdir=reportdir)
+        cytoscape_start_stats.save_starts_per_day(daily_counts, outdir=reportdir)
+        cytoscape_start_stats.save_starts_per_year(daily_counts, outdir=reportdir)
+
+    def plot():
+        cytoscape_start_stats.plot_starts_by_year(daily_counts, outdir=reportdir)
+        cytoscape_start_stats.plot_starts_by_day(daily_counts, outdir=reportdir)
+
+    time_stage('write_csv', write_csv, stages)
+    time_stage('plot', plot, stages)
+    return stages, daily_counts.get_total()
+
+
+def main(args):
+    """
+
+    :param args:
+    :return:
+    """
+    desc = """
+    Benchmarks cytoscape_start_stats.py by generating synthetic
+    Apache access logs, timing each stage of the report pipeline on
+    them and writing the timings along with lines/s, MB/s and peak
+    memory use as JSON.
+
+    Synthetic logs are written to <outdir>/logs and reused by later
+    runs with the same generator parameters.
+
+    """
+    theargs = _parse_arguments(desc, args[1:])
+
+    if not os.path.isdir(theargs.outdir):
+        os.makedirs(theargs.outdir, mode=0o755)
+    # setup logging
+    _setup_logging(theargs)
+
+    import matplotlib
+    matplotlib.use('svg')
+
+    logdir = os.path.join(theargs.outdir, 'logs')
+    reportdir = os.path.join(theargs.outdir, 'report')
+    if not os.path.isdir(reportdir):
+        os.makedirs(reportdir, mode=0o755)
+
+    generate_start = time.perf_counter()
+    log_info = generate_access_logs(logdir, size_mb=theargs.size_mb,
+                                    files=theargs.files,
+                                    match_ratio=theargs.match_ratio,
+                                    bot_ratio=theargs.bot_ratio,
+                                    compression=theargs.compression,
+                                    days=theargs.days, seed=theargs.seed)
+    generate_seconds = time.perf_counter() - generate_start
+
+    stages, starts = run_benchmark(logdir=logdir, reportdir=reportdir,
+                                   log_info=log_info,
+                                   workers=theargs.workers,
+                                   chunk_mb=theargs.chunk_mb)
+    total_wall = sum(stage['wall_seconds'] for stage in stages)
+    peak_rss, peak_child_rss = get_peak_rss_mb()
+    results = {'date': datetime.now().isoformat(timespec='seconds'),
+               'python': platform.python_version(),
+               'platform': platform.platform(),
+               'cpu_count': multiprocessing.cpu_count(),
+               'workers': theargs.workers,
+               'chunk_mb': theargs.chunk_mb,
+               'logs': log_info,
+               'generate_seconds': round(generate_seconds, 4),
+               'stages': stages,
+               'total': {'wall_seconds': round(total_wall, 4),
+                         'lines_per_second': round(log_info['lines'] / total_wall),
+                         'mb_per_second': round(log_info['bytes'] /
+                                                (1024 * 1024) / total_wall, 2),
+                         'peak_rss_mb': _round_rss_mb(peak_rss),
+                         'peak_child_rss_mb': _round_rss_mb(peak_child_rss)},
+               'starts': starts,
+               'starts_match_expected': starts == log_info['expected_starts']}
+
+    resultfile = theargs.results
+    if resultfile is None:
+        resultfile = os.path.join(theargs.outdir, 'benchmark_' +
+                                  datetime.now().strftime('%Y%m%d_%H%M%S') +
+                                  '.json')
+    with open(resultfile, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(json.dumps(results['total']))
+    print('Results written to ' + resultfile)
+    if results['starts_match_expected'] is not True:
+        sys.stderr.write('Counted ' + str(starts) + ' starts, expected ' +
+                         str(log_info['expected_starts']) + '\n')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':  # pragma: no cover
+    sys.exit(main(sys.argv))
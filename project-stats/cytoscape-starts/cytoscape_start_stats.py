@@ -5,14 +5,37 @@ import sys
 import argparse
 import logging
 import csv
-from datetime import datetime
-import numpy as np
-from tqdm import tqdm
+import re
+import configparser
+import functools
+import hashlib
+import base64
+import json
+import io
+import gzip
+import bz2
+import lzma
+import mmap
+import multiprocessing
+import array
+import time
+import contextlib
+from datetime import date
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir))
+from statscommon import plotting
+from statscommon import profiling
+from statscommon.lazyimport import lazy_import
+from statscommon.timeseries import DailyCounts, get_day_ordinal
+from statscommon.timeseries import EPOCH_ORDINAL, MONTH_NAMES
+
+# numpy is only imported once counts are aggregated, and matplotlib
+# only inside the plot functions, so --help and --no-plots runs
+# start quickly
+np = lazy_import('numpy')
 
 
-import matplotlib
-import matplotlib.pyplot as plt
-
 
 class Formatter(argparse.ArgumentDefaultsHelpFormatter,
                 argparse.RawDescriptionHelpFormatter):
@@ -27,6 +50,72 @@ LOGGER = logging.getLogger(__name__)
 
 LOGGER.info('Starting program')
 
+STATE_FILE = 'start_stats_state.json'
+"""
+Name of file in output directory where per log file
+start counts are saved when running with --incremental
+"""
+
+STATE_FORMAT_VERSION = 4
+"""
+Version of the format of :py:const:`STATE_FILE`, state files with
+a different version are ignored
+"""
+
+READ_BUFFER_SIZE = 4 * 1024 * 1024
+"""
+Size in bytes of read buffer used when parsing access logs
+"""
+
+NEWS_REQUEST = b'"GET /cytoscape-news/news.html '
+"""
+Text in access log lines denoting a request
+for Cytoscape news page, which happens on start
+"""
+
+NO_TIMESTAMP_SKIP = 'no_timestamp'
+"""
+Key in skip counts, and bots_skipped.csv, of request lines
+skipped because they have no ``[`` timestamp
+"""
+
+RESOLUTION_SECONDS = {'day': 86400,
+                      'hour': 3600,
+                      'minute': 60}
+"""
+Width in seconds of the time buckets starts are
+counted in for each --resolution
+"""
+
+RESOLUTION_KEY_LENGTH = {'day': 11,
+                         'hour': 14,
+                         'minute': 17}
+"""
+Number of characters of the access log timestamp, ie
+``03/Apr/2022:06:25:21``, needed for each --resolution
+"""
+
+FOLLOW_POLL_SECONDS = 1.0
+"""
+Seconds between checks for new lines in the access log
+passed to --follow
+"""
+
+DEFAULT_BOT_RULES = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                 'bot_rules.ini')
+"""
+Default configuration file of rules used to
+detect bots, see :py:class:`BotClassifier`
+"""
+
+COMPRESSION_MAGIC = [(b'\x1f\x8b', 'gzip', gzip.GzipFile),
+                     (b'BZh', 'bz2', bz2.BZ2File),
+                     (b'\xfd7zXZ\x00', 'xz', lzma.LZMAFile)]
+"""
+Leading bytes, name, and file class of compressed
+access log formats that can be parsed
+"""
+
 
 def _parse_arguments(desc, args):
     """
@@ -39,12 +128,88 @@ def _parse_arguments(desc, args):
     parser = argparse.ArgumentParser(description=desc,
                                      formatter_class=Formatter)
     parser.add_argument('inputdir',
-                        help='Path to directory containing access log files')
+                        help='Path to directory containing access log files, '
+                             'or starts_by_day.csv or an event table written '
+                             'by --eventcache from a previous run')
     parser.add_argument('outdir', help='Directory to save figures to, '
                                        'directory will be created if '
                                        'it does not exist')
     parser.add_argument('--matplotlibgui', default='svg',
                         help='Library to use for plotting')
+    parser.add_argument('--no-plots', action='store_true',
+                        help='If set, only CSV and text files are written. '
+                             'No figures are made and matplotlib is never '
+                             'imported')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Number of processes to use when parsing '
+                             'access logs. Values greater than 1 spread '
+                             'log files, and byte ranges of large log '
+                             'files, across a pool of processes')
+    parser.add_argument('--chunk-mb', type=int, default=256,
+                        help='When --workers is greater than 1, log files '
+                             'larger than this size in megabytes are split '
+                             'into byte ranges of this size that are '
+                             'parsed in parallel')
+    parser.add_argument('--botrules', default=DEFAULT_BOT_RULES,
+                        help='Configuration file with regular expressions '
+                             'under a [bot_rules] section that are matched '
+                             'against the user agent to skip requests made '
+                             'by bots and crawlers')
+    parser.add_argument('--resolution', choices=['day', 'hour', 'minute'],
+                        default='day',
+                        help='If hour or minute, starts are also counted '
+                             'in buckets of that size and written to '
+                             'starts_by_<resolution>.csv along with a heat '
+                             'map of starts by hour of day and day of week')
+    parser.add_argument('--unique-by', choices=['ip', 'ip+ua'], default=None,
+                        help='If set, also count distinct clients per day '
+                             'and per year where a client is identified by '
+                             'IP address (ip) or by IP address and user '
+                             'agent (ip+ua). Results are written to '
+                             'unique_clients_* files')
+    parser.add_argument('--unique-mode', choices=['exact', 'approx'],
+                        default='exact',
+                        help='How distinct clients are counted with '
+                             '--unique-by. exact keeps a set of clients for '
+                             'each day, approx keeps a fixed size '
+                             'HyperLogLog sketch for each day so memory '
+                             'stays bounded on large log archives')
+    parser.add_argument('--hll-precision', type=int, default=12,
+                        help='With --unique-mode approx, each sketch uses '
+                             '2^N bytes and has a standard error of '
+                             '1.04/sqrt(2^N)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='If set, start counts for each access log are '
+                             'saved to ' + STATE_FILE + ' in <outdir> '
+                             'and on subsequent runs only new access logs, '
+                             'or the newly appended portion of access logs '
+                             'that have grown, are parsed')
+    parser.add_argument('--eventcache', default=None,
+                        help='If set, every request for the news page found '
+                             'in the access logs, including those from bots, '
+                             'is written to this file as a columnar event '
+                             'table that can be passed as <inputdir> on '
+                             'later runs instead of the access logs. If the '
+                             'path ends with .parquet the table is written in '
+                             'Parquet format, which requires pyarrow, '
+                             'otherwise it is written as compressed numpy '
+                             'arrays (.npz). Cannot be combined with '
+                             '--incremental')
+    parser.add_argument('--follow', default=None,
+                        help='Path to the active access log. If set, after '
+                             'the report is generated, this log is tailed and '
+                             'the CSV files, summary.txt and --eventcache '
+                             'are rewritten every --follow-interval seconds, '
+                             'without redrawing plots, until the '
+                             'program is interrupted with Ctrl-C. Truncation '
+                             'and rotation of the log are handled. If the log '
+                             'is in <inputdir> it is only read by the '
+                             'follower so partially written lines are not '
+                             'counted')
+    parser.add_argument('--follow-interval', type=float, default=60.0,
+                        help='Seconds between rewrites of output files '
+                             'with --follow')
+    profiling.add_profile_arguments(parser)
     parser.add_argument('--logconf', default=None,
                         help='Path to python logging configuration file in '
                              'this format: '
@@ -86,24 +251,1293 @@ def _setup_logging(args):
                               disable_existing_loggers=False)
 
 
-def process_access_logs(accessdir=None, start_dict=None):
+class BotClassifier(object):
+    """
+    Decides if a request was made by a bot or crawler by matching the
+    user agent of the request against a set of named rules that are
+    compiled into a single regular expression, so user agents that
+    match no rule, which is most of them, are ruled out with one
+    search. A user agent that matches is counted under the first
+    rule, in order, that matches it. Verdicts are cached
+    per user agent since a few thousand user agents make up
+    the bulk of the requests in the access logs.
     """
 
-    :param accessdir:
-    :return:
+    MAX_CACHED_VERDICTS = 100000
+    """
+    Cache of verdicts is cleared when it reaches this size
+    """
+
+    def __init__(self, rules=None):
+        """
+        Constructor
+
+        :param rules: (rule name, regular expression) tuples. Expressions
+                      are matched against the user agent ignoring case
+        :type rules: list
+        """
+        self.rules = list(rules) if rules is not None else []
+        self._rule_regexes = [(rule[0], re.compile(rule[1].encode('utf-8'),
+                                                   re.IGNORECASE))
+                              for rule in self.rules]
+        self._regex = None
+        if len(self.rules) > 0:
+            self._regex = re.compile('|'.join(['(?:' + rule[1] + ')'
+                                               for rule in self.rules]).encode('utf-8'),
+                                     re.IGNORECASE)
+        self._verdicts = {}
+
+    @staticmethod
+    def from_config(configfile):
+        """
+        Creates :py:class:`BotClassifier` from rules under the
+        ``[bot_rules]`` section of **configfile**
+        which should be in this format:
+
+        .. code-block::
+
+            [bot_rules]
+            bot = bot\\b
+            crawler = crawl
+
+        :param configfile: Path to configuration file
+        :type configfile: str
+        :raises ValueError: If **configfile** lacks a
+                            ``[bot_rules]`` section
+        :return: classifier using the rules in **configfile**
+        :rtype: :py:class:`BotClassifier`
+        """
+        config = configparser.ConfigParser(interpolation=None)
+        config.optionxform = str
+        config.read(configfile)
+        if not config.has_section('bot_rules'):
+            raise ValueError('No [bot_rules] section found in ' +
+                             str(configfile))
+        return BotClassifier(rules=config.items('bot_rules'))
+
+    def classify(self, user_agent):
+        """
+        Gets name of first rule matching **user_agent**
+
+        :param user_agent: user agent from access log line
+        :type user_agent: bytes
+        :return: name of matching rule or ``None`` if not a bot
+        :rtype: str
+        """
+        try:
+            return self._verdicts[user_agent]
+        except KeyError:
+            pass
+        verdict = None
+        if self._regex is not None and self._regex.search(user_agent) is not None:
+            # the combined expression finds the leftmost match in the
+            # user agent, so find the first rule in order that matches
+            for rule_name, rule_regex in self._rule_regexes:
+                if rule_regex.search(user_agent) is not None:
+                    verdict = rule_name
+                    break
+        if len(self._verdicts) >= BotClassifier.MAX_CACHED_VERDICTS:
+            self._verdicts.clear()
+        self._verdicts[user_agent] = verdict
+        return verdict
+
+
+class HyperLogLog(object):
+    """
+    HyperLogLog sketch that estimates the number of distinct
+    64-bit hash values added to it using a fixed
+    2^**precision** bytes of memory
+    """
+
+    def __init__(self, precision=12, registers=None):
+        """
+        Constructor
+
+        :param precision: number of bits of hash used to pick a register
+        :type precision: int
+        :param registers: initial register values
+        :type registers: bytes
+        """
+        self.precision = precision
+        self.num_registers = 1 << precision
+        if registers is None:
+            self.registers = bytearray(self.num_registers)
+        else:
+            self.registers = bytearray(registers)
+
+    def add(self, hash_value):
+        """
+        Adds **hash_value** to sketch
+
+        :param hash_value: 64-bit hash
+        :type hash_value: int
+        :return: None
+        """
+        index = hash_value >> (64 - self.precision)
+        remaining = (hash_value << self.precision) & 0xFFFFFFFFFFFFFFFF
+        rank = min(65 - remaining.bit_length(), 65 - self.precision)
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        """
+        Merges **other** into this sketch so it estimates the
+        size of the union of both
+
+        :param other: sketch with same precision
+        :type other: :py:class:`HyperLogLog`
+        :return: None
+        """
+        self.registers = bytearray(np.maximum(np.frombuffer(self.registers, dtype=np.uint8),
+                                              np.frombuffer(other.registers, dtype=np.uint8)).tobytes())
+
+    def count(self):
+        """
+        Estimates number of distinct values added
+
+        :return: estimated number of distinct values
+        :rtype: int
+        """
+        registers = np.frombuffer(self.registers, dtype=np.uint8)
+        alpha = 0.7213 / (1.0 + 1.079 / self.num_registers)
+        estimate = alpha * self.num_registers ** 2 /\
+            np.sum(np.power(2.0, -registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(registers == 0))
+        if estimate <= 2.5 * self.num_registers and zeros > 0:
+            # small range correction via linear counting
+            estimate = self.num_registers * np.log(self.num_registers / zeros)
+        return int(round(estimate))
+
+
+class UniqueClientCounter(object):
+    """
+    Counts distinct clients per day, and per year, that requested the
+    Cytoscape news page. Clients are identified by a 64-bit hash of
+    the IP address or of the IP address and user agent. Each day
+    either holds a set of hashes (exact) or a
+    :py:class:`HyperLogLog` sketch (approximate).
+    """
+
+    def __init__(self, unique_by='ip', approximate=False, precision=12):
+        """
+        Constructor
+
+        :param unique_by: ``ip`` or ``ip+ua``
+        :type unique_by: str
+        :param approximate: If ``True`` use :py:class:`HyperLogLog`
+                            sketches instead of sets
+        :type approximate: bool
+        :param precision: precision of :py:class:`HyperLogLog` sketches
+        :type precision: int
+        """
+        if unique_by not in ('ip', 'ip+ua'):
+            raise ValueError('unique_by must be ip or ip+ua: ' +
+                             str(unique_by))
+        self.unique_by = unique_by
+        self.approximate = approximate
+        self.precision = precision
+        self.clients_per_day = {}
+
+    def copy_empty(self):
+        """
+        Creates a new counter with the same settings as this one
+
+        :return: empty counter
+        :rtype: :py:class:`UniqueClientCounter`
+        """
+        return UniqueClientCounter(unique_by=self.unique_by,
+                                   approximate=self.approximate,
+                                   precision=self.precision)
+
+    def get_settings(self):
+        """
+        Gets settings of this counter
+
+        :return: settings as JSON serializable dict
+        :rtype: dict
+        """
+        return {'unique_by': self.unique_by,
+                'approximate': self.approximate,
+                'precision': self.precision}
+
+    def _new_day(self):
+        if self.approximate is True:
+            return HyperLogLog(precision=self.precision)
+        return set()
+
+    def add(self, day_key, line):
+        """
+        Adds client that made request in access log **line**
+        to the clients for **day_key**
+
+        :param day_key: day request was made ie ``03/Apr/2022``
+        :type day_key: str
+        :param line: row of text in access.log file
+        :type line: bytes
+        :return: None
+        """
+        client = line[:line.find(b' ')]
+        if self.unique_by == 'ip+ua':
+            client += b'\x00' + extract_user_agent(line)
+        self.add_hashes(day_key, [get_client_hash(client)])
+
+    def add_hashes(self, day_key, hash_values):
+        """
+        Adds clients, already hashed with :py:func:`get_client_hash`,
+        to the clients for **day_key**
+
+        :param day_key: day request was made ie ``03/Apr/2022``
+        :type day_key: str
+        :param hash_values: 64-bit hash of each client
+        :type hash_values: list
+        :return: None
+        """
+        clients = self.clients_per_day.get(day_key)
+        if clients is None:
+            clients = self._new_day()
+            self.clients_per_day[day_key] = clients
+        for hash_value in hash_values:
+            clients.add(hash_value)
+
+    def merge(self, other):
+        """
+        Merges clients from **other** into this counter
+
+        :param other: counter with the same settings
+        :type other: :py:class:`UniqueClientCounter`
+        :return: None
+        """
+        for day_key, clients in other.clients_per_day.items():
+            if day_key not in self.clients_per_day:
+                self.clients_per_day[day_key] = self._new_day()
+            if self.approximate is True:
+                self.clients_per_day[day_key].merge(clients)
+            else:
+                self.clients_per_day[day_key].update(clients)
+
+    @staticmethod
+    def _get_count(clients):
+        if isinstance(clients, HyperLogLog):
+            return clients.count()
+        return len(clients)
+
+    def get_counts_per_day(self):
+        """
+        Gets number of distinct clients for each day
+
+        :return: dict where key is day and value is number of clients
+        :rtype: dict
+        """
+        return {day_key: UniqueClientCounter._get_count(clients)
+                for day_key, clients in self.clients_per_day.items()}
+
+    def get_counts_per_year(self):
+        """
+        Gets number of distinct clients for each year, this is
+        not the sum of the daily counts since clients seen on multiple
+        days of a year are only counted once
+
+        :return: dict where key is year as str and value
+                 is number of clients
+        :rtype: dict
+        """
+        clients_per_year = {}
+        for day_key, clients in self.clients_per_day.items():
+            year = day_key[day_key.rindex('/') + 1:]
+            if year not in clients_per_year:
+                clients_per_year[year] = self._new_day()
+            if self.approximate is True:
+                clients_per_year[year].merge(clients)
+            else:
+                clients_per_year[year].update(clients)
+        return {year: UniqueClientCounter._get_count(clients)
+                for year, clients in clients_per_year.items()}
+
+    def to_dict(self):
+        """
+        Gets clients per day as JSON serializable dict. Sketches are
+        base64 encoded and sets are stored as lists of hashes.
+
+        :return: dict where key is day
+        :rtype: dict
+        """
+        result = {}
+        for day_key, clients in self.clients_per_day.items():
+            if self.approximate is True:
+                result[day_key] = base64.b64encode(clients.registers).decode('ascii')
+            else:
+                result[day_key] = sorted(clients)
+        return result
+
+    def update_from_dict(self, data):
+        """
+        Merges clients per day from **data** as returned by
+        :py:func:`to_dict` into this counter
+
+        :param data: dict where key is day
+        :type data: dict
+        :return: None
+        """
+        other = self.copy_empty()
+        for day_key, clients in data.items():
+            if self.approximate is True:
+                other.clients_per_day[day_key] = HyperLogLog(precision=self.precision,
+                                                             registers=base64.b64decode(clients))
+            else:
+                other.clients_per_day[day_key] = set(clients)
+        self.merge(other)
+
+
+class StartEventTable(object):
+    """
+    Columnar table of requests for the Cytoscape news page, bots
+    included, so counts can be recomputed without parsing the
+    access logs again. Each request has these columns:
+
+    * ``timestamp`` - seconds since 1970-01-01 00:00 in the time zone
+      of the log (see :py:func:`get_epoch_bucket`)
+    * ``client`` - hash of IP address from :py:func:`get_client_hash`
+    * ``ua_id`` - index into :py:attr:`user_agents`
+    * ``status`` - HTTP status code, ``0`` if not a number
+    * ``bytes`` - size of response, ``0`` if not a number
+
+    While parsing, and after a merge, columns are :py:class:`array.array`
+    objects that are appended to, once loaded they are numpy arrays
+    """
+
+    COLUMN_TYPES = [('timestamp', 'q', 'int64'),
+                    ('client', 'Q', 'uint64'),
+                    ('ua_id', 'l', 'int64'),
+                    ('status', 'l', 'int64'),
+                    ('bytes', 'q', 'int64')]
+    """
+    Name, :py:mod:`array` type code and numpy type of each column
+    """
+
+    def __init__(self, columns=None, user_agents=None):
+        """
+        Constructor
+
+        :param columns: dict of column name to numpy array, if ``None``
+                        the table is empty
+        :type columns: dict
+        :param user_agents: user agent for each ``ua_id``
+        :type user_agents: list
+        """
+        if columns is None:
+            columns = {name: array.array(type_code)
+                       for name, type_code, _ in StartEventTable.COLUMN_TYPES}
+        self.columns = columns
+        if user_agents is None:
+            user_agents = []
+        self.user_agents = user_agents
+        self._ua_ids = {user_agent: ua_id for ua_id, user_agent
+                        in enumerate(user_agents)}
+        self._hour_buckets = {}
+
+    def __len__(self):
+        """
+        :return: number of requests in table
+        :rtype: int
+        """
+        return len(self.columns['timestamp'])
+
+    def _get_ua_id(self, user_agent):
+        """
+        :param user_agent: user agent
+        :type user_agent: bytes
+        :return: id of **user_agent**, adding it if needed
+        :rtype: int
+        """
+        ua_id = self._ua_ids.get(user_agent)
+        if ua_id is None:
+            ua_id = len(self.user_agents)
+            self.user_agents.append(user_agent)
+            self._ua_ids[user_agent] = ua_id
+        return ua_id
+
+    def add(self, line, match_index):
+        """
+        Adds request in access log **line** to the table
+
+        :param line: row of text in access.log file, must contain
+                     a ``[`` timestamp
+        :type line: bytes
+        :param match_index: offset of :py:const:`NEWS_REQUEST` in **line**
+        :type match_index: int
+        :return: None
+        """
+        date_start_index = line.find(b'[') + 1
+        timestamp = line[date_start_index:date_start_index + 20]
+        hour_bucket = self._hour_buckets.get(timestamp[:14])
+        if hour_bucket is None:
+            hour_bucket = get_epoch_bucket(timestamp, resolution='hour')
+            self._hour_buckets[timestamp[:14]] = hour_bucket
+        request_end = line.find(b'" ', match_index + len(NEWS_REQUEST))
+        fields = line[request_end + 2:].split(b' ', 2)
+        self.columns['timestamp'].append(hour_bucket +
+                                         int(timestamp[15:17]) * 60 +
+                                         int(timestamp[18:20]))
+        self.columns['client'].append(get_client_hash(line[:line.find(b' ')]))
+        self.columns['ua_id'].append(self._get_ua_id(extract_user_agent(line)))
+        self.columns['status'].append(int(fields[0]) if fields[0].isdigit()
+                                      else 0)
+        self.columns['bytes'].append(int(fields[1]) if len(fields) > 1 and
+                                     fields[1].isdigit() else 0)
+
+    def get_columns(self):
+        """
+        :return: dict of column name to numpy array
+        :rtype: dict
+        """
+        return {name: np.asarray(self.columns[name], dtype=numpy_type)
+                for name, _, numpy_type in StartEventTable.COLUMN_TYPES}
+
+    def merge(self, other):
+        """
+        Appends requests in **other** to this table, mapping
+        user agent ids of **other** to ids in this table. The columns
+        are left as :py:class:`array.array` objects so requests can
+        still be added, ie by the follower of an active log
+
+        :param other: table to append
+        :type other: :py:class:`StartEventTable`
+        :return: None
+        """
+        ua_map = np.fromiter((self._get_ua_id(user_agent)
+                              for user_agent in other.user_agents),
+                             dtype=np.int64, count=len(other.user_agents))
+        columns = self.get_columns()
+        other_columns = other.get_columns()
+        other_columns['ua_id'] = ua_map[other_columns['ua_id']]
+        self.columns = {name: array.array(type_code,
+                                          np.concatenate((columns[name],
+                                                          other_columns[name])).tobytes())
+                        for name, type_code, _ in StartEventTable.COLUMN_TYPES}
+
+    def save(self, path):
+        """
+        Writes table sorted by timestamp to **path** in Parquet format
+        if **path** ends with ``.parquet``, otherwise as compressed
+        numpy arrays. The file is written under a temporary name and
+        renamed so an interrupted run never leaves a partial table
+
+        :param path: file to write
+        :type path: str
+        :raises ImportError: if Parquet is requested and pyarrow
+                             is not installed
+        :return: None
+        """
+        columns = self.get_columns()
+        order = np.lexsort((columns['client'], columns['timestamp']))
+        columns = {name: values[order] for name, values in columns.items()}
+        user_agents = [user_agent.decode('utf-8', errors='replace')
+                       for user_agent in self.user_agents]
+        tmp_path = path + '.tmp'
+        if path.endswith('.parquet'):
+            pyarrow = _import_pyarrow()
+            if pyarrow is None:
+                raise ImportError('pyarrow is needed to write ' + path)
+            table = pyarrow.table(columns)
+            table = table.replace_schema_metadata({'user_agents':
+                                                   json.dumps(user_agents)})
+            pyarrow.parquet.write_table(table, tmp_path)
+        else:
+            with open(tmp_path, 'wb') as f:
+                np.savez_compressed(f, user_agents=np.array(user_agents,
+                                                            dtype=str),
+                                    **columns)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def load(path):
+        """
+        Loads table written by :py:func:`save`
+
+        :param path: file to read
+        :type path: str
+        :raises ImportError: if **path** is a Parquet file and pyarrow
+                             is not installed
+        :return: table
+        :rtype: :py:class:`StartEventTable`
+        """
+        if path.endswith('.parquet'):
+            pyarrow = _import_pyarrow()
+            if pyarrow is None:
+                raise ImportError('pyarrow is needed to read ' + path)
+            table = pyarrow.parquet.read_table(path)
+            user_agents = json.loads(table.schema.metadata[b'user_agents'])
+            columns = {name: table.column(name).to_numpy()
+                       for name, _, _ in StartEventTable.COLUMN_TYPES}
+        else:
+            with np.load(path, allow_pickle=False) as data:
+                user_agents = data['user_agents'].tolist()
+                columns = {name: data[name]
+                           for name, _, _ in StartEventTable.COLUMN_TYPES}
+        return StartEventTable(columns=columns,
+                               user_agents=[user_agent.encode('utf-8')
+                                            for user_agent in user_agents])
+
+    def get_counts(self, start_dict=None, bot_classifier=None,
+                   skip_counts=None, unique_counter=None, resolution='day',
+                   bucket_dict=None):
+        """
+        Counts requests in the table the same way
+        :py:func:`parse_access_log` counts them in an access log.
+        User agents are classified once each and the counting is
+        done on the columns with numpy
+
+        :param start_dict: dict to add starts per day to
+        :type start_dict: dict
+        :param bot_classifier: Used to skip requests from bots
+        :type bot_classifier: :py:class:`BotClassifier`
+        :param skip_counts: number of requests skipped by each bot rule
+                            is added to this dict
+        :type skip_counts: dict
+        :param unique_counter: if set, clients making each request are
+                               added to this counter
+        :type unique_counter: :py:class:`UniqueClientCounter`
+        :param resolution: see :py:func:`parse_access_log`
+        :type resolution: str
+        :param bucket_dict: see :py:func:`parse_access_log`
+        :type bucket_dict: dict
+        :return: None
+        """
+        columns = self.get_columns()
+        rule_names = []
+        rule_ids = np.full(len(self.user_agents) + 1, -1, dtype=np.int64)
+        for ua_id, user_agent in enumerate(self.user_agents):
+            bot_rule = bot_classifier.classify(user_agent)
+            if bot_rule is None:
+                continue
+            if bot_rule not in rule_names:
+                rule_names.append(bot_rule)
+            rule_ids[ua_id] = rule_names.index(bot_rule)
+        event_rules = rule_ids[columns['ua_id']]
+        is_start = event_rules == -1
+        skipped = np.bincount(event_rules[~is_start], minlength=len(rule_names))
+        for rule_id, bot_rule in enumerate(rule_names):
+            if skipped[rule_id] > 0:
+                skip_counts[bot_rule] = skip_counts.get(bot_rule, 0) + int(skipped[rule_id])
+
+        timestamps = columns['timestamp'][is_start]
+        days = timestamps // 86400
+        for day, count in zip(*[a.tolist() for a in np.unique(days,
+                                                              return_counts=True)]):
+            date_key = format_epoch_bucket(day * 86400)
+            start_dict[date_key] = start_dict.get(date_key, 0) + count
+        if bucket_dict is not None and resolution != 'day':
+            width = RESOLUTION_SECONDS[resolution]
+            buckets, counts = np.unique(timestamps // width * width,
+                                        return_counts=True)
+            for bucket, count in zip(buckets.tolist(), counts.tolist()):
+                bucket_dict[bucket] = bucket_dict.get(bucket, 0) + count
+        if unique_counter is not None:
+            self._add_unique_clients(unique_counter, days,
+                                     columns['client'][is_start],
+                                     columns['ua_id'][is_start])
+
+    def _add_unique_clients(self, unique_counter, days, clients, ua_ids):
+        """
+        Adds distinct clients for each day to **unique_counter**
+
+        :param unique_counter: counter of distinct clients
+        :type unique_counter: :py:class:`UniqueClientCounter`
+        :param days: day of each request as days since 1970-01-01
+        :type days: :py:class:`numpy.ndarray`
+        :param clients: client hash of each request
+        :type clients: :py:class:`numpy.ndarray`
+        :param ua_ids: user agent id of each request
+        :type ua_ids: :py:class:`numpy.ndarray`
+        :return: None
+        """
+        if unique_counter.unique_by == 'ip+ua':
+            # IP address is not kept so hash client hash plus user agent
+            pairs, inverse = np.unique(np.stack((clients.view(np.int64), ua_ids),
+                                                axis=1),
+                                       axis=0, return_inverse=True)
+            pair_hashes = np.fromiter((get_client_hash(int(client).to_bytes(8, 'big', signed=True) +
+                                                       b'\x00' + self.user_agents[ua_id])
+                                       for client, ua_id in pairs.tolist()),
+                                      dtype=np.uint64, count=len(pairs))
+            clients = pair_hashes[inverse.ravel()]
+        day_clients = np.unique(np.stack((days, clients.view(np.int64)), axis=1),
+                                axis=0)
+        if len(day_clients) == 0:
+            return
+        day_starts = np.flatnonzero(np.diff(day_clients[:, 0], prepend=-1))
+        for index, day_start in enumerate(day_starts.tolist()):
+            day_end = day_starts[index + 1] if index + 1 < len(day_starts) else len(day_clients)
+            day = int(day_clients[day_start, 0])
+            unique_counter.add_hashes(format_epoch_bucket(day * 86400),
+                                      day_clients[day_start:day_end, 1].view(np.uint64).tolist())
+
+
+def get_client_hash(client):
+    """
+    Hashes **client** to a 64-bit value so clients can be counted
+    without keeping IP addresses
+
+    :param client: IP address and, optionally, user agent
+    :type client: bytes
+    :return: 64-bit hash
+    :rtype: int
+    """
+    return int.from_bytes(hashlib.blake2b(client, digest_size=8).digest(),
+                          'big')
+
+
+def extract_user_agent(line):
+    """
+    Gets user agent, the last quoted field, from access log **line**
+    assuming it looks like this:
+
+    ``1.2.3.4  - - [03/Apr/2022:06:25:21 -0700] "GET /cytoscape-news/news.html HTTP/1.1" 200 783 "-" "Java/11.0.6"``
+
+    The above would return ``Java/11.0.6``
+
+    :param line: row of text in access.log file
+    :type line: bytes
+    :return: user agent or empty bytes if line lacks quoted fields
+    :rtype: bytes
+    """
+    end_index = line.rfind(b'"')
+    start_index = line.rfind(b'"', 0, end_index)
+    if start_index == -1:
+        return b''
+    return line[start_index + 1:end_index]
+
+
+def process_access_logs(accessdir=None, start_dict=None, workers=1,
+                        chunk_bytes=256 * 1024 * 1024, state=None,
+                        bot_classifier=None, skip_counts=None,
+                        unique_counter=None, resolution='day',
+                        bucket_dict=None, event_table=None, exclude=None):
     """
-    bot_skipped = 0
-    for entry in tqdm(os.listdir(accessdir)):
+    Parses all files with ``access`` in their name found in
+    **accessdir** adding starts per day to **start_dict**
+
+    If **workers** is greater than ``1`` the log files are parsed by
+    a pool of processes. Log files larger than **chunk_bytes** are
+    split into byte ranges that are parsed separately. Each process
+    returns its own partial start dict which is merged into
+    **start_dict** so the result is identical to a serial run.
+
+    If **state** is set, it is used as a checkpoint of starts already
+    counted for each log file (see :py:func:`load_start_state`). Log
+    files whose inode, size and modification time match the checkpoint
+    are not parsed, log files that have grown are parsed from the byte
+    offset where the previous run stopped and all other log files
+    are parsed in full. **state** is updated in place.
+
+    :param accessdir: Directory containing access log files
+    :type accessdir: str
+    :param start_dict: dict to add starts to
+    :type start_dict: dict
+    :param workers: Number of processes to use
+    :type workers: int
+    :param chunk_bytes: Size in bytes of ranges large log files
+                        are split into when **workers** > 1
+    :type chunk_bytes: int
+    :param state: checkpoint of starts already counted for
+                  each log file
+    :type state: dict
+    :param bot_classifier: Used to skip requests from bots, if ``None``
+                           rules in :py:const:`DEFAULT_BOT_RULES` are used
+    :type bot_classifier: :py:class:`BotClassifier`
+    :param skip_counts: if set, number of lines skipped by each
+                        bot rule is added to this dict
+    :type skip_counts: dict
+    :param unique_counter: if set, clients making each request are
+                           added to this counter
+    :type unique_counter: :py:class:`UniqueClientCounter`
+    :param resolution: ``day``, ``hour`` or ``minute``. If not ``day``
+                       starts are also counted in **bucket_dict**
+    :type resolution: str
+    :param bucket_dict: dict to add starts per time bucket to, see
+                        :py:func:`parse_access_log`
+    :type bucket_dict: dict
+    :param event_table: if set, every request for the news page
+                        is added to this table
+    :type event_table: :py:class:`StartEventTable`
+    :param exclude: absolute paths of logs not to parse, ie the log
+                    passed to --follow
+    :type exclude: list
+    :return: (start_dict, :py:class:`DailyCounts` built from start_dict)
+    :rtype: tuple
+    """
+    if bot_classifier is None:
+        bot_classifier = BotClassifier.from_config(DEFAULT_BOT_RULES)
+    if skip_counts is None:
+        skip_counts = {}
+    scan_func = functools.partial(_scan_access_log_task,
+                                  bot_classifier=bot_classifier,
+                                  unique_counter=unique_counter,
+                                  resolution=resolution,
+                                  capture_events=event_table is not None)
+    file_entries = {}
+    scan_ranges = []
+    for entry in sorted(os.listdir(accessdir)):
         if 'access' not in entry:
             continue
-        full_path = os.path.join(accessdir, entry)
+        full_path = os.path.abspath(os.path.join(accessdir, entry))
         if not os.path.isfile(full_path):
             continue
-        bot_skipped += parse_access_log(accesslog=full_path, start_dict=start_dict,
-                                        date_extractor_func=_extract_day_month_year_from_log_entry)
-    LOGGER.info('Skipped ' + str(bot_skipped) + ' bot lines')
-    date_list = get_sorted_date_list(start_dict)
-    return start_dict, date_list
+        if exclude is not None and full_path in exclude:
+            continue
+        file_entry, start_offset = _get_file_checkpoint(full_path,
+                                                        state=state,
+                                                        unique_counter=unique_counter)
+        file_entries[full_path] = file_entry
+        if start_offset >= file_entry['offset']:
+            continue
+        if file_entry['compression'] is not None:
+            scan_ranges.append((full_path, 0, None))
+        else:
+            scan_ranges.append((full_path, start_offset, file_entry['offset']))
+
+    if workers is None or workers <= 1:
+        chunk_bytes = None
+    tasks = get_access_log_scan_tasks(scan_ranges, chunk_bytes=chunk_bytes)
+    LOGGER.info('Parsing ' + str(len(scan_ranges)) + ' of ' +
+                str(len(file_entries)) + ' log files as ' +
+                str(len(tasks)) + ' tasks using ' + str(workers) +
+                ' process(es)')
+    from tqdm import tqdm
+    if workers is None or workers <= 1:
+        for task in tqdm(tasks):
+            _add_scan_result(file_entries, scan_func(task),
+                             event_table=event_table)
+    else:
+        with multiprocessing.Pool(processes=workers) as pool:
+            for result in tqdm(pool.imap_unordered(scan_func, tasks),
+                               total=len(tasks)):
+                _add_scan_result(file_entries, result,
+                                 event_table=event_table)
+
+    for full_path in file_entries:
+        merge_start_dicts(start_dict, file_entries[full_path]['starts'])
+        merge_start_dicts(skip_counts, file_entries[full_path]['bot_skipped'])
+        if bucket_dict is not None:
+            merge_start_dicts(bucket_dict, file_entries[full_path]['buckets'])
+        if unique_counter is not None:
+            unique_counter.merge(file_entries[full_path]['unique'])
+            file_entries[full_path]['unique'] = file_entries[full_path]['unique'].to_dict()
+    if state is not None:
+        state['files'] = file_entries
+    LOGGER.info('Skipped ' + str(sum(skip_counts.values())) + ' bot lines')
+    for rule in sorted(skip_counts.keys()):
+        LOGGER.info('Skipped ' + str(skip_counts[rule]) +
+                    ' lines matching bot rule ' + rule)
+    return start_dict, DailyCounts.from_dict(start_dict)
+
+
+def _get_file_checkpoint(accesslog, state=None, unique_counter=None):
+    """
+    Compares **accesslog** against its entry in **state** to decide
+    where parsing must start.
+
+    When checkpointing an uncompressed log, ``offset`` in the entry is
+    set just past the last newline, so a line still being written is
+    left for the next run instead of being counted half written.
+
+    :param accesslog: Path to access log
+    :type accesslog: str
+    :param state: checkpoint of starts already counted for each log file
+    :type state: dict
+    :param unique_counter: if set, the entry gets an empty copy of this
+                           counter under ``unique``
+    :type unique_counter: :py:class:`UniqueClientCounter`
+    :return: (entry for **accesslog** to put in state,
+              byte offset to start parsing from)
+    :rtype: tuple
+    """
+    stat_res = os.stat(accesslog)
+    file_entry = {'size': stat_res.st_size,
+                  'mtime_ns': stat_res.st_mtime_ns,
+                  'inode': stat_res.st_ino,
+                  'compression': get_compression_type(accesslog),
+                  'offset': stat_res.st_size,
+                  'bot_skipped': {},
+                  'starts': {},
+                  'buckets': {}}
+    if unique_counter is not None:
+        file_entry['unique'] = unique_counter.copy_empty()
+    if state is None:
+        return file_entry, 0
+    if file_entry['compression'] is None:
+        file_entry['offset'] = _get_complete_lines_size(accesslog,
+                                                        stat_res.st_size)
+    old_entry = state['files'].get(accesslog)
+    if old_entry is None or old_entry['inode'] != stat_res.st_ino:
+        return file_entry, 0
+
+    if old_entry['size'] == stat_res.st_size and\
+            old_entry['mtime_ns'] == stat_res.st_mtime_ns:
+        start_offset = file_entry['offset']
+    elif old_entry['offset'] < stat_res.st_size and\
+            file_entry['compression'] is None:
+        # log was appended to, pick up where we left off
+        start_offset = old_entry['offset']
+    else:
+        LOGGER.info(accesslog + ' has been modified, parsing entire file')
+        return file_entry, 0
+
+    file_entry['bot_skipped'] = dict(old_entry['bot_skipped'])
+    file_entry['starts'] = dict(old_entry['starts'])
+    # JSON only allows str keys so convert time buckets back to int
+    file_entry['buckets'] = {int(key): value
+                             for key, value in old_entry['buckets'].items()}
+    if unique_counter is not None:
+        file_entry['unique'].update_from_dict(old_entry['unique'])
+    return file_entry, start_offset
+
+
+def _get_complete_lines_size(accesslog, size):
+    """
+    Gets the number of bytes in the first **size** bytes of
+    uncompressed **accesslog** that make up complete lines, ie the
+    offset just past the last newline
+
+    :param accesslog: Path to access log
+    :type accesslog: str
+    :param size: number of bytes of **accesslog** to look at
+    :type size: int
+    :return: offset just past the last newline, ``0`` if there is none
+    :rtype: int
+    """
+    if size == 0:
+        return 0
+    with open(accesslog, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return mm.rfind(b'\n', 0, size) + 1
+
+
+def _add_scan_result(file_entries, result, event_table=None):
+    """
+    Adds result from :py:func:`_scan_access_log_task` to entry
+    for the log file in **file_entries**
+
+    :param file_entries: per log file entries keyed by path
+    :type file_entries: dict
+    :param result: (path, start_dict, bot lines skipped by rule,
+                    unique client counter or ``None``, bucket_dict,
+                    event table or ``None``)
+    :type result: tuple
+    :param event_table: if set, event table in **result** is
+                        merged into this table
+    :type event_table: :py:class:`StartEventTable`
+    :return: None
+    """
+    accesslog, partial_dict, partial_skipped, partial_unique,\
+        partial_buckets, partial_events = result
+    if event_table is not None:
+        event_table.merge(partial_events)
+    merge_start_dicts(file_entries[accesslog]['starts'], partial_dict)
+    merge_start_dicts(file_entries[accesslog]['buckets'], partial_buckets)
+    merge_start_dicts(file_entries[accesslog]['bot_skipped'],
+                      partial_skipped)
+    if partial_unique is not None:
+        file_entries[accesslog]['unique'].merge(partial_unique)
+
+
+def get_access_log_scan_tasks(scan_ranges, chunk_bytes=256 * 1024 * 1024):
+    """
+    Splits **scan_ranges** into tasks for :py:func:`_scan_access_log_task`.
+    Ranges larger then **chunk_bytes** are split into multiple ranges.
+
+    :param scan_ranges: (path, start offset, end offset) tuples denoting
+                        byte ranges of access logs to parse. An end offset
+                        of ``None`` denotes a compressed log that
+                        cannot be split
+    :type scan_ranges: list
+    :param chunk_bytes: maximum size in bytes of each range, ``None``
+                        means ranges are not split
+    :type chunk_bytes: int
+    :return: list of (path, start offset, end offset) tuples
+    :rtype: list
+    """
+    tasks = []
+    for accesslog, start_offset, end_offset in scan_ranges:
+        if end_offset is None or chunk_bytes is None or chunk_bytes <= 0:
+            tasks.append((accesslog, start_offset, end_offset))
+            continue
+        for offset in range(start_offset, end_offset, chunk_bytes):
+            tasks.append((accesslog, offset,
+                          min(offset + chunk_bytes, end_offset)))
+
+    # compressed logs are slowest to parse and cannot be split so they go
+    # first, then biggest ranges so the pool is not left waiting on one file
+    tasks.sort(key=lambda t: (t[2] is None,
+                              os.path.getsize(t[0]) if t[2] is None
+                              else t[2] - t[1]),
+               reverse=True)
+    return tasks
+
+
+def _scan_access_log_task(task, bot_classifier=None, unique_counter=None,
+                          resolution='day', capture_events=False):
+    """
+    Worker function for :py:func:`process_access_logs` that parses
+    one byte range of an access log into a new start dict
+
+    :param task: (path, start offset, end offset)
+    :type task: tuple
+    :param bot_classifier: Used to skip requests from bots
+    :type bot_classifier: :py:class:`BotClassifier`
+    :param unique_counter: if set, clients are counted in an
+                           empty copy of this counter
+    :type unique_counter: :py:class:`UniqueClientCounter`
+    :param resolution: see :py:func:`parse_access_log`
+    :type resolution: str
+    :param capture_events: if ``True`` requests for the news page are
+                           added to a new :py:class:`StartEventTable`
+    :type capture_events: bool
+    :return: (path, start_dict, dict of bot lines skipped by rule,
+              unique client counter or ``None``, bucket_dict,
+              event table or ``None``)
+    :rtype: tuple
+    """
+    accesslog, start_offset, end_offset = task
+    start_dict = {}
+    skip_counts = {}
+    bucket_dict = {}
+    partial_unique = None
+    if unique_counter is not None:
+        partial_unique = unique_counter.copy_empty()
+    partial_events = None
+    if capture_events is True:
+        partial_events = StartEventTable()
+    parse_access_log(accesslog=accesslog, start_dict=start_dict,
+                     start_offset=start_offset, end_offset=end_offset,
+                     bot_classifier=bot_classifier, skip_counts=skip_counts,
+                     unique_counter=partial_unique, resolution=resolution,
+                     bucket_dict=bucket_dict, event_table=partial_events)
+    return accesslog, start_dict, skip_counts, partial_unique, bucket_dict,\
+        partial_events
+
+
+def merge_start_dicts(start_dict, other_dict):
+    """
+    Adds the starts in **other_dict** to **start_dict**
+
+    :param start_dict: dict of starts that is updated in place
+    :type start_dict: dict
+    :param other_dict: dict of starts to add
+    :type other_dict: dict
+    :return: **start_dict**
+    :rtype: dict
+    """
+    for key, value in other_dict.items():
+        start_dict[key] = start_dict.get(key, 0) + value
+    return start_dict
+
+
+def load_start_state(statefile=None, settings=None):
+    """
+    Loads checkpoint of starts counted for each access log written
+    by :py:func:`save_start_state`. The format is:
+
+    .. code-block::
+
+        {"version": 4,
+         "settings": <settings used to count starts>,
+         "files": {<path to access log>: {"size": <size in bytes>,
+                                          "mtime_ns": <modification time>,
+                                          "inode": <inode>,
+                                          "compression": <gzip, bz2, xz or null>,
+                                          "offset": <bytes parsed>,
+                                          "bot_skipped": {<rule>: <lines>},
+                                          "starts": {<date>: <starts>},
+                                          "buckets": {<time bucket>: <starts>},
+                                          "unique": {<date>: <clients>}
+                                         }
+                  }
+        }
+
+    :param statefile: Path to state file
+    :type statefile: str
+    :param settings: settings, such as bot rules, that affect how
+                     starts are counted. Must be JSON serializable
+    :type settings: dict
+    :return: checkpoint, empty if **statefile** does not exist, is
+             from a different version of this script or was
+             made with different **settings**
+    :rtype: dict
+    """
+    settings = json.loads(json.dumps(settings))
+    if os.path.isfile(statefile):
+        with open(statefile, 'r') as f:
+            state = json.load(f)
+        if state.get('version') != STATE_FORMAT_VERSION:
+            LOGGER.warning('Ignoring ' + statefile + ' since it is version ' +
+                           str(state.get('version')))
+        elif state.get('settings') != settings:
+            LOGGER.warning('Ignoring ' + statefile + ' since it was made '
+                           'with different settings')
+        else:
+            return state
+    return {'version': STATE_FORMAT_VERSION, 'settings': settings,
+            'files': {}}
+
+
+def save_start_state(statefile=None, state=None):
+    """
+    Atomically writes **state** to **statefile**
+
+    :param statefile: Path to state file
+    :type statefile: str
+    :param state: checkpoint from :py:func:`load_start_state`
+    :type state: dict
+    :return: None
+    """
+    with atomic_write(statefile) as f:
+        json.dump(state, f)
+
+
+@contextlib.contextmanager
+def atomic_write(path, mode='w'):
+    """
+    Opens a temporary file next to **path** for writing that is
+    renamed to **path** once closed, so readers of **path** never
+    see a partially written file. If an error is raised the
+    temporary file is removed and **path** is left as is
+
+    :param path: file to write
+    :type path: str
+    :param mode: mode passed to :py:func:`open`
+    :type mode: str
+    :return: open temporary file
+    """
+    tmp_path = path + '.tmp'
+    try:
+        with open(tmp_path, mode) as f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class AccessLogFollower(object):
+    """
+    Tails an access log that is still being written to, like
+    ``tail -F``, passing each batch of complete new lines to a
+    :py:func:`_scan_news_requests` partial.
+
+    Rotation is detected by the inode of the path changing, in which
+    case the rest of the old file is read before switching to the new
+    file. Truncation, ie logrotate copytruncate, is detected by the
+    file becoming smaller than the current offset, in which case
+    reading restarts at the beginning.
+    """
+    def __init__(self, accesslog, scan_func):
+        """
+        Constructor
+
+        :param accesslog: Path to access log, read from the start
+        :type accesslog: str
+        :param scan_func: :py:func:`_scan_news_requests` with all but the
+                          first three arguments set
+        :type scan_func: :py:func:`functools.partial`
+        """
+        self.accesslog = accesslog
+        self._scan_func = scan_func
+        self._offset = 0
+        self._file = None
+        self._inode = None
+        self._remainder = b''
+
+    def close(self):
+        """
+        Closes the access log
+
+        :return: None
+        """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _open(self):
+        """
+        Opens the access log
+
+        :return: ``True`` if opened, ``False`` if the log does not exist
+        :rtype: bool
+        """
+        try:
+            self._file = open(self.accesslog, 'rb')
+        except FileNotFoundError:
+            return False
+        self._inode = os.fstat(self._file.fileno()).st_ino
+        self._offset = 0
+        self._remainder = b''
+        return True
+
+    def _read_new_lines(self, final=False):
+        """
+        Reads from the current offset to the end of the open file and
+        scans all complete lines
+
+        :param final: if ``True`` a trailing line without a newline is
+                      also scanned since no more data will be appended
+        :type final: bool
+        :return: number of bytes read
+        :rtype: int
+        """
+        bytes_read = 0
+        while True:
+            chunk = self._file.read(READ_BUFFER_SIZE)
+            if not chunk:
+                break
+            bytes_read += len(chunk)
+            buf = self._remainder + chunk
+            last_newline = buf.rfind(b'\n')
+            if last_newline == -1:
+                self._remainder = buf
+                continue
+            self._scan_func(buf, 0, last_newline + 1)
+            self._remainder = buf[last_newline + 1:]
+        self._offset += bytes_read
+        if final is True and len(self._remainder) > 0:
+            self._scan_func(self._remainder, 0, len(self._remainder))
+            self._remainder = b''
+        return bytes_read
+
+    def poll(self):
+        """
+        Scans lines appended to the access log since the last call
+
+        :return: number of bytes read
+        :rtype: int
+        """
+        if self._file is None:
+            if not self._open():
+                return 0
+        try:
+            stat_res = os.stat(self.accesslog)
+        except FileNotFoundError:
+            # rotated away and new log not created yet
+            return self._read_new_lines()
+
+        if stat_res.st_ino != self._inode:
+            LOGGER.info(self.accesslog + ' was rotated')
+            bytes_read = self._read_new_lines(final=True)
+            self.close()
+            if self._open():
+                bytes_read += self._read_new_lines()
+            return bytes_read
+
+        if stat_res.st_size < self._offset:
+            LOGGER.info(self.accesslog + ' was truncated')
+            self._file.seek(0)
+            self._offset = 0
+            self._remainder = b''
+        return self._read_new_lines()
+
+
+def follow_access_log(follower=None, start_dict=None, outdir=None,
+                      interval=60.0, skip_counts=None, unique_counter=None,
+                      resolution='day', bucket_dict=None, event_table=None,
+                      eventcache=None):
+    """
+    Polls **follower** for new lines, which adds starts to
+    **start_dict** and the other counts passed in, rewriting the CSV
+    files and summary.txt in **outdir** every **interval** seconds.
+    Runs until interrupted with Ctrl-C, at which point the files are
+    written one last time
+
+    :param follower: follower of active access log
+    :type follower: :py:class:`AccessLogFollower`
+    :param start_dict: dict **follower** adds starts to
+    :type start_dict: dict
+    :param outdir: Directory to write files to
+    :type outdir: str
+    :param interval: seconds between rewrites of files
+    :type interval: float
+    :param skip_counts: if set, dict **follower** adds bot lines
+                        skipped by rule to
+    :type skip_counts: dict
+    :param unique_counter: if set, counter **follower** adds clients to
+    :type unique_counter: :py:class:`UniqueClientCounter`
+    :param resolution: ``day``, ``hour`` or ``minute``
+    :type resolution: str
+    :param bucket_dict: if set, dict **follower** adds starts per
+                        time bucket to
+    :type bucket_dict: dict
+    :param event_table: if set, table **follower** adds requests to
+    :type event_table: :py:class:`StartEventTable`
+    :param eventcache: Path **event_table** is saved to
+    :type eventcache: str
+    :return: None
+    """
+    save_func = functools.partial(_save_followed_counts, start_dict,
+                                  outdir, skip_counts=skip_counts,
+                                  unique_counter=unique_counter,
+                                  resolution=resolution,
+                                  bucket_dict=bucket_dict,
+                                  event_table=event_table,
+                                  eventcache=eventcache)
+    LOGGER.info('Following ' + follower.accesslog)
+    next_write = time.monotonic() + interval
+    try:
+        while True:
+            follower.poll()
+            if time.monotonic() >= next_write:
+                save_func()
+                next_write = time.monotonic() + interval
+            time.sleep(min(FOLLOW_POLL_SECONDS, interval))
+    except KeyboardInterrupt:
+        LOGGER.info('Stopped following ' + follower.accesslog)
+    finally:
+        follower.close()
+    save_func()
+
+
+def _save_followed_counts(start_dict, outdir, skip_counts=None,
+                          unique_counter=None, resolution='day',
+                          bucket_dict=None, event_table=None,
+                          eventcache=None):
+    """
+    Writes starts_by_day.csv, starts_by_year.csv and summary.txt for
+    **start_dict** along with the CSV files for each of the other
+    counts that are set, and **event_table** if set.
+    Plots are not redrawn
+
+    :param start_dict: dict of starts by day
+    :type start_dict: dict
+    :param outdir: Directory to write files to
+    :type outdir: str
+    :param skip_counts: see :py:func:`follow_access_log`
+    :type skip_counts: dict
+    :param unique_counter: see :py:func:`follow_access_log`
+    :type unique_counter: :py:class:`UniqueClientCounter`
+    :param resolution: see :py:func:`follow_access_log`
+    :type resolution: str
+    :param bucket_dict: see :py:func:`follow_access_log`
+    :type bucket_dict: dict
+    :param event_table: see :py:func:`follow_access_log`
+    :type event_table: :py:class:`StartEventTable`
+    :param eventcache: see :py:func:`follow_access_log`
+    :type eventcache: str
+    :return: None
+    """
+    daily_counts = DailyCounts.from_dict(start_dict)
+    if len(daily_counts) == 0:
+        return
+    if skip_counts is not None:
+        save_bot_skip_counts(skip_counts, outdir=outdir)
+    save_starts_per_day(daily_counts, outdir=outdir)
+    save_starts_per_year(daily_counts, outdir=outdir)
+    save_summary(daily_counts, outdir=outdir)
+    if unique_counter is not None:
+        save_unique_clients(unique_counter, outdir=outdir, plots=False)
+    if bucket_dict is not None and len(bucket_dict) > 0:
+        save_starts_per_bucket(bucket_dict, resolution=resolution,
+                               outdir=outdir)
+    if event_table is not None:
+        event_table.save(eventcache)
 
 
 def _extract_day_month_year_from_log_entry(line):
@@ -141,34 +1575,359 @@ def _extract_day_month_year_hour_from_log_entry(line):
     return line[date_start_index+1:hour_end_index]
 
 
-def parse_access_log(accesslog=None, start_dict=None,
-                     date_extractor_func=_extract_day_month_year_from_log_entry):
+def get_compression_type(accesslog):
     """
+    Gets compression of **accesslog** by looking at
+    the leading bytes of the file.
 
-    :param accesslog:
-    :return:
+    :param accesslog: Path to access log
+    :type accesslog: str
+    :return: ``gzip``, ``bz2``, ``xz`` or ``None`` if not compressed
+    :rtype: str
     """
-    bot_skipped = 0
-    count = 0
-    with open(accesslog, 'r') as f:
-        for line in f:
+    with open(accesslog, 'rb') as f:
+        header = f.read(6)
+    for magic, name, file_class in COMPRESSION_MAGIC:
+        if header.startswith(magic):
+            return name
+    return None
 
-            if line.find('"GET /cytoscape-news/news.html ') == -1:
-                continue
 
-            # skip the bots
-            if 'bot' in line:
-                LOGGER.debug('Skipping line cause bot found in text: ' + line)
-                bot_skipped += 1
+def open_access_log(accesslog):
+    """
+    Opens **accesslog** for reading in binary mode with a large read
+    buffer. Logs compressed with gzip, bz2 or xz, as detected by
+    :py:func:`get_compression_type`, are decompressed as they are read.
+
+    :param accesslog: Path to access log
+    :type accesslog: str
+    :return: file object
+    :rtype: :py:class:`io.BufferedReader`
+    """
+    compression = get_compression_type(accesslog)
+    for magic, name, file_class in COMPRESSION_MAGIC:
+        if name == compression:
+            return io.BufferedReader(file_class(accesslog, mode='rb'),
+                                     buffer_size=READ_BUFFER_SIZE)
+    return open(accesslog, 'rb', buffering=READ_BUFFER_SIZE)
+
+
+def parse_access_log(accesslog=None, start_dict=None,
+                     date_extractor_func=None,
+                     start_offset=0, end_offset=None,
+                     bot_classifier=None, skip_counts=None,
+                     unique_counter=None, resolution='day',
+                     bucket_dict=None, event_table=None):
+    """
+    Counts requests for news.html in **accesslog** by day adding
+    them to **start_dict**
+
+    The log is scanned in binary mode, memory mapped if not compressed,
+    via :py:func:`_scan_news_requests` so only lines
+    containing a news.html request are ever decoded.
+
+    Only lines that begin within the byte range **start_offset** to
+    **end_offset** are parsed. A line that straddles **start_offset**
+    belongs to the previous range and is skipped, which lets a file be
+    split into ranges at arbitrary offsets without double counting.
+
+    Compressed logs are streamed via :py:func:`open_access_log` and
+    must be parsed in full since offsets into the compressed file do
+    not map to lines.
+
+    :param accesslog: Path to access log
+    :type accesslog: str
+    :param start_dict: dict to add starts to
+    :type start_dict: dict
+    :param date_extractor_func: function that takes a line as str and
+                                returns the key to count the start under.
+                                If ``None`` the Day/Month/Year is cut
+                                directly from the bytes of the line
+    :param start_offset: byte offset to start parsing at
+    :type start_offset: int
+    :param end_offset: byte offset to stop parsing at, ``None``
+                       means end of file
+    :type end_offset: int
+    :param bot_classifier: Used to skip requests from bots, if ``None``
+                           rules in :py:const:`DEFAULT_BOT_RULES` are used
+    :type bot_classifier: :py:class:`BotClassifier`
+    :param skip_counts: if set, number of lines skipped by each
+                        bot rule is added to this dict
+    :type skip_counts: dict
+    :param unique_counter: if set, clients making each request are
+                           added to this counter
+    :type unique_counter: :py:class:`UniqueClientCounter`
+    :param resolution: ``day``, ``hour`` or ``minute``. If not ``day``
+                       and **date_extractor_func** is ``None``, starts are
+                       also counted in **bucket_dict** by time bucket of
+                       this size
+    :type resolution: str
+    :param bucket_dict: dict to add starts per time bucket to. Keys are
+                        the start of the bucket as seconds since
+                        1970-01-01 00:00 in the time zone of the log
+                        (see :py:func:`get_epoch_bucket`)
+    :type bucket_dict: dict
+    :param event_table: if set, every request for news.html, including
+                        those from bots, is added to this table
+    :type event_table: :py:class:`StartEventTable`
+    :raises ValueError: if **accesslog** is compressed and a byte
+                        range is set
+    :return: number of bot lines skipped
+    :rtype: int
+    """
+    if bot_classifier is None:
+        bot_classifier = BotClassifier.from_config(DEFAULT_BOT_RULES)
+    if skip_counts is None:
+        skip_counts = {}
+    skipped_before = sum(skip_counts.values())
+    scan_func = functools.partial(_scan_news_requests, start_dict=start_dict,
+                                  date_extractor_func=date_extractor_func,
+                                  bot_classifier=bot_classifier,
+                                  skip_counts=skip_counts,
+                                  unique_counter=unique_counter,
+                                  resolution=resolution,
+                                  bucket_dict=bucket_dict,
+                                  event_table=event_table)
+
+    compression = get_compression_type(accesslog)
+    if compression is not None:
+        if start_offset > 0 or end_offset is not None:
+            raise ValueError('Byte ranges are not supported for '
+                             'compressed log: ' + accesslog)
+        _parse_compressed_access_log(accesslog, scan_func)
+        return sum(skip_counts.values()) - skipped_before
+
+    with open(accesslog, 'rb') as f:
+        file_size = os.fstat(f.fileno()).st_size
+        if file_size == 0 or start_offset >= file_size:
+            return 0
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            scan_start = start_offset
+            if start_offset > 0:
+                # the line containing start_offset - 1 belongs
+                # to the previous range
+                scan_start = mm.find(b'\n', start_offset - 1) + 1
+                if scan_start == 0:
+                    return 0
+            scan_end = len(mm)
+            if end_offset is not None and end_offset < len(mm):
+                # finish the line that straddles end_offset
+                scan_end = mm.find(b'\n', end_offset - 1) + 1
+                if scan_end == 0:
+                    scan_end = len(mm)
+            scan_func(mm, scan_start, scan_end)
+    return sum(skip_counts.values()) - skipped_before
+
+
+def _parse_compressed_access_log(accesslog, scan_func):
+    """
+    Counts requests for news.html in compressed **accesslog** by reading
+    decompressed data in large chunks that are cut at the last newline
+    and passed to **scan_func**
+
+    :param accesslog: Path to compressed access log
+    :type accesslog: str
+    :param scan_func: :py:func:`_scan_news_requests` with all but the
+                      first three arguments set
+    :type scan_func: :py:func:`functools.partial`
+    :return: None
+    """
+    remainder = b''
+    with open_access_log(accesslog) as f:
+        while True:
+            chunk = f.read(READ_BUFFER_SIZE)
+            if not chunk:
+                break
+            buf = remainder + chunk
+            last_newline = buf.rfind(b'\n')
+            if last_newline == -1:
+                remainder = buf
                 continue
+            scan_func(buf, 0, last_newline + 1)
+            remainder = buf[last_newline + 1:]
+    if len(remainder) > 0:
+        scan_func(remainder, 0, len(remainder))
 
-            date_str = date_extractor_func(line)
-            if date_str not in start_dict:
-                start_dict[date_str] = 0
-            start_dict[date_str] += 1
 
-            count += 1
-    return bot_skipped
+def _scan_news_requests(buf, scan_start, scan_end, start_dict=None,
+                        date_extractor_func=None, bot_classifier=None,
+                        skip_counts=None, unique_counter=None,
+                        resolution='day', bucket_dict=None,
+                        event_table=None):
+    """
+    Finds lines in **buf** between **scan_start** and **scan_end**
+    containing :py:const:`NEWS_REQUEST` using byte searches and counts
+    them in **start_dict**. Lines whose user agent is classified as a bot
+    by **bot_classifier** are skipped and tallied in **skip_counts**, as
+    are lines without a timestamp under :py:const:`NO_TIMESTAMP_SKIP`.
+
+    **scan_start** must be the start of a line and **scan_end** the end
+    of a line. Only matching lines are copied out of **buf**, and unless
+    **date_extractor_func** is set, the Day/Month/Year is cut from
+    the bytes between the first ``[`` and the ``:`` that follows it.
+
+    For **resolution** of ``hour`` or ``minute`` the timestamp is cut to
+    that resolution, ie ``03/Apr/2022:06`` like
+    :py:func:`_extract_day_month_year_hour_from_log_entry`, and each
+    distinct timestamp is converted to a time bucket via
+    :py:func:`get_epoch_bucket` once per call.
+
+    :param buf: access log data
+    :type buf: bytes or :py:class:`mmap.mmap`
+    :param scan_start: offset of first byte of first line to scan
+    :type scan_start: int
+    :param scan_end: offset just past last line to scan
+    :type scan_end: int
+    :param start_dict: dict to add starts to
+    :type start_dict: dict
+    :param date_extractor_func: see :py:func:`parse_access_log`
+    :param bot_classifier: Used to skip requests from bots
+    :type bot_classifier: :py:class:`BotClassifier`
+    :param skip_counts: number of lines skipped by each bot rule
+    :type skip_counts: dict
+    :param unique_counter: if set, clients making each request are
+                           added to this counter
+    :type unique_counter: :py:class:`UniqueClientCounter`
+    :param resolution: see :py:func:`parse_access_log`
+    :type resolution: str
+    :param bucket_dict: see :py:func:`parse_access_log`
+    :type bucket_dict: dict
+    :param event_table: see :py:func:`parse_access_log`
+    :type event_table: :py:class:`StartEventTable`
+    :return: None
+    """
+    raw_counts = {}
+    key_length = None
+    if resolution != 'day' and date_extractor_func is None:
+        key_length = RESOLUTION_KEY_LENGTH[resolution]
+    debug_enabled = LOGGER.isEnabledFor(logging.DEBUG)
+    pos = scan_start
+    while True:
+        match_index = buf.find(NEWS_REQUEST, pos, scan_end)
+        if match_index == -1:
+            break
+        line_start = buf.rfind(b'\n', scan_start, match_index) + 1
+        if line_start == 0:
+            line_start = scan_start
+        line_end = buf.find(b'\n', match_index, scan_end)
+        if line_end == -1:
+            line_end = scan_end
+        pos = line_end
+        line = buf[line_start:line_end]
+        date_start_index = line.find(b'[') + 1
+        if date_start_index == 0:
+            if debug_enabled:
+                LOGGER.debug('Skipping line without timestamp: ' +
+                             line.decode('utf-8', errors='replace'))
+            skip_counts[NO_TIMESTAMP_SKIP] = skip_counts.get(NO_TIMESTAMP_SKIP, 0) + 1
+            continue
+        if event_table is not None:
+            event_table.add(line, match_index - line_start)
+
+        # skip the bots
+        bot_rule = bot_classifier.classify(extract_user_agent(line))
+        if bot_rule is not None:
+            if debug_enabled:
+                LOGGER.debug('Skipping line matching bot rule ' + bot_rule +
+                             ': ' + line.decode('utf-8', errors='replace'))
+            skip_counts[bot_rule] = skip_counts.get(bot_rule, 0) + 1
+            continue
+
+        if date_extractor_func is not None:
+            date_key = date_extractor_func(line.decode('utf-8',
+                                                       errors='replace'))
+        elif key_length is None:
+            date_key = line[date_start_index:line.find(b':', date_start_index)]
+        else:
+            date_key = line[date_start_index:date_start_index + key_length]
+        raw_counts[date_key] = raw_counts.get(date_key, 0) + 1
+        if unique_counter is not None:
+            if key_length is not None:
+                date_key = date_key[:date_key.find(b':')]
+            if isinstance(date_key, bytes):
+                date_key = date_key.decode('ascii', errors='replace')
+            unique_counter.add(date_key, line)
+
+    for date_key, count in raw_counts.items():
+        if key_length is not None:
+            if bucket_dict is not None:
+                bucket = get_epoch_bucket(date_key, resolution=resolution)
+                bucket_dict[bucket] = bucket_dict.get(bucket, 0) + count
+            date_key = date_key[:date_key.find(b':')]
+        if isinstance(date_key, bytes):
+            date_key = date_key.decode('ascii', errors='replace')
+        start_dict[date_key] = start_dict.get(date_key, 0) + count
+
+
+def get_epoch_bucket(timestamp, resolution='day'):
+    """
+    Converts access log **timestamp**, ie ``03/Apr/2022:06:25``, to the
+    start of the time bucket of size **resolution** that it falls in as
+    seconds since 1970-01-01 00:00. The time zone offset in the log is
+    ignored so buckets line up with the local time of the server.
+
+    :param timestamp: access log timestamp cut to at least **resolution**
+    :type timestamp: bytes
+    :param resolution: ``day``, ``hour`` or ``minute``
+    :type resolution: str
+    :return: start of bucket in seconds since 1970-01-01 00:00
+    :rtype: int
+    """
+    seconds = (get_day_ordinal(timestamp) - EPOCH_ORDINAL) * 86400
+    if resolution != 'day':
+        seconds += int(timestamp[12:14]) * 3600
+    if resolution == 'minute':
+        seconds += int(timestamp[15:17]) * 60
+    return seconds
+
+
+def format_epoch_bucket(bucket, resolution='day'):
+    """
+    Converts time **bucket** from :py:func:`get_epoch_bucket` back to
+    the access log timestamp format, ie ``03/Apr/2022:06``
+
+    :param bucket: start of bucket in seconds since 1970-01-01 00:00
+    :type bucket: int
+    :param resolution: ``day``, ``hour`` or ``minute``
+    :type resolution: str
+    :return: timestamp cut to **resolution**
+    :rtype: str
+    """
+    bucket_day = date.fromordinal(EPOCH_ORDINAL + bucket // 86400)
+    seconds_into_day = bucket % 86400
+    timestamp = '{:02d}/{}/{:04d}:{:02d}:{:02d}'.format(bucket_day.day,
+                                                       MONTH_NAMES[bucket_day.month],
+                                                       bucket_day.year,
+                                                       seconds_into_day // 3600,
+                                                       seconds_into_day % 3600 // 60)
+    return timestamp[0:RESOLUTION_KEY_LENGTH[resolution]]
+
+
+def is_event_table_file(path):
+    """
+    :param path: path passed as input to this script
+    :type path: str
+    :return: ``True`` if **path** is a file written by
+             :py:func:`StartEventTable.save`
+    :rtype: bool
+    """
+    return os.path.isfile(path) and (path.endswith('.parquet') or
+                                     path.endswith('.npz'))
+
+
+def _import_pyarrow():
+    """
+    Imports pyarrow, which is only needed for Parquet event tables
+
+    :return: pyarrow module with :py:mod:`pyarrow.parquet` loaded or
+             ``None`` if pyarrow is not installed
+    """
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:  # pragma: no cover
+        return None
+    return pyarrow
 
 
 def load_starts_csv(inputcsv=None, start_dict=None):
@@ -176,7 +1935,8 @@ def load_starts_csv(inputcsv=None, start_dict=None):
 
     :param inputcsv:
     :param start_dict:
-    :return:
+    :return: (start_dict, counts for each day)
+    :rtype: tuple
     """
     with open(inputcsv, 'r') as f:
         c_reader = csv.reader(f, delimiter=',', )
@@ -184,124 +1944,138 @@ def load_starts_csv(inputcsv=None, start_dict=None):
             if '/' not in row[0]:
                 continue
             start_dict[row[0]] = int(row[1])
-    date_list = get_sorted_date_list(start_dict)
-    return start_dict, date_list
+    return start_dict, DailyCounts.from_dict(start_dict)
 
 
-def plot_starts_by_day(start_dict=None, date_list=None,
-                       outdir=None):
+def plot_starts_by_day(daily_counts=None,
+                       outdir=None, name='starts', label='Starts',
+                       write_summary=True):
     """
-    Plot starts by day saving the file named starts_by_day.svg to
+    Plot starts by day saving the file named starts_per_day.svg to
     directory specified by **outdir**
 
-    :param start_dict: starts for each day
-    :type start_dict: dict
-    :param date_list: Ordered start dates. Each entry is a str
-    :type date_list: list
+    :param daily_counts: starts for each day
+    :type daily_counts: :py:class:`DailyCounts`
     :param outdir: Directory to save plot to
     :type outdir: str
+    :param name: prefix of file name, ie <name>_per_day.svg
+    :type name: str
+    :param label: what is being counted, used in title and axis label
+    :type label: str
+    :param write_summary: If ``True`` write total to summary.txt
+    :type write_summary: bool
     :return:
     """
-    total_starts = 0
-    start_list = []
-    for key in date_list:
-        total_starts += start_dict[key]
-        start_list.append(start_dict[key])
-
-    # setup labels to print year at 01/Jan position in date_list
-    x_pos = []
-    x_labels = []
-    counter = 0
-    for entry in date_list:
-        if entry.startswith('01/Jan'):
-            x_labels.append(entry[entry.rindex('/')+1:])
-            x_pos.append(counter)
-        counter += 1
+    plotting.plot_daily_counts(daily_counts,
+                               os.path.join(outdir, name + '_per_day.svg'),
+                               label=label)
+    if write_summary is not True:
+        return
+    save_summary(daily_counts, outdir=outdir)
 
-    fig, ax = plt.subplots()
-    print(x_labels)
-    ax.plot(date_list, start_list)
-    ax.set_xticks(x_pos)
-    ax.set_xticklabels(x_labels, rotation=-45)
-    ax.set_xlabel('Year', fontweight='bold')
-    ax.set_ylabel('# Starts', fontweight='bold')
 
-    ax.set_title('Total Starts by Day (' +
-                 '{:,}'.format(total_starts) + ')',
-                 fontweight='bold')
+def save_summary(daily_counts=None, outdir=None):
+    """
+    Writes total starts and date range to summary.txt
+    in **outdir** directory
 
-    fig.patches.extend([plt.Rectangle((0, 0), 1, 1,
-                                      fill=False, color='black', alpha=1,
-                                      zorder=1000,
-                                      transform=fig.transFigure, figure=fig,
-                                      linewidth=2.0)])
-    fig.set_tight_layout(True)
-    plt.savefig(outdir + '/starts_per_day.svg')
-    plt.close()
-    with open(os.path.join(outdir, 'summary.txt'), 'w') as f:
-        f.write('Total Starts: ' + '{:,}'.format(total_starts) + ' (' +
-                date_list[0] + ' - ' + date_list[-1] + ')\n')
+    :param daily_counts: starts for each day
+    :type daily_counts: :py:class:`DailyCounts`
+    :param outdir: Directory to save file
+    :type outdir: str
+    :return:
+    """
+    with atomic_write(os.path.join(outdir, 'summary.txt')) as f:
+        f.write('Total Starts: ' + '{:,}'.format(daily_counts.get_total()) +
+                ' (' + daily_counts.get_date_label(0) + ' - ' +
+                daily_counts.get_date_label(-1) + ')\n')
 
 
-def get_sorted_date_list_with_hour(start_dict=None, format='%d/%b/%Y:%H'):
+def save_starts_per_day(daily_counts=None,
+                        outdir=None, name='starts', label='Starts'):
     """
-    Get dates from **start_dict** in ascending order
-    as list
+    Takes **daily_counts** and saves a file named starts_by_day.csv
+    to **outdir** directory. Every day from the first to the last
+    day is written, days without starts are written with a 0
 
-    :param start_dict: dict of starts where key is date and value
-                       is number of starts
-    :type start_dict: dict
-    :return: dates as str in ascending order in a list
-    :rtype: list
-    """
-    return get_sorted_date_list(start_dict=start_dict, format=format)
+    Example of output:
 
-def get_sorted_date_list(start_dict=None, format='%d/%b/%Y'):
-    """
-    Get dates from **start_dict** in ascending order
-    as list
+    .. code-block:: python
 
-    :param start_dict: dict of starts where key is date and value
-                       is number of starts
-    :type start_dict: dict
-    :return: dates as str in ascending order in a list
-    :rtype: list
+        Date,NumberOfStarts
+        01/Jan/2014,234
+
+    :param daily_counts: starts for each day
+    :type daily_counts: :py:class:`DailyCounts`
+    :param outdir: Directory to save file
+    :type outdir: str
+    :param name: prefix of file name, ie <name>_by_day.csv
+    :type name: str
+    :param label: what is being counted, used in header
+                  ie NumberOf<label>
+    :type label: str
+    :return:
     """
-    date_list = list(start_dict.keys())
-    date_list.sort(key=lambda xdate: datetime.strptime(xdate, format))
-    return date_list
+    with atomic_write(os.path.join(outdir, name + '_by_day.csv')) as f:
+        f.write('Date,NumberOf' + label.replace(' ', '') + '\n')
+        f.writelines(day + ',' + str(count) + '\n'
+                     for day, count in zip(daily_counts.get_date_labels(),
+                                           daily_counts.counts.tolist()))
 
 
-def save_starts_per_day(start_dict=None,
-                        date_list=None,
-                        outdir=None):
+def save_bot_skip_counts(skip_counts=None, outdir=None):
     """
-    Takes **start_dict** and saves a file named starts_by_day.csv
+    Takes **skip_counts** and saves a file named bots_skipped.csv
     to **outdir** directory.
 
     Example of output:
 
     .. code-block:: python
 
-        Date,NumberOfStarts
-        01/Jan/2014,234
+        Rule,LinesSkipped
+        bot,1234
 
-    :param start_dict: dict of starts by day
-    :type start_dict: dict
+    Lines skipped because they have no timestamp are listed
+    under :py:const:`NO_TIMESTAMP_SKIP`
+
+    :param skip_counts: number of lines skipped by each bot rule
+    :type skip_counts: dict
     :param outdir: Directory to save file
     :type outdir: str
     :return:
     """
-    with open(os.path.join(outdir, 'starts_by_day.csv'), 'w') as f:
-        f.write('Date,NumberOfStarts\n')
-        for key in date_list:
-            f.write(str(key) + ',' + str(start_dict[key]) + '\n')
+    with open(os.path.join(outdir, 'bots_skipped.csv'), 'w') as f:
+        f.write('Rule,LinesSkipped\n')
+        for rule in sorted(skip_counts.keys()):
+            f.write(rule + ',' + str(skip_counts[rule]) + '\n')
 
 
-def save_starts_per_year(start_dict=None,
-                         outdir=None):
+def get_counts_per_year(daily_counts=None, year_dict=None):
     """
-    Takes **start_dict** and saves a file named starts_by_day.csv
+    Gets total for each year from **daily_counts** unless
+    **year_dict** is set in which case its values are used
+
+    :param daily_counts: counts for each day
+    :type daily_counts: :py:class:`DailyCounts`
+    :param year_dict: if set, dict where key is year as str and value
+                      is count for that year
+    :type year_dict: dict
+    :return: (years in ascending order, count for each year)
+    :rtype: tuple
+    """
+    if year_dict is None:
+        return daily_counts.get_counts_per_year()
+    years = np.array(sorted(int(year) for year in year_dict), dtype=np.int64)
+    totals = np.array([year_dict[str(year)] for year in years.tolist()],
+                      dtype=np.int64)
+    return years, totals
+
+
+def save_starts_per_year(daily_counts=None,
+                         outdir=None, year_dict=None,
+                         name='starts', label='Starts'):
+    """
+    Takes **daily_counts** and saves a file named starts_by_year.csv
     to **outdir** directory.
 
     Example of output:
@@ -311,71 +2085,71 @@ def save_starts_per_year(start_dict=None,
         Year,NumberOfStarts
         2014,250
 
-    :param start_dict: dict of starts by day
-    :type start_dict: dict
+    :param daily_counts: starts for each day
+    :type daily_counts: :py:class:`DailyCounts`
     :param outdir: Directory to save file
     :type outdir: str
+    :param year_dict: if set, used as the count for each year instead of
+                      summing **daily_counts**. Needed for counts, such as
+                      distinct clients, that cannot be summed
+    :type year_dict: dict
+    :param name: prefix of file name, ie <name>_by_year.csv
+    :type name: str
+    :param label: what is being counted, used in header
+                  ie NumberOf<label>
+    :type label: str
     :return:
     """
+    years, totals = get_counts_per_year(daily_counts, year_dict=year_dict)
 
-    starts_per_year = {}
-    for key in start_dict:
-        year = key[key.rindex('/') + 1:]
-        if year not in starts_per_year:
-            starts_per_year[year] = 0
-        starts_per_year[year] += start_dict[key]
-
-    year_list = list(starts_per_year.keys())
-    year_list.sort()
-
-    with open(os.path.join(outdir, 'starts_by_year.csv'), 'w') as f:
-        f.write('Year,NumberOfStarts\n')
-        for key in year_list:
-            f.write(str(key) + ',' + str(starts_per_year[key]) + '\n')
+    with open(os.path.join(outdir, name + '_by_year.csv'), 'w') as f:
+        f.write('Year,NumberOf' + label.replace(' ', '') + '\n')
+        f.writelines(str(year) + ',' + str(total) + '\n'
+                     for year, total in zip(years.tolist(), totals.tolist()))
 
 
-def plot_starts_by_year(start_dict=None,
+def plot_starts_by_year(daily_counts=None,
                         outdir=None,
-                        plot_values=False):
+                        plot_values=False, year_dict=None,
+                        name='starts', label='Starts'):
     """
-    Plot starts by year saving output to file starts_by_year.svg
+    Plot starts by year saving output to file starts_per_year.svg
     under **outdir** directory
 
-    :param start_dict: dict of starts by day
-    :type start_dict: dict
+    :param daily_counts: starts for each day
+    :type daily_counts: :py:class:`DailyCounts`
     :param outdir: Directory to save starts by year
     :type outdir: str
     :param plot_values: If ``True`` the values of each bar will be output
                         along with percent increase from previous year
     :type plot_values: bool
+    :param year_dict: if set, used as the count for each year instead of
+                      summing **daily_counts**
+    :type year_dict: dict
+    :param name: prefix of file name, ie <name>_per_year.svg
+    :type name: str
+    :param label: what is being counted, used in title and axis label
+    :type label: str
     :return:
     """
-    total_starts = 0
-    starts_per_year = {}
-    for key in start_dict:
-        year = key[key.rindex('/')+1:]
-        if year not in starts_per_year:
-            starts_per_year[year] = 0
-        starts_per_year[year] += start_dict[key]
-        total_starts += start_dict[key]
-
-    year_list = list(starts_per_year.keys())
-    year_list.sort()
-    year_list = year_list[1:-1]
+    import matplotlib.pyplot as plt
+
+    years, totals = get_counts_per_year(daily_counts, year_dict=year_dict)
+    total_starts = int(totals.sum())
+
+    # first and last year are partial so leave them off
+    year_list = [str(year) for year in years[1:-1].tolist()]
+    starts_list = totals[1:-1].tolist()
     x_pos = np.arange(len(year_list))
     fig, ax = plt.subplots()
 
-    starts_list = []
-    for y in year_list:
-        starts_list.append(starts_per_year[y])
-
     ax.bar(x_pos, starts_list, align='center')
     ax.set_xticks(x_pos)
     ax.set_xticklabels(year_list, rotation=-45)
     ax.set_xlabel('Year', fontweight='bold')
-    ax.set_ylabel('# Starts', fontweight='bold')
+    ax.set_ylabel('# ' + label, fontweight='bold')
 
-    ax.set_title('Total Starts by Year (' +
+    ax.set_title('Total ' + label + ' by Year (' +
                  '{:,}'.format(total_starts) + ')',
                  fontweight='bold')
 
@@ -395,8 +2169,134 @@ def plot_starts_by_year(start_dict=None,
                                       transform=fig.transFigure, figure=fig,
                                       linewidth=2.0)])
     fig.set_tight_layout(True)
-    plt.savefig(outdir + '/starts_per_year.svg')
-    plt.close()
+    plotting.save_figure(fig, os.path.join(outdir, name + '_per_year.svg'))
+
+
+def save_starts_per_bucket(bucket_dict=None, resolution='hour',
+                           outdir=None):
+    """
+    Takes **bucket_dict** and saves a file named
+    starts_by_<resolution>.csv to **outdir** directory. Rows are
+    ordered by sorting the integer time buckets so no timestamps
+    need to be parsed.
+
+    Example of output:
+
+    .. code-block:: python
+
+        Time,NumberOfStarts
+        01/Jan/2014:00,12
+
+    :param bucket_dict: starts per time bucket as returned
+                        via :py:func:`process_access_logs`
+    :type bucket_dict: dict
+    :param resolution: ``hour`` or ``minute``
+    :type resolution: str
+    :param outdir: Directory to save file
+    :type outdir: str
+    :return:
+    """
+    with open(os.path.join(outdir, 'starts_by_' + resolution + '.csv'), 'w') as f:
+        f.write('Time,NumberOfStarts\n')
+        for bucket in sorted(bucket_dict.keys()):
+            f.write(format_epoch_bucket(bucket, resolution=resolution) +
+                    ',' + str(bucket_dict[bucket]) + '\n')
+
+
+def get_starts_heatmap(bucket_dict=None):
+    """
+    Gets average number of starts for each hour of the day on each
+    day of the week over the days covered by **bucket_dict**
+
+    :param bucket_dict: starts per hour or minute time bucket
+    :type bucket_dict: dict
+    :return: 7 x 24 array where row 0 is Monday and column 0 is
+             the hour starting at midnight
+    :rtype: :py:class:`numpy.ndarray`
+    """
+    buckets = np.fromiter(bucket_dict.keys(), dtype=np.int64,
+                          count=len(bucket_dict))
+    counts = np.fromiter(bucket_dict.values(), dtype=np.int64,
+                         count=len(bucket_dict))
+    days = buckets // 86400
+    # 1970-01-01 was a Thursday
+    day_of_week = (days + 3) % 7
+    hour_of_day = (buckets % 86400) // 3600
+    totals = np.zeros((7, 24), dtype=np.float64)
+    np.add.at(totals, (day_of_week, hour_of_day), counts)
+
+    # number of times each day of the week occurs in range
+    all_days = np.arange(days.min(), days.max() + 1)
+    day_counts = np.bincount((all_days + 3) % 7, minlength=7)
+    return totals / np.maximum(day_counts, 1)[:, np.newaxis]
+
+
+def plot_starts_heatmap(bucket_dict=None, outdir=None):
+    """
+    Plot heat map of average starts per hour for each hour of the day
+    and day of the week saving output to file starts_heatmap.svg
+    under **outdir** directory
+
+    :param bucket_dict: starts per hour or minute time bucket
+    :type bucket_dict: dict
+    :param outdir: Directory to save plot to
+    :type outdir: str
+    :return:
+    """
+    import matplotlib.pyplot as plt
+
+    heatmap = get_starts_heatmap(bucket_dict)
+    fig, ax = plt.subplots()
+    image = ax.imshow(heatmap, aspect='auto', cmap='viridis')
+    ax.set_xticks(np.arange(0, 24, 2))
+    ax.set_xticklabels([str(hour) for hour in range(0, 24, 2)])
+    ax.set_yticks(np.arange(7))
+    ax.set_yticklabels(['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun'])
+    ax.set_xlabel('Hour of day', fontweight='bold')
+    ax.set_ylabel('Day of week', fontweight='bold')
+    colorbar = fig.colorbar(image, ax=ax)
+    colorbar.set_label('Average # Starts per hour', fontweight='bold')
+    ax.set_title('Starts by Hour of Day (peak ' +
+                 '{:,.1f}'.format(heatmap.max()) + ' per hour)',
+                 fontweight='bold')
+    fig.patches.extend([plt.Rectangle((0, 0), 1, 1,
+                                      fill=False, color='black', alpha=1,
+                                      zorder=1000,
+                                      transform=fig.transFigure, figure=fig,
+                                      linewidth=2.0)])
+    fig.set_tight_layout(True)
+    plotting.save_figure(fig, os.path.join(outdir, 'starts_heatmap.svg'))
+
+
+def save_unique_clients(unique_counter=None, outdir=None, plots=True):
+    """
+    Writes CSV files and plots of distinct clients per day and
+    per year from **unique_counter** using the same functions
+    used for starts. Files are prefixed with ``unique_clients``
+
+    :param unique_counter: counter of distinct clients
+    :type unique_counter: :py:class:`UniqueClientCounter`
+    :param outdir: Directory to save files
+    :type outdir: str
+    :param plots: If ``False`` only the CSV files are written
+    :type plots: bool
+    :return:
+    """
+    name = 'unique_clients'
+    label = 'Unique Clients'
+    client_dict = unique_counter.get_counts_per_day()
+    year_dict = unique_counter.get_counts_per_year()
+    daily_counts = DailyCounts.from_dict(client_dict)
+    save_starts_per_day(daily_counts, outdir=outdir,
+                        name=name, label=label)
+    save_starts_per_year(daily_counts, outdir=outdir, year_dict=year_dict,
+                         name=name, label=label)
+    if plots is not True:
+        return
+    plot_starts_by_year(daily_counts, outdir=outdir, year_dict=year_dict,
+                        name=name, label=label)
+    plot_starts_by_day(daily_counts, outdir=outdir,
+                       name=name, label=label, write_summary=False)
 
 
 def main(args):
@@ -412,28 +2312,156 @@ def main(args):
     """
     theargs = _parse_arguments(desc, args[1:])
 
+    if theargs.eventcache is not None and theargs.incremental is True:
+        sys.stderr.write('--eventcache cannot be combined with '
+                         '--incremental\n')
+        return 1
+    for path in [theargs.eventcache, theargs.inputdir]:
+        if path is not None and path.endswith('.parquet') and\
+                _import_pyarrow() is None:
+            sys.stderr.write('pyarrow must be installed to use Parquet '
+                             'event table: ' + path + '\n')
+            return 1
+
     if not os.path.isdir(theargs.outdir):
         os.makedirs(theargs.outdir, mode=0o755)
     # setup logging
     _setup_logging(theargs)
 
-    matplotlib.use(theargs.matplotlibgui)
-
-    if os.path.isdir(theargs.inputdir):
-        start_dict, date_list = process_access_logs(theargs.inputdir,
-                                                    start_dict={})
-        save_starts_per_day(start_dict, date_list=date_list,
-                            outdir=theargs.outdir)
+    if theargs.no_plots is False:
+        import matplotlib
+        matplotlib.use(theargs.matplotlibgui)
+
+    profiler = profiling.StageProfiler.from_args(theargs, theargs.outdir)
+    from_events = is_event_table_file(theargs.inputdir)
+    from_logs = os.path.isdir(theargs.inputdir) or from_events
+    bot_classifier = BotClassifier.from_config(theargs.botrules)
+    start_dict = {}
+    skip_counts = {}
+    unique_counter = None
+    bucket_dict = None
+    event_table = None
+    follower = None
+    exclude = None
+    if theargs.follow is not None:
+        exclude = [os.path.abspath(theargs.follow)]
+
+    if from_logs:
+        state = None
+        statefile = os.path.join(theargs.outdir, STATE_FILE)
+        settings = {'bot_rules': bot_classifier.rules}
+        if theargs.unique_by is not None:
+            unique_counter = UniqueClientCounter(unique_by=theargs.unique_by,
+                                                 approximate=theargs.unique_mode == 'approx',
+                                                 precision=theargs.hll_precision)
+            settings['unique'] = unique_counter.get_settings()
+        if theargs.resolution != 'day':
+            bucket_dict = {}
+            settings['resolution'] = theargs.resolution
+        if theargs.incremental is True and from_events is False:
+            with profiler.stage('load_start_state'):
+                state = load_start_state(statefile, settings=settings)
+        if from_events is True:
+            with profiler.stage('load_event_table') as stage:
+                input_events = StartEventTable.load(theargs.inputdir)
+                stage['items'] = len(input_events)
+            with profiler.stage('count_events') as stage:
+                input_events.get_counts(start_dict=start_dict,
+                                        bot_classifier=bot_classifier,
+                                        skip_counts=skip_counts,
+                                        unique_counter=unique_counter,
+                                        resolution=theargs.resolution,
+                                        bucket_dict=bucket_dict)
+                stage['items'] = len(input_events)
+        else:
+            if theargs.eventcache is not None:
+                event_table = StartEventTable()
+            with profiler.stage('process_access_logs') as stage:
+                process_access_logs(theargs.inputdir,
+                                    start_dict=start_dict,
+                                    workers=theargs.workers,
+                                    chunk_bytes=theargs.chunk_mb * 1024 * 1024,
+                                    state=state,
+                                    bot_classifier=bot_classifier,
+                                    skip_counts=skip_counts,
+                                    unique_counter=unique_counter,
+                                    resolution=theargs.resolution,
+                                    bucket_dict=bucket_dict,
+                                    event_table=event_table,
+                                    exclude=exclude)
+                stage['items'] = sum(start_dict.values()) + sum(skip_counts.values())
+        if state is not None:
+            with profiler.stage('save_start_state'):
+                save_start_state(statefile, state)
+    else:
+        with profiler.stage('load_starts_csv') as stage:
+            load_starts_csv(theargs.inputdir, start_dict=start_dict)
+            stage['items'] = len(start_dict)
+
+    if theargs.follow is not None:
+        follower = AccessLogFollower(exclude[0],
+                                     functools.partial(_scan_news_requests,
+                                                       start_dict=start_dict,
+                                                       bot_classifier=bot_classifier,
+                                                       skip_counts=skip_counts,
+                                                       unique_counter=unique_counter,
+                                                       resolution=theargs.resolution,
+                                                       bucket_dict=bucket_dict,
+                                                       event_table=event_table))
+        # count what is already in the followed log
+        with profiler.stage('read_followed_log'):
+            follower.poll()
+    if event_table is not None:
+        with profiler.stage('save_event_table') as stage:
+            event_table.save(theargs.eventcache)
+            stage['items'] = len(event_table)
+    with profiler.stage('aggregate_days') as stage:
+        daily_counts = DailyCounts.from_dict(start_dict)
+        stage['items'] = len(start_dict)
+    if from_logs:
+        with profiler.stage('write_csv'):
+            save_bot_skip_counts(skip_counts, outdir=theargs.outdir)
+            save_starts_per_day(daily_counts,
+                                outdir=theargs.outdir)
+        if unique_counter is not None:
+            with profiler.stage('save_unique_clients'):
+                save_unique_clients(unique_counter, outdir=theargs.outdir,
+                                    plots=not theargs.no_plots)
+        if bucket_dict is not None and len(bucket_dict) > 0:
+            with profiler.stage('save_starts_per_bucket') as stage:
+                save_starts_per_bucket(bucket_dict, resolution=theargs.resolution,
+                                       outdir=theargs.outdir)
+                stage['items'] = len(bucket_dict)
+            if theargs.no_plots is False:
+                with profiler.stage('plot_starts_heatmap'):
+                    plot_starts_heatmap(bucket_dict, outdir=theargs.outdir)
+
+    with profiler.stage('save_starts_per_year'):
+        save_starts_per_year(daily_counts,
+                             outdir=theargs.outdir)
+    if theargs.no_plots is True:
+        with profiler.stage('save_summary'):
+            save_summary(daily_counts, outdir=theargs.outdir)
     else:
-        start_dict, date_list = load_starts_csv(theargs.inputdir,
-                                                start_dict={})
-
-    save_starts_per_year(start_dict,
-                         outdir=theargs.outdir)
-    plot_starts_by_year(start_dict,
-                        outdir=theargs.outdir)
-    plot_starts_by_day(start_dict, date_list=date_list,
-                       outdir=theargs.outdir)
+        with profiler.stage('plot_starts_by_year'):
+            plot_starts_by_year(daily_counts,
+                                outdir=theargs.outdir)
+        with profiler.stage('plot_starts_by_day') as stage:
+            plot_starts_by_day(daily_counts,
+                               outdir=theargs.outdir)
+            stage['items'] = len(daily_counts)
+    profiler.write_report()
+
+    if follower is not None:
+        follow_access_log(follower, start_dict=start_dict,
+                          outdir=theargs.outdir,
+                          interval=theargs.follow_interval,
+                          skip_counts=skip_counts if from_logs else None,
+                          unique_counter=unique_counter,
+                          resolution=theargs.resolution,
+                          bucket_dict=bucket_dict,
+                          event_table=event_table,
+                          eventcache=theargs.eventcache)
 
 
 if __name__ == '__main__':  # pragma: no cover
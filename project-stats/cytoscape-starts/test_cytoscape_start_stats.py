@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+
+"""
+Tests for counting starts in access logs with
+:py:func:`cytoscape_start_stats.process_access_logs`, run with::
+
+    python -m pytest project-stats/cytoscape-starts
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import cytoscape_start_stats
+
+
+def _make_line(day, user_agent):
+    return ('10.0.0.1 - - [' + day + '/Jun/2022:06:00:00 -0700] '
+            '"GET /cytoscape-news/news.html HTTP/1.1" 200 512 "-" "' +
+            user_agent + '"\n').encode('utf-8')
+
+
+def _count(accessdir, state=None):
+    start_dict = {}
+    skip_counts = {}
+    cytoscape_start_stats.process_access_logs(str(accessdir),
+                                              start_dict=start_dict,
+                                              state=state,
+                                              skip_counts=skip_counts)
+    return start_dict, skip_counts
+
+
+def test_incremental_run_waits_for_line_being_written(tmp_path):
+    accessdir = tmp_path / 'logs'
+    accessdir.mkdir()
+    accesslog = accessdir / 'access.log'
+    last_lines = [_make_line('02', 'Java/11.0.6'),
+                  _make_line('02', 'Googlebot/2.1'),
+                  _make_line('03', 'Java/11.0.6')]
+    data = _make_line('01', 'Java/11.0.6') + b''.join(last_lines)
+    split_points = [len(data) - len(last_lines[2]) - 20,
+                    len(data) - len(last_lines[2]) - 100,
+                    len(data) - 10]
+
+    for split_point in split_points:
+        accesslog.write_bytes(data[:split_point])
+        state = {'files': {}}
+        _count(accessdir, state=state)
+        entry = state['files'][str(accesslog)]
+        assert entry['offset'] == data.rfind(b'\n', 0, split_point) + 1
+
+        # rest of the line is written before the next run
+        accesslog.write_bytes(data)
+        assert _count(accessdir, state=state) == _count(accessdir)
+        assert state['files'][str(accesslog)]['offset'] == len(data)
@@ -4,12 +4,21 @@ import os
 import sys
 import argparse
 import logging
-from datetime import datetime
+import re
+import io
+import csv
 
 import json
 
-import matplotlib
-import matplotlib.pyplot as plt
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir))
+from statscommon import plotting
+from statscommon import profiling
+from statscommon.lazyimport import lazy_import
+from statscommon.timeseries import DailyCounts, DailyCountsTable
+from statscommon.timeseries import EPOCH_ORDINAL, ISO_DAY, get_year_ticks
+
+np = lazy_import('numpy')
 
 
 class Formatter(argparse.ArgumentDefaultsHelpFormatter,
@@ -25,6 +34,53 @@ LOGGER = logging.getLogger(__name__)
 
 LOGGER.info('Starting program')
 
+TOTAL_SERIES = 'Total'
+"""
+Key of downloads of all apps in timeline JSON, every other
+key holding a list is taken to be the downloads of one app
+"""
+
+APP_PERIODS = ['day', 'month', 'year']
+"""
+Periods written to app_downloads_by_period.csv
+"""
+
+CSV_LINE_TERMINATOR = '\r\n'
+"""
+Line terminator written by :py:mod:`csv` by default
+"""
+
+GROWTH_WINDOW_DAYS = 365
+"""
+Number of days compared for growth in app_downloads_ranking.csv
+"""
+
+ROLLING_WINDOWS = [7, 30, 365]
+"""
+Number of days summed and averaged over in app_downloads_rolling.csv
+"""
+
+STREAM_CHUNK_SIZE = 1024 * 1024
+"""
+Number of characters read at a time when --stream is set
+"""
+
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+"""
+Whitespace allowed between JSON tokens
+"""
+
+ARRAY_END = re.compile(r'\][ \t\n\r]*\]')
+"""
+End of an element that is an array followed by the end of
+the array it is in
+"""
+
+NUMBER_CHARS = '0123456789.eE+-'
+"""
+Characters that can continue a JSON number
+"""
+
 
 def _parse_arguments(desc, args):
     """
@@ -44,6 +100,40 @@ def _parse_arguments(desc, args):
                                        'it does not exist')
     parser.add_argument('--matplotlibgui', default='svg',
                         help='Library to use for plotting')
+    parser.add_argument('--stream', action='store_true',
+                        help='If set, the JSON file is read a chunk at a '
+                             'time and each date, downloads pair is added '
+                             'to the daily totals as it is read instead of '
+                             'loading the whole file. Use for large '
+                             'timeline exports')
+    parser.add_argument('--baseline',
+                        help='Earlier timeline JSON file to compare with. '
+                             'If set, days added, removed or revised since '
+                             'this snapshot are written to '
+                             'baseline_diff.csv along with a summary in '
+                             'baseline_diff.txt')
+    parser.add_argument('--top', type=int, default=12,
+                        help='Number of apps, by total downloads, drawn '
+                             'in top_apps_per_month.svg when the JSON '
+                             'file has downloads per app')
+    parser.add_argument('--rolling-mean', type=int, default=0,
+                        help='If greater than 0, the mean downloads over '
+                             'this many days is drawn over the downloads '
+                             'per day in app_downloads_per_day.svg, '
+                             'ie 30')
+    parser.add_argument('--max-points', type=int, default=0,
+                        help='If greater than 0, each line in '
+                             'app_downloads_per_day.svg is drawn with at '
+                             'most this many points, keeping the lowest and '
+                             'highest day of each stretch of days, which '
+                             'makes a much smaller svg file. 0 draws '
+                             'every day')
+    parser.add_argument('--no-plots', action='store_true',
+                        help='If set, only text and CSV files are written. '
+                             'No figures are made and matplotlib is never '
+                             'imported')
+    plotting.add_plot_arguments(parser)
+    profiling.add_profile_arguments(parser)
     parser.add_argument('--logconf', default=None,
                         help='Path to python logging configuration file in '
                              'this format: '
@@ -123,76 +213,667 @@ def extract_downloads_by_day(data=None):
     return download_dict
 
 
-def get_sorted_date_list(download_dict=None):
+class JSONStreamReader(object):
     """
-    Get dates from **start_dict** in ascending order
-    as list
+    Reads a JSON document a chunk at a time so objects and arrays
+    can be walked one member at a time with
+    :py:meth:`json.JSONDecoder.raw_decode` instead of loading the
+    whole document. Only the unread part of the current chunk is
+    held in memory.
 
-    :param download_dict: dict of starts where key is date and value
-                       is number of starts
-    :type download_dict: dict
-    :return: dates as str in ascending order in a list
-    :rtype: list
+    Example:
+
+    .. code-block:: python
+
+        with open('timeline.json', 'r') as f:
+            reader = JSONStreamReader(f)
+            for key in reader.iter_object():
+                for item in reader.iter_array():
+                    print(key, item)
+    """
+    def __init__(self, stream, chunk_size=STREAM_CHUNK_SIZE):
+        """
+        Constructor
+
+        :param stream: text file to read from
+        :param chunk_size: number of characters to read at a time
+        :type chunk_size: int
+        """
+        self._stream = stream
+        self._chunk_size = chunk_size
+        self._decoder = json.JSONDecoder()
+        self._buffer = ''
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self):
+        """
+        Appends next chunk of stream to buffer, dropping the
+        part of the buffer already consumed
+
+        :return: ``False`` if end of stream was reached
+        :rtype: bool
+        """
+        if self._eof is True:
+            return False
+        chunk = self._stream.read(self._chunk_size)
+        if not chunk:
+            self._eof = True
+            return False
+        self._buffer = self._buffer[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def peek(self):
+        """
+        Skips whitespace
+
+        :return: next character or empty string at end of stream
+        :rtype: str
+        """
+        while True:
+            self._pos = WHITESPACE.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if self._fill() is False:
+                return ''
+
+    def _expect(self, chars):
+        """
+        Consumes next character
+
+        :param chars: characters that are allowed next
+        :type chars: str
+        :raises ValueError: if next character is not in **chars**
+        :return: character consumed
+        :rtype: str
+        """
+        char = self.peek()
+        if char == '' or char not in chars:
+            raise ValueError('Expected one of ' + chars + ' but found ' +
+                             repr(char) + ' in JSON document')
+        self._pos += 1
+        return char
+
+    def decode(self):
+        """
+        Decodes next JSON value, reading more of the stream
+        if the value continues past the end of the buffer
+
+        :raises json.JSONDecodeError: if value is not valid JSON
+        :return: value
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if self._fill() is True:
+                    continue
+                raise
+            # a number cut off at the end of the buffer, ie 3. of 3.14,
+            # continues in the next chunk
+            if (end == len(self._buffer) or
+                    self._buffer[end] in NUMBER_CHARS) and\
+                    self._fill() is True:
+                continue
+            self._pos = end
+            return value
+
+    def iter_array(self):
+        """
+        Generator that decodes and yields each element of the
+        array at the current position
+
+        :raises ValueError: if there is no array at current position
+        :return: elements of array
+        """
+        self._expect('[')
+        if self.peek() == ']':
+            self._pos += 1
+            return
+        raw_decode = self._decoder.raw_decode
+        whitespace = WHITESPACE.match
+        batch_buffer = None
+        while True:
+            buffer = self._buffer
+            if buffer is not batch_buffer and buffer.startswith('[', self._pos):
+                # elements are arrays, ie [DATE, <# downloads>], so
+                # decode all of them that are in the buffer, up to the
+                # end of this array or the last ], with one call. This
+                # only succeeds if the text is made up of whole elements
+                batch_buffer = buffer
+                array_end = ARRAY_END.search(buffer, self._pos)
+                if array_end is not None:
+                    cut = array_end.start()
+                else:
+                    cut = buffer.rfind('],', self._pos)
+                try:
+                    values = json.loads('[' + buffer[self._pos:cut + 1] + ']')
+                except ValueError:
+                    values = None
+                if cut > self._pos and values:
+                    if array_end is not None:
+                        self._pos = array_end.end()
+                        yield from values
+                        return
+                    self._pos = whitespace(buffer, cut + 2).end()
+                    yield from values
+                    continue
+            # decode one element at a time, the checks done by decode()
+            # and _expect() are only needed when an element or
+            # separator runs past the end of the buffer
+            try:
+                value, end = raw_decode(buffer, self._pos)
+                end = whitespace(buffer, end).end()
+                char = buffer[end]
+            except (json.JSONDecodeError, IndexError):
+                char = None
+            if char == ',' or char == ']':
+                self._pos = whitespace(buffer, end + 1).end()
+            else:
+                value = self.decode()
+                char = self._expect(',]')
+            yield value
+            if char == ']':
+                return
+
+    def iter_object(self):
+        """
+        Generator that yields the key of each member of the object at
+        the current position. The caller must consume the value of
+        each member, ie with :py:func:`decode` or :py:func:`iter_array`,
+        before asking for the next key
+
+        :raises ValueError: if there is no object at current position
+        :return: keys of object
+        """
+        self._expect('{')
+        if self.peek() == '}':
+            self._pos += 1
+            return
+        while True:
+            key = self.decode()
+            self._expect(':')
+            yield key
+            if self._expect(',}') == '}':
+                return
+
+
+def iter_timeline_series(jsonfile=None, chunk_size=STREAM_CHUNK_SIZE):
     """
-    date_list = list(download_dict.keys())
-    date_list.sort(key=lambda xdate: datetime.strptime(xdate, '%Y-%m-%d'))
-    return date_list
+    Streams each list of ``[DATE, <# downloads>]`` pairs in a timeline
+    JSON file as (key, pairs) where pairs is a generator that reads
+    the pairs from the file. It must be used up before asking for
+    the next series. Members that are not lists are skipped
+
+    :param jsonfile: timeline JSON file
+    :type jsonfile: str
+    :param chunk_size: number of characters to read at a time
+    :type chunk_size: int
+    :return: generator of (key, pairs) tuples
+    """
+    with open(jsonfile, 'r') as f:
+        reader = JSONStreamReader(f, chunk_size=chunk_size)
+        for key in reader.iter_object():
+            if reader.peek() != '[':
+                reader.decode()
+                continue
+            downloads = reader.iter_array()
+            yield key, downloads
+            # skip whatever the caller did not read
+            for _ in downloads:
+                pass
+
+
+def iter_downloads_by_day(jsonfile=None, series=TOTAL_SERIES,
+                          chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Streams the ``[DATE, <# downloads>]`` pairs of **series** from
+    a timeline JSON file in the format described in
+    :py:func:`extract_downloads_by_day`. Other members of the
+    document are skipped one element at a time so memory use does
+    not grow with the size of the file
+
+    :param jsonfile: timeline JSON file
+    :type jsonfile: str
+    :param series: key of list of pairs to return
+    :type series: str
+    :param chunk_size: number of characters to read at a time
+    :type chunk_size: int
+    :return: generator of (date, downloads) tuples
+    """
+    for key, downloads in iter_timeline_series(jsonfile=jsonfile,
+                                               chunk_size=chunk_size):
+        if key != series:
+            continue
+        for download in downloads:
+            yield download[0], download[1]
 
 
-def plot_starts_by_day(download_dict=None, date_list=None,
-                       outdir=None):
+def extract_timelines(timeline_series=None):
+    """
+    Reads the downloads of all apps and of each app from
+    **timeline_series** in a single pass. Each app is turned
+    into counts for each day as soon as it is read so only one
+    app's list of pairs is held at a time.
+
+    :param timeline_series: (key, list of ``[DATE, <# downloads>]``)
+                            for each key of timeline JSON as returned
+                            by :py:func:`iter_timeline_series` or
+                            the members of loaded JSON that are lists
+    :type timeline_series: iterable
+    :return: (dict of date to downloads of all apps as returned by
+              :py:func:`extract_downloads_by_day`, downloads of each app
+              for each day). Repeated dates are added together for
+              each app and, as before, the last one wins for all apps
+    :rtype: tuple
     """
-    Plot starts by day saving the file named starts_by_day.svg to
-    directory specified by **outdir**
+    download_dict = {}
+    names = []
+    series = []
+    for key, downloads in timeline_series:
+        if key == TOTAL_SERIES:
+            for download in downloads:
+                download_dict[download[0]] = download[1]
+            continue
+        if not isinstance(downloads, list):
+            downloads = list(downloads)
+        names.append(key)
+        if len(downloads) == 0:
+            series.append(DailyCounts())
+            continue
+        days, values = zip(*downloads)
+        ordinals = np.array(days, dtype='datetime64[D]').astype(np.int64) + EPOCH_ORDINAL
+        series.append(DailyCounts.from_ordinals(ordinals,
+                                                np.array(values, dtype=np.int64)))
+    return download_dict, DailyCountsTable.from_series(names, series)
+
+
+def get_app_ranking(app_table=None):
+    """
+    Ranks apps by total downloads
 
-    :param download_dict: starts for each day
-    :type download_dict: dict
-    :param date_list: Ordered start dates. Each entry is a str
-    :type date_list: list
-    :param outdir: Directory to save plot to
+    :param app_table: downloads of each app for each day
+    :type app_table: :py:class:`statscommon.timeseries.DailyCountsTable`
+    :return: rows of **app_table** from most to least downloaded
+    :rtype: :py:class:`numpy.ndarray`
+    """
+    return np.argsort(-app_table.get_totals(), kind='stable')
+
+
+def save_app_ranking(app_table=None, ranking=None, outdir=None):
+    """
+    Writes app_downloads_ranking.csv to **outdir** listing every app
+    from most to least downloaded along with downloads over the last
+    :py:const:`GROWTH_WINDOW_DAYS` days of the timeline, the same
+    number of days before that and the growth between the two.
+
+    Example of output:
+
+    .. code-block:: python
+
+        Rank,App,TotalDownloads,Last365Days,Previous365Days,Growth
+        1,stringApp,180000,25000,20000,0.25
+
+    Growth is empty if the app had no downloads in the earlier period
+
+    :param app_table: downloads of each app for each day
+    :type app_table: :py:class:`statscommon.timeseries.DailyCountsTable`
+    :param ranking: rows of **app_table** as returned by
+                    :py:func:`get_app_ranking`
+    :type ranking: :py:class:`numpy.ndarray`
+    :param outdir: Directory to save file
     :type outdir: str
     :return:
     """
-    total_downloads = 0
-    start_list = []
-    for key in date_list:
-        total_downloads += download_dict[key]
+    totals = app_table.get_totals()
+    recent, previous, growth = app_table.get_growth(window=GROWTH_WINDOW_DAYS)
+    window = str(GROWTH_WINDOW_DAYS)
+    with open(os.path.join(outdir, 'app_downloads_ranking.csv'), 'w',
+              newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Rank', 'App', 'TotalDownloads', 'Last' + window + 'Days',
+                         'Previous' + window + 'Days', 'Growth'])
+        writer.writerows(zip(range(1, len(ranking) + 1),
+                             [app_table.names[index] for index in ranking.tolist()],
+                             totals[ranking].tolist(),
+                             recent[ranking].tolist(),
+                             previous[ranking].tolist(),
+                             ['' if np.isnan(value) else round(value, 4)
+                              for value in growth[ranking].tolist()]))
+
+
+def _format_csv_row(values):
+    """
+    Formats **values** as one row of CSV, quoted as needed,
+    without a line terminator
 
-        start_list.append(download_dict[key])
+    :param values: values of row
+    :type values: list
+    :return: row of CSV
+    :rtype: str
+    """
+    out = io.StringIO()
+    csv.writer(out, lineterminator='').writerow(values)
+    return out.getvalue()
 
-    # setup labels to print year at 01/Jan position in date_list
-    x_pos = []
-    x_labels = []
-    counter = 0
-    for entry in date_list:
-        if entry.endswith('01-01'):
-            x_labels.append(entry[0:entry.index('-')])
-            x_pos.append(counter)
-        counter += 1
 
-    fig, ax = plt.subplots()
+def save_app_downloads_by_period(app_table=None, outdir=None):
+    """
+    Writes app_downloads_by_period.csv to **outdir** with the
+    downloads of each app for each day, month and year in tidy
+    format, one row per app and period. Periods without downloads
+    are left out.
 
-    ax.plot(date_list, start_list)
-    ax.set_xticks(x_pos)
-    ax.set_xticklabels(x_labels)
-    ax.set_xlabel('Year', fontweight='bold')
-    ax.set_ylabel('# Downloads', fontweight='bold')
+    Example of output:
 
-    ax.set_title('Total App Downloads by Day (' +
-                 '{:,}'.format(total_downloads) + ')',
-                 fontweight='bold')
+    .. code-block:: python
 
+        App,Period,Start,Downloads
+        stringApp,day,2019-04-03,12
+        stringApp,month,2019-04-01,340
+        stringApp,year,2019-01-01,4012
+
+    :param app_table: downloads of each app for each day
+    :type app_table: :py:class:`statscommon.timeseries.DailyCountsTable`
+    :param outdir: Directory to save file
+    :type outdir: str
+    :return: number of rows written
+    :rtype: int
+    """
+    num_rows = 0
+    with open(os.path.join(outdir, 'app_downloads_by_period.csv'), 'w',
+              newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['App', 'Period', 'Start', 'Downloads'])
+        for period in APP_PERIODS:
+            period_starts, totals = app_table.resample(period)
+            starts = np.datetime_as_string(period_starts, unit='D').tolist()
+            for name, row in zip(app_table.names, totals):
+                columns = np.flatnonzero(row).tolist()
+                # only the app name can need quoting so csv formats it
+                # once and the rows of the app are joined as strings
+                prefix = _format_csv_row([name, period]) + ','
+                f.write(''.join([prefix + starts[column] + ',' +
+                                 str(downloads) + CSV_LINE_TERMINATOR
+                                 for column, downloads
+                                 in zip(columns, row[columns].tolist())]))
+                num_rows += len(columns)
+    return num_rows
+
+
+def plot_top_apps(app_table=None, ranking=None, outdir=None, top=12):
+    """
+    Plots downloads per month of the **top** most downloaded apps as
+    small multiples, one chart per app sharing the same axes, saving
+    the file named top_apps_per_month.svg to **outdir**
+
+    :param app_table: downloads of each app for each day
+    :type app_table: :py:class:`statscommon.timeseries.DailyCountsTable`
+    :param ranking: rows of **app_table** as returned by
+                    :py:func:`get_app_ranking`
+    :type ranking: :py:class:`numpy.ndarray`
+    :param outdir: Directory to save plot to
+    :type outdir: str
+    :param top: number of apps to plot
+    :type top: int
+    :return:
+    """
+    import matplotlib.pyplot as plt
+
+    top_rows = ranking[:top].tolist()
+    month_starts, totals = app_table.resample('month')
+    x_pos, x_years = get_year_ticks(month_starts)
+    # label at most 6 years so ticks do not overlap
+    step = max(1, -(-len(x_pos) // 6))
+    num_cols = min(4, len(top_rows))
+    num_rows = -(-len(top_rows) // num_cols)
+
+    fig, axes = plt.subplots(num_rows, num_cols, sharex=True, sharey=True,
+                             squeeze=False,
+                             figsize=(3 * num_cols, 2.2 * num_rows + 0.6))
+    for ax, row in zip(axes.flat, top_rows):
+        ax.plot(np.arange(len(month_starts)), totals[row], linewidth=1)
+        ax.set_title(app_table.names[row] + ' (' +
+                     '{:,}'.format(int(totals[row].sum())) + ')',
+                     fontsize=9)
+        ax.set_xticks(x_pos[::step])
+        ax.set_xticklabels([str(year) for year in x_years[::step].tolist()],
+                           fontsize=7, rotation=-45)
+        ax.tick_params(axis='y', labelsize=7)
+    for ax in axes.flat[len(top_rows):]:
+        ax.axis('off')
+
+    fig.suptitle('Downloads per Month of Top ' + str(len(top_rows)) +
+                 ' Apps', fontweight='bold')
     fig.patches.extend([plt.Rectangle((0, 0), 1, 1,
                                       fill=False, color='black', alpha=1,
                                       zorder=1000,
                                       transform=fig.transFigure, figure=fig,
                                       linewidth=2.0)])
     fig.set_tight_layout(True)
-    plt.savefig(outdir + '/app_downloads_per_day.svg')
-    plt.close()
+    plotting.save_figure(fig, os.path.join(outdir, 'top_apps_per_month.svg'))
+
+
+def get_daily_downloads(download_dict=None):
+    """
+    Converts **download_dict** into downloads for every day
+    from the first to the last day in **download_dict**. Days
+    missing from **download_dict** are set to 0
+
+    :param download_dict: dict where key is date as ``YYYY-MM-DD``
+                          and value is number of downloads
+    :type download_dict: dict
+    :return: downloads for each day
+    :rtype: :py:class:`statscommon.timeseries.DailyCounts`
+    """
+    return DailyCounts.from_dict(download_dict)
+
+
+def plot_starts_by_day(daily_downloads=None, outdir=None,
+                       rolling_mean=0, max_points=0):
+    """
+    Plot downloads by day saving the file named app_downloads_per_day.svg
+    to directory specified by **outdir**
+
+    :param daily_downloads: downloads for each day as returned by
+                            :py:func:`get_daily_downloads`
+    :type daily_downloads: :py:class:`statscommon.timeseries.DailyCounts`
+    :param outdir: Directory to save plot to
+    :type outdir: str
+    :param rolling_mean: number of days to draw mean downloads over,
+                         ``0`` for no mean line
+    :type rolling_mean: int
+    :param max_points: maximum number of points in each line,
+                       ``0`` to draw every day
+    :type max_points: int
+    :return:
+    """
+    plotting.plot_daily_counts(daily_downloads,
+                               os.path.join(outdir, 'app_downloads_per_day.svg'),
+                               label='Downloads',
+                               title='Total App Downloads by Day',
+                               tick_rotation=0,
+                               rolling_window=rolling_mean,
+                               max_points=max_points)
+
+
+def save_rolling_downloads(daily_downloads=None, outdir=None):
+    """
+    Writes app_downloads_rolling.csv to **outdir** with downloads
+    for each day along with the sum and mean of downloads over each
+    of the :py:const:`ROLLING_WINDOWS` days ending on that day.
+
+    Example of output:
+
+    .. code-block:: python
+
+        Date,Downloads,Sum7Days,Mean7Days,Sum30Days,Mean30Days,...
+        2019-04-03,120,805,115.0,3300,110.0,...
+
+    Sum and mean are empty for days with less than a full
+    window of history
+
+    :param daily_downloads: downloads for each day as returned by
+                            :py:func:`get_daily_downloads`
+    :type daily_downloads: :py:class:`statscommon.timeseries.DailyCounts`
+    :param outdir: Directory to save file
+    :type outdir: str
+    :return:
+    """
+    header = ['Date', 'Downloads']
+    columns = [daily_downloads.get_date_labels(day_format=ISO_DAY),
+               daily_downloads.counts.tolist()]
+    for window in ROLLING_WINDOWS:
+        sums = daily_downloads.rolling_sum(window=window)
+        header.extend(['Sum' + str(window) + 'Days',
+                       'Mean' + str(window) + 'Days'])
+        columns.append(['' if np.isnan(value) else int(value)
+                        for value in sums.tolist()])
+        columns.append(['' if np.isnan(value) else round(value / window, 2)
+                        for value in sums.tolist()])
+    with open(os.path.join(outdir, 'app_downloads_rolling.csv'), 'w',
+              newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(zip(*columns))
+
+
+def save_summary(daily_downloads=None, outdir=None):
+    """
+    Writes total downloads and the range of days they
+    cover to summary.txt in **outdir**. If there are no days
+    only the total, 0, is written
+
+    :param daily_downloads: downloads for each day as returned by
+                            :py:func:`get_daily_downloads`
+    :type daily_downloads: :py:class:`statscommon.timeseries.DailyCounts`
+    :param outdir: Directory to save summary to
+    :type outdir: str
+    :return:
+    """
+    if len(daily_downloads) == 0:
+        LOGGER.warning('No downloads by day found, summary.txt has no '
+                       'date range')
+        date_range = ''
+    else:
+        date_range = (' (' +
+                      daily_downloads.get_date_label(0, day_format=ISO_DAY) +
+                      ' - ' +
+                      daily_downloads.get_date_label(-1, day_format=ISO_DAY) +
+                      ')')
     with open(os.path.join(outdir, 'summary.txt'), 'w') as f:
-        f.write('Total AppStore App Downloads: ' + '{:,}'.format(total_downloads) + ' (' +
-                date_list[0] + ' - ' + date_list[-1] + ')\n')
+        f.write('Total AppStore App Downloads: ' +
+                '{:,}'.format(daily_downloads.get_total()) + date_range + '\n')
+
+
+def iter_merged_downloads(baseline_downloads=None, downloads=None):
+    """
+    Merges two streams of (date, downloads) tuples, each sorted by
+    date, in a single pass by advancing whichever stream is behind.
+    Dates are ``YYYY-MM-DD`` strings so they sort as text
+
+    Example:
+
+    .. code-block:: python
+
+        >>> list(iter_merged_downloads([('2021-01-01', 3), ('2021-01-02', 4)],
+        ...                            [('2021-01-02', 5), ('2021-01-03', 1)]))
+        [('2021-01-01', 3, None), ('2021-01-02', 4, 5), ('2021-01-03', None, 1)]
+
+    :param baseline_downloads: (date, downloads) sorted by date
+    :type baseline_downloads: iterable
+    :param downloads: (date, downloads) sorted by date
+    :type downloads: iterable
+    :return: generator of (date, baseline downloads, downloads) tuples
+             where downloads missing from either stream are ``None``
+    """
+    baseline_iter = iter(baseline_downloads)
+    current_iter = iter(downloads)
+    baseline = next(baseline_iter, None)
+    current = next(current_iter, None)
+    while baseline is not None and current is not None:
+        if baseline[0] == current[0]:
+            yield baseline[0], baseline[1], current[1]
+            baseline = next(baseline_iter, None)
+            current = next(current_iter, None)
+        elif baseline[0] < current[0]:
+            yield baseline[0], baseline[1], None
+            baseline = next(baseline_iter, None)
+        else:
+            yield current[0], None, current[1]
+            current = next(current_iter, None)
+    while baseline is not None:
+        yield baseline[0], baseline[1], None
+        baseline = next(baseline_iter, None)
+    while current is not None:
+        yield current[0], None, current[1]
+        current = next(current_iter, None)
+
+
+def save_baseline_diff(baseline_dict=None, download_dict=None, outdir=None):
+    """
+    Compares downloads for each day of an earlier snapshot,
+    **baseline_dict**, with **download_dict** writing every day
+    that was added, removed or revised to baseline_diff.csv and a
+    summary of the changes to baseline_diff.txt in **outdir**.
+
+    Example of baseline_diff.csv:
+
+    .. code-block:: python
+
+        Date,Status,BaselineDownloads,Downloads,Change
+        2021-04-20,revised,310,312,2
+        2021-04-22,added,,287,287
+
+    :param baseline_dict: downloads for each date of earlier snapshot
+                          as returned by :py:func:`extract_downloads_by_day`
+    :type baseline_dict: dict
+    :param download_dict: downloads for each date of current snapshot
+                          as returned by :py:func:`extract_downloads_by_day`
+    :type download_dict: dict
+    :param outdir: Directory to save files
+    :type outdir: str
+    :return: number of days with each status, keyed by
+             ``added``, ``removed``, ``revised`` and ``unchanged``
+    :rtype: dict
+    """
+    status_counts = {'added': 0, 'removed': 0, 'revised': 0, 'unchanged': 0}
+    with open(os.path.join(outdir, 'baseline_diff.csv'), 'w',
+              newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Date', 'Status', 'BaselineDownloads', 'Downloads',
+                         'Change'])
+        for day, baseline, current in \
+                iter_merged_downloads(sorted(baseline_dict.items()),
+                                      sorted(download_dict.items())):
+            if baseline is None:
+                status = 'added'
+                writer.writerow([day, status, '', current, current])
+            elif current is None:
+                status = 'removed'
+                writer.writerow([day, status, baseline, '', -baseline])
+            elif baseline != current:
+                status = 'revised'
+                writer.writerow([day, status, baseline, current,
+                                 current - baseline])
+            else:
+                status = 'unchanged'
+            status_counts[status] += 1
+
+    baseline_total = sum(baseline_dict.values())
+    total = sum(download_dict.values())
+    with open(os.path.join(outdir, 'baseline_diff.txt'), 'w') as f:
+        for status in ['added', 'removed', 'revised', 'unchanged']:
+            f.write('Days ' + status + ': ' +
+                    '{:,}'.format(status_counts[status]) + '\n')
+        f.write('Total downloads in baseline: ' +
+                '{:,}'.format(baseline_total) + '\n')
+        f.write('Total downloads: ' + '{:,}'.format(total) + '\n')
+        f.write('Change in total downloads: ' +
+                '{:+,}'.format(total - baseline_total) + '\n')
+    return status_counts
 
 
 def main(args):
@@ -215,17 +896,68 @@ def main(args):
     # setup logging
     _setup_logging(theargs)
 
-    matplotlib.use(theargs.matplotlibgui)
-
-    if theargs.jsonfile is not None:
-        data = load_json_file(jsonfile=theargs.jsonfile)
-
-    download_dict = extract_downloads_by_day(data=data)
-    date_list = get_sorted_date_list(download_dict)
-
-    plot_starts_by_day(download_dict=download_dict,
-                       date_list=date_list,
-                       outdir=theargs.outdir)
+    profiler = profiling.StageProfiler.from_args(theargs, theargs.outdir)
+    if theargs.stream is True:
+        timeline_series = iter_timeline_series(jsonfile=theargs.jsonfile)
+    else:
+        with profiler.stage('load_json_file'):
+            data = load_json_file(jsonfile=theargs.jsonfile)
+        timeline_series = [(key, value) for key, value in data.items()
+                           if isinstance(value, list)]
+
+    with profiler.stage('extract_timelines') as stage:
+        download_dict, app_table = extract_timelines(timeline_series)
+        stage['items'] = len(download_dict) + len(app_table)
+    if theargs.baseline is not None:
+        with profiler.stage('load_baseline') as stage:
+            if theargs.stream is True:
+                baseline_dict = dict(iter_downloads_by_day(jsonfile=theargs.baseline))
+            else:
+                baseline_dict = extract_downloads_by_day(load_json_file(jsonfile=theargs.baseline))
+            stage['items'] = len(baseline_dict)
+        with profiler.stage('save_baseline_diff') as stage:
+            status_counts = save_baseline_diff(baseline_dict,
+                                               download_dict=download_dict,
+                                               outdir=theargs.outdir)
+            stage['items'] = len(baseline_dict) + len(download_dict)
+        LOGGER.info('Compared with ' + theargs.baseline + ': ' +
+                    ', '.join([str(count) + ' days ' + status
+                               for status, count in status_counts.items()]))
+
+    with profiler.stage('get_daily_downloads') as stage:
+        daily_downloads = get_daily_downloads(download_dict)
+        stage['items'] = len(daily_downloads)
+
+    with profiler.stage('save_summary'):
+        save_summary(daily_downloads, outdir=theargs.outdir)
+    with profiler.stage('save_rolling_downloads') as stage:
+        save_rolling_downloads(daily_downloads, outdir=theargs.outdir)
+        stage['items'] = len(daily_downloads)
+
+    jobs = [('plot_starts_by_day', plot_starts_by_day,
+             {'daily_downloads': daily_downloads, 'outdir': theargs.outdir,
+              'rolling_mean': theargs.rolling_mean,
+              'max_points': theargs.max_points})]
+    if len(app_table) > 0:
+        LOGGER.info('Found downloads for ' + str(len(app_table)) + ' apps')
+        with profiler.stage('get_app_ranking') as stage:
+            ranking = get_app_ranking(app_table)
+            stage['items'] = len(ranking)
+        with profiler.stage('save_app_ranking'):
+            save_app_ranking(app_table, ranking=ranking, outdir=theargs.outdir)
+        with profiler.stage('save_app_downloads_by_period') as stage:
+            stage['items'] = save_app_downloads_by_period(app_table,
+                                                          outdir=theargs.outdir)
+        jobs.append(('plot_top_apps', plot_top_apps,
+                     {'app_table': app_table, 'ranking': ranking,
+                      'outdir': theargs.outdir, 'top': theargs.top}))
+
+    if theargs.no_plots is False:
+        with profiler.stage('render_figures') as stage:
+            plotting.render_figures(jobs, workers=theargs.plot_workers,
+                                    backend=theargs.matplotlibgui)
+            stage['items'] = len(jobs)
+    profiler.write_report()
 
 
 if __name__ == '__main__':  # pragma: no cover
@@ -5,13 +5,23 @@ import sys
 import argparse
 import logging
 import functools
+import hashlib
+import urllib.parse
+import re
+import collections
+import csv
+import sqlite3
+import concurrent.futures
 from datetime import date
 import json
-import numpy as np
 
-import matplotlib
-import matplotlib.pyplot as plt
-import matplotlib.ticker as mtick
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir))
+from statscommon import plotting
+from statscommon import profiling
+from statscommon.lazyimport import lazy_import
+
+np = lazy_import('numpy')
 
 
 class Formatter(argparse.ArgumentDefaultsHelpFormatter,
@@ -27,6 +37,75 @@ LOGGER = logging.getLogger(__name__)
 
 LOGGER.info('Starting program')
 
+GITHUB_API = 'https://api.github.com'
+"""
+Base URL of Github REST API
+"""
+
+RELEASES_PATH = '/repos/cytoscape/cytoscape/releases'
+"""
+Path, under :py:const:`GITHUB_API`, of Cytoscape releases
+"""
+
+RELEASES_PER_PAGE = 100
+"""
+Number of releases requested per page, the most Github allows
+"""
+
+SNAPSHOT_DATE_PATTERN = re.compile(r'(?P<month>[0-9]{1,2})_(?P<day>[0-9]{1,2})_'
+                                   r'(?P<year>[0-9]{4})')
+"""
+Date in name of release JSON file, ie ``4_13_2021_releases.json``
+"""
+
+VERSION_PATTERN = re.compile(r'v?(?P<release>[0-9]+(?:\.[0-9]+)*)'
+                             r'(?:[-_.]?(?P<pre>alpha|beta|rc|a|b)'
+                             r'[-_.]?(?P<pre_number>[0-9]*))?',
+                             re.IGNORECASE)
+"""
+Cytoscape version tag, ie ``3.10.0`` or ``3.10.0-beta1``
+"""
+
+PRE_RELEASE_RANKS = {'a': 0, 'alpha': 0, 'b': 1, 'beta': 1, 'rc': 2}
+"""
+Order of pre-releases of the same version, releases rank after all
+"""
+
+AssetRule = collections.namedtuple('AssetRule', ['key', 'platform',
+                                                 'architecture', 'installer',
+                                                 'pattern'])
+"""
+Rule classifying a release asset. An asset whose whole name matches
+the regular expression **pattern** has its downloads added to
+``<key>_downloads`` of its version
+"""
+
+ASSET_RULES = [AssetRule('windows32', 'windows', 'x86', 'exe',
+                         r'.*32bit.*\.exe'),
+               AssetRule('windows', 'windows', 'x86_64', 'exe', r'.*\.exe'),
+               AssetRule('windows', 'windows', 'x86_64', 'zip', r'.*\.zip'),
+               AssetRule('linux', 'linux', 'x86_64', 'sh', r'.*\.sh'),
+               AssetRule('linux', 'linux', 'x86_64', 'tar.gz', r'.*\.gz'),
+               AssetRule('linux', 'linux', 'x86_64', 'other', r'.*unix.*'),
+               AssetRule('macarm', 'mac', 'aarch64', 'dmg',
+                         r'.*aarch64.*\.dmg'),
+               AssetRule('mac', 'mac', 'x86_64', 'dmg', r'.*\.dmg')]
+"""
+Rules used by :py:class:`AssetClassifier`, an asset is classified
+by the first rule it matches
+"""
+
+CSV_BUFFER_SIZE = 1024 * 1024
+"""
+Size in bytes of write buffer of CSV reports
+"""
+
+ASSET_KEYS = ['mac', 'macarm', 'windows', 'windows32', 'linux']
+"""
+Keys of :py:const:`ASSET_RULES`, one ``<key>_downloads`` count
+is added to each version for each
+"""
+
 
 def _parse_arguments(desc, args):
     """
@@ -43,15 +122,57 @@ def _parse_arguments(desc, args):
                              'statistics from Github. The JSON file can be ' +
                              'obtained by this link: ' +
                              'https://api.github.com/repos/cytoscape/'
-                             'cytoscape/releases')
+                             'cytoscape/releases or with --fetch')
     parser.add_argument('outdir', help='Directory to save figures to, '
                                        'directory will be created if '
                                        'it does not exist')
     parser.add_argument('--matplotlibgui', default='svg',
                         help='Library to use for plotting')
+    parser.add_argument('--fetch', action='store_true',
+                        help='If set, every page of releases is fetched '
+                             'from Github and written to jsonfile before '
+                             'it is processed')
+    parser.add_argument('--github-api', default=GITHUB_API,
+                        help='Base URL of Github REST API, used with '
+                             '--fetch')
+    parser.add_argument('--github-token',
+                        default=os.environ.get('GITHUB_TOKEN'),
+                        help='Github token used with --fetch for a higher '
+                             'rate limit, defaults to GITHUB_TOKEN '
+                             'environment variable')
+    parser.add_argument('--cachedir',
+                        help='Directory where pages fetched with --fetch '
+                             'are cached along with their ETag and '
+                             'Last-Modified headers so unchanged pages '
+                             'are not counted against the rate limit. '
+                             'If unset, <outdir>/github_cache is used')
+    parser.add_argument('--fetch-workers', type=int, default=4,
+                        help='Number of pages fetched at the same time '
+                             'with --fetch')
+    parser.add_argument('--store',
+                        help='SQLite file of snapshots of download counts. '
+                             'If set, download counts in jsonfile are '
+                             'added to it as a snapshot, replacing any '
+                             'snapshot of the same date, and downloads of '
+                             'each file between snapshots are written to '
+                             'download_deltas.csv. The file is created if '
+                             'it does not exist')
+    parser.add_argument('--snapshot-date',
+                        help='Date, as YYYY-MM-DD, download counts in '
+                             'jsonfile were taken, used with --store. If '
+                             'unset, the date in the name of jsonfile, '
+                             'ie 4_13_2021_releases.json, is used. If '
+                             'neither is set the snapshot is only taken '
+                             'with --fetch, as of today')
+    parser.add_argument('--no-plots', action='store_true',
+                        help='If set, only cumulative_downloads.csv is '
+                             'written. No figures are made and matplotlib '
+                             'is never imported')
     parser.add_argument('--plot_totaldownloads', action='store_true',
                         help='If set, generates downloads.svg containing '
                              'total downloads by version')
+    plotting.add_plot_arguments(parser)
+    profiling.add_profile_arguments(parser)
     parser.add_argument('--logconf', default=None,
                         help='Path to python logging configuration file in '
                              'this format: '
@@ -93,16 +214,60 @@ def _setup_logging(args):
                               disable_existing_loggers=False)
 
 
+@functools.lru_cache(maxsize=None)
+def get_version_key(version):
+    """
+    Parses Cytoscape version tag **version** into a key that sorts
+    versions in release order, loosely following PEP 440: release
+    numbers are compared as numbers with trailing zeros ignored and
+    pre-releases (``a``/``alpha``, ``b``/``beta``, ``rc``) sort before
+    the release they precede. Tags that are not versions sort before
+    all versions, by name. Each tag is parsed once, the result is
+    cached.
+
+    Example:
+
+    .. code-block:: python
+
+        >>> sorted(['3.10.0', '3.9.1', '3.10.0-beta1', '3.10.0-rc1'],
+        ...        key=get_version_key)
+        ['3.9.1', '3.10.0-beta1', '3.10.0-rc1', '3.10.0']
+
+    :param version: Version of cytoscape as string, ie ``3.10.0-beta1``
+    :type version: str
+    :return: (1 if **version** parsed else 0, release numbers,
+              pre-release rank, pre-release number, **version**)
+    :rtype: tuple
+    """
+    match = VERSION_PATTERN.fullmatch(version.strip())
+    if match is None:
+        return 0, (), 0, 0, version
+    release = tuple(int(part) for part in match.group('release').split('.'))
+    while len(release) > 1 and release[-1] == 0:
+        release = release[:-1]
+    pre_rank = len(PRE_RELEASE_RANKS)
+    pre_number = 0
+    if match.group('pre') is not None:
+        pre_rank = PRE_RELEASE_RANKS[match.group('pre').lower()]
+        pre_number = int(match.group('pre_number') or 0)
+    return 1, release, pre_rank, pre_number, version
+
+
 def convert_version_to_numeric_tuple(version):
     """
-    Converts Cytoscape Version string into a tuple of numbers
+    Converts Cytoscape Version string into a tuple of numbers,
+    any pre-release suffix such as ``-beta1`` is ignored
 
     :param version: Version of cytoscape as string
     :type version: str
-    :return: (major, minor, bugfix)
+    :return: (major, minor, bugfix) or ``None`` if **version**
+             does not have exactly three release numbers
     :rtype: tuple
     """
-    split_val = version.split('.')
+    match = VERSION_PATTERN.fullmatch(version.strip())
+    if match is None:
+        return None
+    split_val = match.group('release').split('.')
     if len(split_val) != 3:
         return None
     return int(split_val[0]), int(split_val[1]), int(split_val[2])
@@ -111,7 +276,7 @@ def convert_version_to_numeric_tuple(version):
 def compare_versions(item1, item2):
     """
     Compares versions of Cytoscape which are passed
-    in as str objects
+    in as str objects using :py:func:`get_version_key`
 
     :param item1: Cytoscape Version
     :type item1: str
@@ -120,25 +285,11 @@ def compare_versions(item1, item2):
     :return: -1, 0, 1 if item1 is less then, equal, or greater then item2
     :rtype: int
     """
-    item1_tup = convert_version_to_numeric_tuple(item1)
-    item2_tup = convert_version_to_numeric_tuple(item2)
-    if item1 is None:
-        if item2 is None:
-            return 0
-        return -1
-    if item2 is None:
-        return 1
-    if item1_tup[0] < item2_tup[0]:
+    item1_key = get_version_key(item1)
+    item2_key = get_version_key(item2)
+    if item1_key < item2_key:
         return -1
-    if item1_tup[0] > item2_tup[0]:
-        return 1
-    if item1_tup[1] < item2_tup[1]:
-        return -1
-    if item1_tup[1] > item2_tup[1]:
-        return 1
-    if item1_tup[2] < item2_tup[2]:
-        return -1
-    if item1_tup[2] > item2_tup[2]:
+    if item1_key > item2_key:
         return 1
     return 0
 
@@ -155,6 +306,426 @@ def load_json_file(jsonfile=None):
         return json.load(f)
 
 
+def save_json_file(data=None, jsonfile=None):
+    """
+    Writes **data** as JSON to **jsonfile**, under a temporary
+    name first so a reader never sees a partially written file
+
+    :param data: data to write
+    :param jsonfile: path to write to
+    :type jsonfile: str
+    :return: None
+    """
+    tmp_jsonfile = jsonfile + '.tmp'
+    with open(tmp_jsonfile, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_jsonfile, jsonfile)
+
+
+class GithubPageCache(object):
+    """
+    Caches pages fetched from Github on disk, one JSON file per URL,
+    along with the ``ETag`` and ``Last-Modified`` headers Github sent
+    so the page can be requested again conditionally. Github does
+    not count a ``304 Not Modified`` reply against the rate limit
+    """
+    def __init__(self, cachedir=None):
+        """
+        Constructor
+
+        :param cachedir: directory to store pages in, created if
+                         it does not exist
+        :type cachedir: str
+        """
+        self._cachedir = cachedir
+        os.makedirs(cachedir, mode=0o755, exist_ok=True)
+
+    def _get_path(self, url):
+        """
+        :param url: URL of page
+        :type url: str
+        :return: path of cache file for **url**
+        :rtype: str
+        """
+        return os.path.join(self._cachedir,
+                            hashlib.sha1(url.encode('utf-8')).hexdigest() +
+                            '.json')
+
+    def get(self, url):
+        """
+        Gets cached page for **url**
+
+        :param url: URL of page
+        :type url: str
+        :return: cached page as a dict with ``url``, ``etag``,
+                 ``last_modified``, ``last_page`` and ``body`` keys or
+                 ``None`` if **url** is not cached or the cache file
+                 cannot be read
+        :rtype: dict
+        """
+        path = self._get_path(url)
+        if not os.path.isfile(path):
+            return None
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            LOGGER.warning('Ignoring unreadable cache file ' + path +
+                           ' : ' + str(e))
+            return None
+
+    def put(self, url, entry):
+        """
+        Caches **entry** for **url**
+
+        :param url: URL of page
+        :type url: str
+        :param entry: page as described in :py:meth:`get`
+        :type entry: dict
+        :return: None
+        """
+        save_json_file(data=entry, jsonfile=self._get_path(url))
+
+
+def get_releases_page_url(github_api=GITHUB_API, page=1):
+    """
+    :param github_api: Base URL of Github REST API
+    :type github_api: str
+    :param page: page number, starting at 1
+    :type page: int
+    :return: URL of **page** of Cytoscape releases
+    :rtype: str
+    """
+    return (github_api.rstrip('/') + RELEASES_PATH + '?per_page=' +
+            str(RELEASES_PER_PAGE) + '&page=' + str(page))
+
+
+def get_github_session(github_token=None, workers=4):
+    """
+    Creates a :py:class:`requests.Session` whose connection pool
+    can hold a connection for each of **workers** threads
+
+    :param github_token: Github token, if set it is sent in the
+                         ``Authorization`` header
+    :type github_token: str
+    :param workers: number of threads sharing the session
+    :type workers: int
+    :return: session for Github API requests
+    :rtype: :py:class:`requests.Session`
+    """
+    # only needed for --fetch so requests is imported here
+    import requests
+    import requests.adapters
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1,
+                                            pool_maxsize=max(workers, 1))
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update({'Accept': 'application/vnd.github+json'})
+    if github_token:
+        session.headers.update({'Authorization': 'Bearer ' + github_token})
+    return session
+
+
+def fetch_page(session=None, cache=None, url=None, timeout=30):
+    """
+    Gets page at **url**, conditionally if it is in **cache**,
+    and updates **cache** with the reply
+
+    :param session: session to make request with
+    :type session: :py:class:`requests.Session`
+    :param cache: page cache
+    :type cache: :py:class:`GithubPageCache`
+    :param url: URL of page
+    :type url: str
+    :param timeout: seconds to wait for Github to reply
+    :type timeout: float
+    :raises requests.exceptions.HTTPError: if Github replies with an error
+    :return: page as described in :py:meth:`GithubPageCache.get`
+    :rtype: dict
+    """
+    cached = cache.get(url)
+    headers = {}
+    if cached is not None:
+        if cached.get('etag'):
+            headers['If-None-Match'] = cached['etag']
+        if cached.get('last_modified'):
+            headers['If-Modified-Since'] = cached['last_modified']
+    res = session.get(url, headers=headers, timeout=timeout)
+    LOGGER.debug(url + ' returned ' + str(res.status_code) +
+                 ', rate limit remaining ' +
+                 str(res.headers.get('X-RateLimit-Remaining')))
+    if res.status_code == 304 and cached is not None:
+        LOGGER.info('Using cached copy of unchanged ' + url)
+        return cached
+    res.raise_for_status()
+
+    last_page = None
+    if 'last' in res.links:
+        query = urllib.parse.urlparse(res.links['last']['url']).query
+        last_page = int(urllib.parse.parse_qs(query)['page'][0])
+    entry = {'url': url,
+             'etag': res.headers.get('ETag'),
+             'last_modified': res.headers.get('Last-Modified'),
+             'last_page': last_page,
+             'body': res.json()}
+    cache.put(url, entry)
+    return entry
+
+
+def fetch_releases(github_api=GITHUB_API, cachedir=None,
+                   github_token=None, workers=4):
+    """
+    Fetches every page of Cytoscape releases from Github. The first
+    page says how many pages there are in its ``Link`` header, the
+    remaining pages are then fetched at the same time by up to
+    **workers** threads sharing one connection pool. Each page is
+    cached in **cachedir** and requested conditionally next time,
+    see :py:class:`GithubPageCache`
+
+    :param github_api: Base URL of Github REST API
+    :type github_api: str
+    :param cachedir: directory to cache pages in
+    :type cachedir: str
+    :param github_token: Github token
+    :type github_token: str
+    :param workers: number of pages to fetch at the same time
+    :type workers: int
+    :raises requests.exceptions.HTTPError: if Github replies with an error
+    :return: releases from all pages, in the same format as
+             https://api.github.com/repos/cytoscape/cytoscape/releases
+    :rtype: list
+    """
+    cache = GithubPageCache(cachedir=cachedir)
+    with get_github_session(github_token=github_token,
+                            workers=workers) as session:
+        first_page = fetch_page(session=session, cache=cache,
+                                url=get_releases_page_url(github_api=github_api,
+                                                          page=1))
+        urls = [get_releases_page_url(github_api=github_api, page=page)
+                for page in range(2, (first_page['last_page'] or 1) + 1)]
+        LOGGER.info('Fetching ' + str(len(urls) + 1) + ' pages of releases')
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+            pages = list(executor.map(lambda url: fetch_page(session=session,
+                                                             cache=cache,
+                                                             url=url),
+                                      urls))
+    releases = list(first_page['body'])
+    for page in pages:
+        releases.extend(page['body'])
+    return releases
+
+
+def get_snapshot_date(jsonfile=None, snapshot_date=None, default=None):
+    """
+    Gets date download counts in **jsonfile** were taken. A wrong
+    date would misplace the snapshot among the others in
+    :py:class:`SnapshotStore` so there is no guessing, if the date
+    is not given and not in the name of **jsonfile** an error is raised
+    unless **default** is set
+
+    :param jsonfile: path to release JSON file, if name contains
+                     ``<month>_<day>_<year>`` that date is used
+    :type jsonfile: str
+    :param snapshot_date: date as ``YYYY-MM-DD``, used if set
+    :type snapshot_date: str
+    :param default: date used if **snapshot_date** is not set and
+                    **jsonfile** has no date in its name, ie today
+                    for releases that were just fetched
+    :type default: :py:class:`datetime.date`
+    :raises ValueError: if **snapshot_date** is not a valid date or
+                        no date is found and **default** is ``None``
+    :return: date of snapshot
+    :rtype: :py:class:`datetime.date`
+    """
+    if snapshot_date is not None:
+        return date.fromisoformat(snapshot_date)
+    match = SNAPSHOT_DATE_PATTERN.search(os.path.basename(jsonfile))
+    if match is None:
+        if default is None:
+            raise ValueError('No date, as <month>_<day>_<year>, in name of ' +
+                             jsonfile + '. Set date of snapshot with '
+                             '--snapshot-date')
+        LOGGER.warning('No date in name of ' + jsonfile + ', using ' +
+                       str(default) + ' as date of snapshot')
+        return default
+    return date(int(match.group('year')), int(match.group('month')),
+                int(match.group('day')))
+
+
+class SnapshotStore(object):
+    """
+    SQLite file of snapshots of the download count of every release
+    asset. Github only reports the total downloads of each asset so
+    far, downloads over a period are the difference between two
+    snapshots. Each asset is stored once, by its Github id, and each
+    snapshot has one count per asset.
+
+    Example:
+
+    .. code-block:: python
+
+        with SnapshotStore('downloads.sqlite') as store:
+            store.ingest(load_json_file('4_13_2021_releases.json'),
+                         snapshot_date=date(2021, 4, 13))
+            for row in store.iter_download_deltas():
+                print(row)
+    """
+    SCHEMA = [
+        'CREATE TABLE IF NOT EXISTS asset ('
+        ' asset_id INTEGER PRIMARY KEY,'
+        ' tag_name TEXT NOT NULL,'
+        ' name TEXT NOT NULL,'
+        ' created_at TEXT NOT NULL)',
+        'CREATE TABLE IF NOT EXISTS snapshot ('
+        ' snapshot_date TEXT PRIMARY KEY,'
+        ' source TEXT)',
+        'CREATE TABLE IF NOT EXISTS asset_count ('
+        ' asset_id INTEGER NOT NULL REFERENCES asset(asset_id),'
+        ' snapshot_date TEXT NOT NULL REFERENCES snapshot(snapshot_date),'
+        ' download_count INTEGER NOT NULL,'
+        ' PRIMARY KEY (asset_id, snapshot_date)) WITHOUT ROWID']
+
+    DELTA_QUERY = (
+        'SELECT a.asset_id, a.tag_name, a.name,'
+        ' COALESCE(LAG(c.snapshot_date) OVER w, a.created_at) AS start_date,'
+        ' c.snapshot_date AS end_date,'
+        ' c.download_count - COALESCE(LAG(c.download_count) OVER w, 0)'
+        ' AS downloads'
+        ' FROM asset_count c JOIN asset a ON a.asset_id = c.asset_id'
+        ' WINDOW w AS (PARTITION BY c.asset_id ORDER BY c.snapshot_date)'
+        ' ORDER BY end_date, a.asset_id')
+
+    def __init__(self, path=None):
+        """
+        Constructor, opens or creates **path**
+
+        :param path: path to SQLite file
+        :type path: str
+        """
+        self._conn = sqlite3.connect(path)
+        with self._conn:
+            for statement in SnapshotStore.SCHEMA:
+                self._conn.execute(statement)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """
+        Closes SQLite file
+
+        :return: None
+        """
+        self._conn.close()
+
+    def ingest(self, data=None, snapshot_date=None, source=None):
+        """
+        Adds download count of every asset in **data** as the
+        snapshot of **snapshot_date**, replacing any counts already
+        stored for that date. Assets are updated by id so the same
+        asset in many snapshots is stored once
+
+        :param data: Data loaded from github json
+        :type data: list
+        :param snapshot_date: date download counts were taken
+        :type snapshot_date: :py:class:`datetime.date`
+        :param source: where **data** came from, ie path of JSON file
+        :type source: str
+        :return: number of assets in snapshot
+        :rtype: int
+        """
+        assets = [(asset['id'], entry['tag_name'], asset['name'],
+                   asset['created_at'][0:10], asset['download_count'])
+                  for entry in data for asset in entry['assets']]
+        day = snapshot_date.isoformat()
+        with self._conn:
+            self._conn.execute('INSERT OR REPLACE INTO snapshot'
+                               ' (snapshot_date, source) VALUES (?, ?)',
+                               (day, source))
+            self._conn.execute('DELETE FROM asset_count'
+                               ' WHERE snapshot_date = ?', (day,))
+            self._conn.executemany('INSERT OR REPLACE INTO asset'
+                                   ' (asset_id, tag_name, name, created_at)'
+                                   ' VALUES (?, ?, ?, ?)',
+                                   [asset[:4] for asset in assets])
+            self._conn.executemany('INSERT OR REPLACE INTO asset_count'
+                                   ' (asset_id, snapshot_date, download_count)'
+                                   ' VALUES (?, ?, ?)',
+                                   [(asset[0], day, asset[4])
+                                    for asset in assets])
+        return len(assets)
+
+    def get_snapshot_dates(self):
+        """
+        :return: dates of snapshots in store, oldest first
+        :rtype: list
+        """
+        return [date.fromisoformat(row[0]) for row in
+                self._conn.execute('SELECT snapshot_date FROM snapshot'
+                                   ' ORDER BY snapshot_date')]
+
+    def iter_download_deltas(self):
+        """
+        Computes downloads of each asset between consecutive snapshots
+        with the ``LAG`` window function. For the first snapshot of an
+        asset the period starts on the day the asset was created
+
+        :return: generator of (asset id, tag name, asset name, start date,
+                 end date, downloads) tuples ordered by end date with
+                 dates as ``YYYY-MM-DD``
+        """
+        return self._conn.execute(SnapshotStore.DELTA_QUERY)
+
+
+def save_download_deltas(store=None, outfile=None, classifier=None):
+    """
+    Writes downloads of each asset between consecutive snapshots in
+    **store** to **outfile**.
+
+    Example of output:
+
+    .. code-block:: python
+
+        Version,File,Platform,StartDate,EndDate,Days,Downloads,DownloadsPerDay
+        3.8.2,Cytoscape_3_8_2_macos.dmg,mac,2021-04-13,2023-09-15,885,1204,1.36
+
+    Platform is the key of the :py:const:`ASSET_RULES` rule the file
+    matches, empty if it matches none
+
+    :param store: snapshots of download counts
+    :type store: :py:class:`SnapshotStore`
+    :param outfile: path to CSV file to write
+    :type outfile: str
+    :param classifier: classifier for files, if ``None`` one
+                       using :py:const:`ASSET_RULES` is created
+    :type classifier: :py:class:`AssetClassifier`
+    :return: number of rows written
+    :rtype: int
+    """
+    if classifier is None:
+        classifier = AssetClassifier()
+    num_rows = 0
+    with open(outfile, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Version', 'File', 'Platform', 'StartDate', 'EndDate',
+                         'Days', 'Downloads', 'DownloadsPerDay'])
+        for asset_id, tag_name, name, start_date, end_date, downloads in \
+                store.iter_download_deltas():
+            rule = classifier.classify(name)
+            days = (date.fromisoformat(end_date) -
+                    date.fromisoformat(start_date)).days
+            writer.writerow([tag_name, name,
+                             '' if rule is None else rule.key,
+                             start_date, end_date, days, downloads,
+                             '' if days <= 0 else round(downloads / days, 2)])
+            num_rows += 1
+    return num_rows
+
+
 def extract_releases(data=None):
     """
     Iterates through github json data dict to get the name of each file
@@ -199,18 +770,66 @@ def extract_releases(data=None):
     return release_dict
 
 
-def tabulate_downloads(release_dict=None):
+class AssetClassifier(object):
+    """
+    Classifies release assets by name using **rules**, compiled
+    into a single regular expression with one named group per rule
+    so each name is matched once instead of being tested against
+    each rule in turn. Results are remembered by name since the
+    same assets are seen again each time releases are processed
+    """
+    def __init__(self, rules=None):
+        """
+        Constructor
+
+        :param rules: rules in order of precedence, if ``None``
+                      :py:const:`ASSET_RULES` is used
+        :type rules: list
+        """
+        if rules is None:
+            rules = ASSET_RULES
+        self._rules = rules
+        self._matcher = re.compile('|'.join(['(?P<rule' + str(index) + '>' +
+                                             rule.pattern + ')'
+                                             for index, rule in enumerate(rules)]),
+                                   re.DOTALL)
+        self._classified = {}
+
+    def classify(self, name):
+        """
+        Classifies asset **name**
+
+        :param name: file name of asset
+        :type name: str
+        :return: first rule **name** matches or ``None`` if
+                 it matches none of them
+        :rtype: :py:class:`AssetRule`
+        """
+        try:
+            return self._classified[name]
+        except KeyError:
+            pass
+        match = self._matcher.fullmatch(name)
+        rule = None
+        if match is not None:
+            rule = self._rules[int(match.lastgroup[4:])]
+        self._classified[name] = rule
+        return rule
+
+
+def tabulate_downloads(release_dict=None, classifier=None):
     """
     Iterates through all the versions in `release_dict`
-    and classifies the file as: mac, windows, windows32, or linux
-    download files.
+    and classifies the file as: mac, macarm, windows, windows32, or linux
+    download files using :py:class:`AssetClassifier`.
 
-    Classification rules:
+    Classification rules, see :py:const:`ASSET_RULES`:
 
     windows32 - If file has .exe ending and 32bit in name
     windows - If file has .exe or .zip ending and NOT 32bit in name
-    linux - If file has .gz or .sh ending
-    mac - If file has .dmg ending
+    linux - If file has .gz or .sh ending or unix in name
+    macarm - If file has .dmg ending and aarch64 in name
+    mac - If file has .dmg ending and NOT aarch64 in name
 
     The following information is added to each version:
 
@@ -222,99 +841,387 @@ def tabulate_downloads(release_dict=None):
                     'windows32_downloads': <number of windows 32 downloads>,
                     'linux_downloads': <number of linux downloads>,
                     'total_downloads': <total number of downloads>,
-                    'created_at': <earliest creation date for files as date object>
+                    'created_at': <earliest creation date for files as date object>,
+                    'downloads_by_asset_type': {(<platform>, <architecture>,
+                                                 <installer>): <number of downloads>},
+                    'unclassified': {<file name>: <number of downloads>}
         }
 
+    Files in 'unclassified' match no rule and are not counted in
+    any of the totals
+
     :param release_dict: result from :py:func:`extract_releases`
     :type release_dict: dict
+    :param classifier: classifier for files, if ``None`` one
+                       using :py:const:`ASSET_RULES` is created
+    :type classifier: :py:class:`AssetClassifier`
     :return: same `release_dict` passed in, but with extra data added
              as described above
     :rtype: dict
     """
+    if classifier is None:
+        classifier = AssetClassifier()
     for version in release_dict:
-        windows32 = 0
-        windows = 0
-        linux = 0
-        mac = 0
-        mac_arm = 0
+        downloads = dict.fromkeys(ASSET_KEYS, 0)
+        by_asset_type = {}
+        unclassified = {}
         created_at = None
         for afile in release_dict[version]['files']:
             filename = afile['name']
-            if filename.endswith('.exe') and '32bit' in filename:
-                windows32 += afile['download_count']
-            elif filename.endswith('.exe') or filename.endswith('.zip'):
-                windows += afile['download_count']
-            elif filename.endswith('.sh') or filename.endswith('.gz') or 'unix' in filename:
-                linux += afile['download_count']
-            elif filename.endswith('.dmg'):
-                if 'aarch64' in filename:
-                    mac_arm += afile['download_count']
-                else:
-                    mac += afile['download_count']
-            else:
+            rule = classifier.classify(filename)
+            if rule is None:
                 LOGGER.warning('File does not match and '
                                'will not be counted: ' + filename)
+                unclassified[filename] = afile['download_count']
+            else:
+                downloads[rule.key] += afile['download_count']
+                asset_type = (rule.platform, rule.architecture, rule.installer)
+                by_asset_type[asset_type] = (by_asset_type.get(asset_type, 0) +
+                                             afile['download_count'])
             if created_at is None:
                 created_at = afile['created_at']
             elif afile['created_at'] < created_at:
                 created_at = afile['created_at']
 
-        release_dict[version]['mac_downloads'] = mac
-        release_dict[version]['macarm_downloads'] = mac_arm
-        release_dict[version]['windows_downloads'] = windows
-        release_dict[version]['windows32_downloads'] = windows32
-        release_dict[version]['linux_downloads'] = linux
-        release_dict[version]['total_downloads'] = windows + windows32 + linux + mac + mac_arm
+        for key in ASSET_KEYS:
+            release_dict[version][key + '_downloads'] = downloads[key]
+        release_dict[version]['total_downloads'] = sum(downloads.values())
         release_dict[version]['created_at'] = created_at
+        release_dict[version]['downloads_by_asset_type'] = by_asset_type
+        release_dict[version]['unclassified'] = unclassified
     return release_dict
 
 
-def add_days_as_primary_release(release_dict=None, version_list=None):
+class ReleaseTable(object):
+    """
+    Downloads of each release held in columns, one row per
+    release, so totals, platform shares and rates are computed
+    for all releases at once. Rows are in the order of
+    **versions**, newest release first as produced by
+    :py:meth:`from_release_dict`
     """
-    Iterates through the Cytoscape versions and calculates the days a given
-    version was the latest release. This is done by subtracting the days
-    of the released version from the release date of the next release.
+    def __init__(self, versions=None, version_tuples=None, created_at=None,
+                 downloads=None, days_as_latest_release=None):
+        """
+        Constructor
+
+        :param versions: version of each release, ie ``3.10.1``
+        :type versions: list
+        :param version_tuples: (major, minor, bugfix) of each release,
+                               ``-1`` for each part of a version that
+                               is not in that format
+        :type version_tuples: :py:class:`numpy.ndarray`
+        :param created_at: proleptic Gregorian ordinal of earliest
+                           creation date of files of each release
+        :type created_at: :py:class:`numpy.ndarray`
+        :param downloads: downloads of each release (row) for each
+                          of :py:const:`ASSET_KEYS` (column)
+        :type downloads: :py:class:`numpy.ndarray`
+        :param days_as_latest_release: days each release was the
+                                       latest, set by
+                                       :py:func:`add_days_as_primary_release`
+        :type days_as_latest_release: :py:class:`numpy.ndarray`
+        """
+        if versions is None:
+            versions = []
+        self.versions = versions
+        if version_tuples is None:
+            version_tuples = np.zeros((len(versions), 3), dtype=np.int64)
+        self.version_tuples = version_tuples
+        if created_at is None:
+            created_at = np.zeros(len(versions), dtype=np.int64)
+        self.created_at = created_at
+        if downloads is None:
+            downloads = np.zeros((len(versions), len(ASSET_KEYS)),
+                                 dtype=np.int64)
+        self.downloads = downloads
+        self.days_as_latest_release = days_as_latest_release
+
+    @staticmethod
+    def from_release_dict(release_dict=None, version_list=None):
+        """
+        Creates :py:class:`ReleaseTable` with one row per version
+
+        :param release_dict: result from :py:func:`tabulate_downloads`
+        :type release_dict: dict
+        :param version_list: versions in **release_dict** in the order
+                             rows should be in, newest first
+        :type version_list: list
+        :return: downloads of each release
+        :rtype: :py:class:`ReleaseTable`
+        """
+        version_tuples = [convert_version_to_numeric_tuple(version)
+                          for version in version_list]
+        return ReleaseTable(versions=list(version_list),
+                            version_tuples=np.array([(-1, -1, -1) if version_tuple is None
+                                                     else version_tuple
+                                                     for version_tuple in version_tuples],
+                                                    dtype=np.int64).reshape(-1, 3),
+                            created_at=np.array([release_dict[version]['created_at'].toordinal()
+                                                 for version in version_list],
+                                                dtype=np.int64),
+                            downloads=np.array([[release_dict[version][key + '_downloads']
+                                                 for key in ASSET_KEYS]
+                                                for version in version_list],
+                                               dtype=np.int64).reshape(-1, len(ASSET_KEYS)))
+
+    def __len__(self):
+        """
+        :return: number of releases
+        :rtype: int
+        """
+        return len(self.versions)
+
+    def get_downloads(self, key):
+        """
+        :param key: one of :py:const:`ASSET_KEYS`, ie ``mac``
+        :type key: str
+        :return: downloads of each release for **key**
+        :rtype: :py:class:`numpy.ndarray`
+        """
+        return self.downloads[:, ASSET_KEYS.index(key)]
+
+    def get_total_downloads(self):
+        """
+        :return: downloads of each release for all platforms
+        :rtype: :py:class:`numpy.ndarray`
+        """
+        return self.downloads.sum(axis=1)
+
+    def get_created_at_dates(self):
+        """
+        :return: earliest creation date of files of each release
+        :rtype: list
+        """
+        return [date.fromordinal(ordinal) for ordinal in self.created_at.tolist()]
+
+    def get_platform_shares(self):
+        """
+        :return: fraction of downloads of each release (row) for each
+                 of :py:const:`ASSET_KEYS` (column), ``0`` for releases
+                 without downloads
+        :rtype: :py:class:`numpy.ndarray`
+        """
+        total_downloads = self.get_total_downloads()[:, np.newaxis]
+        return np.divide(self.downloads, total_downloads,
+                         out=np.zeros(self.downloads.shape),
+                         where=total_downloads != 0)
+
+    def get_downloads_per_day(self):
+        """
+        :return: downloads of each release divided by the days
+                 it was the latest release, ``0`` for releases
+                 that were the latest for less than a day
+        :rtype: :py:class:`numpy.ndarray`
+        """
+        return np.divide(self.get_total_downloads(), self.days_as_latest_release,
+                         out=np.zeros(len(self)),
+                         where=self.days_as_latest_release > 0)
+
+    def get_cumulative_downloads(self):
+        """
+        :return: downloads of each release and all releases
+                 in rows after it, which for newest first order is
+                 the running total of downloads up to that release
+        :rtype: :py:class:`numpy.ndarray`
+        """
+        return np.cumsum(self.get_total_downloads()[::-1])[::-1]
+
+
+def add_days_as_primary_release(release_table=None, today=None):
+    """
+    Calculates the days each Cytoscape version was the latest release.
+    This is done by subtracting the release date of each version from
+    the release date of the next release.
     For the latest release, the current date is used.
 
-    This information is added in place to `release_dict`
-    under `version` dict:
+    This information is set on `release_table`:
 
-    ``release_dict[version]['days_as_latest_release']``
+    ``release_table.days_as_latest_release``
 
-    :param release_dict:
-    :type release_dict: dict
-    :param version_list: ordered list of Cytoscape versions
-    :type version_list: list
-    :return: `release_dict` with days as latest release information added.
+    :param release_table: downloads of each release, newest first
+    :type release_table: :py:class:`ReleaseTable`
+    :param today: date to use for latest release, if ``None``
+                  today's date is used
+    :type today: :py:class:`datetime.date`
+    :return: `release_table` with days as latest release set
+    :rtype: :py:class:`ReleaseTable`
+    """
+    if today is None:
+        today = date.today()
+    next_release_dates = np.concatenate(([today.toordinal()],
+                                         release_table.created_at[:-1]))
+    release_table.days_as_latest_release = next_release_dates - release_table.created_at
+    return release_table
+
+
+def get_release_report(release_table=None, today=None):
+    """
+    Computes totals, rates and platform shares of every release in
+    one pass over the columns of **release_table**
+
+    The report is a dict with these keys, arrays have one value per
+    row of **release_table**:
+
+    .. code-block::
+
+        {'total_downloads': <downloads of each release>,
+         'downloads_per_month': <downloads per day as latest release,
+                                 rounded, times 30>,
+         'cumulative_downloads': <downloads of each release and all
+                                  older ones>,
+         'platform_shares': <fraction of downloads of each release
+                             for each of ASSET_KEYS>,
+         'grand_total': <downloads of all releases>,
+         'grand_total_per_month': <downloads of all releases per 30 days
+                                   since oldest release>}
+
+    :param release_table: should be table after going through
+                          :py:func:`add_days_as_primary_release`
+    :type release_table: :py:class:`ReleaseTable`
+    :param today: date used for rate of all releases, if ``None``
+                  today's date is used
+    :type today: :py:class:`datetime.date`
+    :return: report as described above
     :rtype: dict
     """
-    next_release_date = date.today()
-    for version in version_list:
-        date_diff = next_release_date - release_dict[version]['created_at']
-        release_dict[version]['days_as_latest_release'] = date_diff.days
-        next_release_date = release_dict[version]['created_at']
+    if today is None:
+        today = date.today()
+    total_downloads = release_table.get_total_downloads()
+    downloads_per_day = release_table.get_downloads_per_day()
+    grand_total = int(total_downloads.sum())
+    days_since_first = 0
+    if len(release_table) > 0:
+        days_since_first = today.toordinal() - int(release_table.created_at[-1])
+    grand_total_per_month = 0
+    if days_since_first > 0:
+        grand_total_per_month = round(float(grand_total) / float(days_since_first) * 30)
+    return {'total_downloads': total_downloads,
+            'downloads_per_month': np.round(downloads_per_day).astype(np.int64) * 30,
+            'cumulative_downloads': release_table.get_cumulative_downloads(),
+            'platform_shares': release_table.get_platform_shares(),
+            'grand_total': grand_total,
+            'grand_total_per_month': grand_total_per_month}
+
+
+def print_release_report(release_table=None, report=None, out=sys.stdout):
+    """
+    Writes one line per release with its downloads per platform
+    followed by total downloads of all releases to **out**
+
+    :param release_table: should be table after going through
+                          :py:func:`add_days_as_primary_release`
+    :type release_table: :py:class:`ReleaseTable`
+    :param report: result of :py:func:`get_release_report`
+    :type report: dict
+    :param out: stream to write to
+    :return: None
+    """
+    if len(release_table) == 0:
+        return
+    lines = []
+    columns = zip(release_table.versions, release_table.get_created_at_dates(),
+                  release_table.days_as_latest_release.tolist(),
+                  report['total_downloads'].tolist(),
+                  report['downloads_per_month'].tolist(),
+                  *[release_table.get_downloads(key).tolist()
+                    for key in ['windows', 'windows32', 'mac', 'macarm', 'linux']])
+    for version, created_at, rel_days, total_dl, per_month, windows, windows32, mac, macarm, linux in columns:
+        lines.append(version + ' [' + str(created_at) +
+                     ' (' + str(rel_days) + ' days)] total => ' +
+                     str(total_dl) + ' {' + str(per_month) + ' per month}' +
+                     ' (windows=' + str(windows) +
+                     ', windows32=' + str(windows32) +
+                     ', mac=' + str(mac) +
+                     ', macarm=' + str(macarm) +
+                     ', linux=' + str(linux) + ')\n')
+    lines.append('Total downloads since ' + release_table.versions[-1] + ': ' +
+                 str(report['grand_total']) + ', ' +
+                 str(report['grand_total_per_month']) + ' downloads per month\n')
+    out.write(''.join(lines))
+
+
+def save_cumulative_downloads(release_table=None, report=None, outfile=None):
+    """
+    Writes downloads and running total of downloads of each release,
+    oldest first, to **outfile**
+
+    Example of output:
+
+    .. code-block:: python
 
+        Date,Downloads,Cumulative Downloads
+        2018-10-17,69516,69516
+        2019-01-04,214446,283962
+
+    :param release_table: downloads of each release, newest first
+    :type release_table: :py:class:`ReleaseTable`
+    :param report: result of :py:func:`get_release_report`
+    :type report: dict
+    :param outfile: path to CSV file to write
+    :type outfile: str
+    :return: None
+    """
+    with open(outfile, 'w', newline='', buffering=CSV_BUFFER_SIZE) as f:
+        writer = csv.writer(f, lineterminator='\n')
+        writer.writerow(['Date', 'Downloads', 'Cumulative Downloads'])
+        writer.writerows(zip(release_table.get_created_at_dates()[::-1],
+                             report['total_downloads'][::-1].tolist(),
+                             report['cumulative_downloads'][::-1].tolist()))
 
-def plot_downloads(release_dict=None, version_list=None,
-                   total_downloads=None,
+
+def save_release_report(release_table=None, report=None, outfile=None):
+    """
+    Writes every column of **report** to **outfile**, one row per
+    release, newest first.
+
+    Example of output:
+
+    .. code-block:: python
+
+        Version,CreatedAt,DaysAsLatestRelease,TotalDownloads,DownloadsPerMonth,CumulativeDownloads,MacShare,...
+        3.10.1,2023-08-31,15,13003,26010,1425049,0.0521,...
+
+    :param release_table: should be table after going through
+                          :py:func:`add_days_as_primary_release`
+    :type release_table: :py:class:`ReleaseTable`
+    :param report: result of :py:func:`get_release_report`
+    :type report: dict
+    :param outfile: path to CSV file to write
+    :type outfile: str
+    :return: None
+    """
+    with open(outfile, 'w', newline='', buffering=CSV_BUFFER_SIZE) as f:
+        writer = csv.writer(f, lineterminator='\n')
+        writer.writerow(['Version', 'CreatedAt', 'DaysAsLatestRelease',
+                         'TotalDownloads', 'DownloadsPerMonth',
+                         'CumulativeDownloads'] +
+                        [key.capitalize() + 'Share' for key in ASSET_KEYS])
+        writer.writerows(zip(release_table.versions,
+                             release_table.get_created_at_dates(),
+                             release_table.days_as_latest_release.tolist(),
+                             report['total_downloads'].tolist(),
+                             report['downloads_per_month'].tolist(),
+                             report['cumulative_downloads'].tolist(),
+                             *np.round(report['platform_shares'], 4).T.tolist()))
+
+
+def plot_downloads(release_table=None, total_downloads=None,
                    outdir=None):
     """
     Plots total downloads by version
 
-    :param release_dict: should be dict after going through
-                         :py:func:`extract_releases`,
-                         :py:func:`tabulate_downloads`,
-                         and :py:func:`add_days_as_primary_release`
-    :type release_dict: dict
-    :param version_list: ordered list of Cytoscape Versions
-    :type version_list: list
+    :param release_table: should be table after going through
+                          :py:func:`add_days_as_primary_release`
+    :type release_table: :py:class:`ReleaseTable`
     :param total_downloads: Total downloads for all versions
     :type total_downloads: int
     :return:
     """
-    downloads = []
-    for version in version_list:
-        downloads.append(release_dict[version]['total_downloads'])
+    import matplotlib.pyplot as plt
+
+    version_list = release_table.versions
+    downloads = release_table.get_total_downloads()
 
     x_pos = np.arange(len(version_list))
     fig, ax = plt.subplots()
@@ -335,30 +1242,26 @@ def plot_downloads(release_dict=None, version_list=None,
                                       transform=fig.transFigure, figure=fig,
                                       linewidth=2.0)])
     fig.set_tight_layout(True)
-    plt.savefig(outdir + '/downloads.svg')
-    plt.close()
+    plotting.save_figure(fig, os.path.join(outdir, 'downloads.svg'))
 
 
-def plot_downloads_by_day(release_dict=None, version_list=None,
-                          total_downloads=None,
+def plot_downloads_by_day(release_table=None, total_downloads=None,
                           outdir=None):
     """
     Plots total downloads by version divided by number of days version was
     latest release. This makes a more fair comparison.
 
-    :param release_dict: should be dict after going through
-                         :py:func:`extract_releases`,
-                         :py:func:`tabulate_downloads`,
-                         and :py:func:`add_days_as_primary_release`
-    :param version_list: ordered list of Cytoscape Versions
-    :type version_list: list
+    :param release_table: should be table after going through
+                          :py:func:`add_days_as_primary_release`
+    :type release_table: :py:class:`ReleaseTable`
     :param total_downloads: Total downloads for all versions
     :type total_downloads: int
     :return:
     """
-    downloads = []
-    for version in version_list:
-        downloads.append(release_dict[version]['total_downloads']/release_dict[version]['days_as_latest_release'])
+    import matplotlib.pyplot as plt
+
+    version_list = release_table.versions
+    downloads = release_table.get_downloads_per_day()
 
     x_pos = np.arange(len(version_list))
     fig, ax = plt.subplots()
@@ -377,40 +1280,30 @@ def plot_downloads_by_day(release_dict=None, version_list=None,
                                       fill=False, color='black', alpha=1, zorder=1000,
                                       transform=fig.transFigure, figure=fig, linewidth=2.0)])
     fig.set_tight_layout(True)
-    plt.savefig(outdir + '/downloads_byday.svg')
-    plt.close()
+    plotting.save_figure(fig, os.path.join(outdir, 'downloads_byday.svg'))
 
 
-def plot_downloads_by_platform(release_dict=None, version_list=None,
-                               outdir=None):
+def plot_downloads_by_platform(release_table=None, outdir=None):
     """
     Plots downloads by platform in a stacked bar chart
 
-    :param release_dict: should be dict after going through
-                         :py:func:`extract_releases`,
-                         :py:func:`tabulate_downloads`,
-                         and :py:func:`add_days_as_primary_release`
-    :param version_list: ordered list of Cytoscape Versions
-    :type version_list: list
+    :param release_table: should be table after going through
+                          :py:func:`add_days_as_primary_release`
+    :type release_table: :py:class:`ReleaseTable`
     :return:
     """
-    mac = []
-    macarm = []
-    linux = []
-    windows = []
-    windows32 = []
-    lin_mac = []
-    lin_mac_macarm = []
-    lin_mac_win = []
-    for version in version_list:
-        macarm.append(release_dict[version]['macarm_downloads']/release_dict[version]['total_downloads'])
-        mac.append(release_dict[version]['mac_downloads']/release_dict[version]['total_downloads'])
-        windows.append(release_dict[version]['windows_downloads']/release_dict[version]['total_downloads'])
-        windows32.append(release_dict[version]['windows32_downloads']/release_dict[version]['total_downloads'])
-        linux.append(release_dict[version]['linux_downloads']/release_dict[version]['total_downloads'])
-        lin_mac.append(linux[-1]+mac[-1])
-        lin_mac_macarm.append(lin_mac[-1]+macarm[-1])
-        lin_mac_win.append(lin_mac_macarm[-1] + windows[-1])
+    import matplotlib.pyplot as plt
+    import matplotlib.ticker as mtick
+
+    version_list = release_table.versions
+    shares = release_table.get_platform_shares()
+    mac, macarm, windows, windows32, linux = [shares[:, ASSET_KEYS.index(key)]
+                                              for key in ['mac', 'macarm',
+                                                          'windows', 'windows32',
+                                                          'linux']]
+    lin_mac = linux + mac
+    lin_mac_macarm = lin_mac + macarm
+    lin_mac_win = lin_mac_macarm + windows
 
     x_pos = np.arange(len(version_list))
     fig, ax = plt.subplots()
@@ -435,8 +1328,7 @@ def plot_downloads_by_platform(release_dict=None, version_list=None,
                                       fill=False, color='black', alpha=1, zorder=1000,
                                       transform=fig.transFigure, figure=fig, linewidth=2.0)])
     fig.set_tight_layout(True)
-    plt.savefig(outdir + '/downloads_by_platform.svg')
-    plt.close()
+    plotting.save_figure(fig, os.path.join(outdir, 'downloads_by_platform.svg'))
 
 
 def main(args):
@@ -460,57 +1352,100 @@ def main(args):
     # setup logging
     _setup_logging(theargs)
 
-    matplotlib.use(theargs.matplotlibgui)
-
-    if theargs.jsonfile is not None:
-        data = load_json_file(jsonfile=theargs.jsonfile)
-
-    release_dict = extract_releases(data=data)
-    final_dict = tabulate_downloads(release_dict=release_dict)
-    version_list = sorted(final_dict.keys(), key=functools.cmp_to_key(compare_versions), reverse=True)
-    add_days_as_primary_release(release_dict=final_dict, version_list=version_list)
-    grand_total = 0
-    csv_data = []
-
-    for version in version_list:
-        total_dl = float(final_dict[version]['total_downloads'])
-        rel_days = float(final_dict[version]['days_as_latest_release'])
-        print(version + ' [' + str(final_dict[version]['created_at']) +
-              ' (' + str(final_dict[version]['days_as_latest_release']) + ' days)] total => ' +
-              str(final_dict[version]['total_downloads']) + ' {' +
-              str(round(total_dl / rel_days)*30) + ' per month}' +
-              ' (windows=' + str(final_dict[version]['windows_downloads']) +
-              ', windows32=' + str(final_dict[version]['windows32_downloads']) +
-              ', mac=' + str(final_dict[version]['mac_downloads']) +
-              ', macarm=' + str(final_dict[version]['macarm_downloads']) +
-              ', linux=' + str(final_dict[version]['linux_downloads']) + ')')
-        csv_data.append([str(final_dict[version]['created_at']), str(final_dict[version]['total_downloads'])])
-        grand_total += final_dict[version]['total_downloads']
-
-    num_rel_days = date.today() - final_dict[version_list[-1]]['created_at']
-    print('Total downloads since ' + version_list[-1] + ': ' + str(grand_total) + ', ' +
-          str(round(float(grand_total)/float(num_rel_days.days)*30)) + ' downloads per month')
-
-    if theargs.plot_totaldownloads is True:
-        plot_downloads(release_dict=final_dict, version_list=version_list,
-                       total_downloads=grand_total,
-                       outdir=theargs.outdir)
-    plot_downloads_by_day(release_dict=final_dict, version_list=version_list,
-                          total_downloads=grand_total,
-                          outdir=theargs.outdir)
-    plot_downloads_by_platform(release_dict=final_dict,
-                               version_list=version_list,
-                               outdir=theargs.outdir)
-    csv_data.reverse()
-    prev_total = 0
-    for entry in csv_data:
-        entry.append(str(prev_total + int(entry[1])))
-        prev_total = int(entry[2])
-    with open(os.path.join(theargs.outdir, 'cumulative_downloads.csv'), 'w') as f:
-        f.write('Date,Downloads,Cumulative Downloads\n')
-        for entry in csv_data:
-            f.write(entry[0] + ',' + entry[1] + ',' + entry[2] + '\n')
-        f.flush()
+    profiler = profiling.StageProfiler.from_args(theargs, theargs.outdir)
+    if theargs.store is not None:
+        # check before fetching or processing anything
+        try:
+            snapshot_date = get_snapshot_date(jsonfile=theargs.jsonfile,
+                                              snapshot_date=theargs.snapshot_date,
+                                              default=date.today() if theargs.fetch else None)
+        except ValueError as e:
+            sys.stderr.write('Unable to get date of snapshot for '
+                             '--store: ' + str(e) + '\n')
+            return 1
+    if theargs.fetch is True:
+        cachedir = theargs.cachedir
+        if cachedir is None:
+            cachedir = os.path.join(theargs.outdir, 'github_cache')
+        with profiler.stage('fetch_releases') as stage:
+            data = fetch_releases(github_api=theargs.github_api,
+                                  cachedir=cachedir,
+                                  github_token=theargs.github_token,
+                                  workers=theargs.fetch_workers)
+            save_json_file(data=data, jsonfile=theargs.jsonfile)
+            stage['items'] = len(data)
+    elif theargs.jsonfile is not None:
+        with profiler.stage('load_json_file') as stage:
+            data = load_json_file(jsonfile=theargs.jsonfile)
+            stage['items'] = len(data)
+
+    if theargs.store is not None:
+        with SnapshotStore(theargs.store) as store:
+            with profiler.stage('ingest_snapshot') as stage:
+                stage['items'] = store.ingest(data=data,
+                                              snapshot_date=snapshot_date,
+                                              source=os.path.abspath(theargs.jsonfile))
+            LOGGER.info('Added snapshot of ' + str(snapshot_date) + ' to ' +
+                        theargs.store + ' which has ' +
+                        str(len(store.get_snapshot_dates())) + ' snapshots')
+            with profiler.stage('save_download_deltas') as stage:
+                stage['items'] = save_download_deltas(store=store,
+                                                      outfile=os.path.join(theargs.outdir,
+                                                                           'download_deltas.csv'))
+
+    with profiler.stage('extract_releases') as stage:
+        release_dict = extract_releases(data=data)
+        stage['items'] = len(release_dict)
+    with profiler.stage('tabulate_downloads') as stage:
+        final_dict = tabulate_downloads(release_dict=release_dict)
+        stage['items'] = len(final_dict)
+    unclassified = [(version, len(final_dict[version]['unclassified']),
+                     sum(final_dict[version]['unclassified'].values()))
+                    for version in final_dict
+                    if len(final_dict[version]['unclassified']) > 0]
+    for version, num_files, num_downloads in unclassified:
+        LOGGER.warning(version + ' has ' + str(num_files) +
+                       ' unclassified files with ' + str(num_downloads) +
+                       ' downloads that are not counted')
+    with profiler.stage('sort_versions') as stage:
+        version_list = sorted(final_dict.keys(), key=get_version_key, reverse=True)
+        stage['items'] = len(version_list)
+    with profiler.stage('build_release_table') as stage:
+        release_table = ReleaseTable.from_release_dict(release_dict=final_dict,
+                                                       version_list=version_list)
+        stage['items'] = len(release_table)
+    today = date.today()
+    with profiler.stage('add_days_as_primary_release'):
+        add_days_as_primary_release(release_table=release_table, today=today)
+    with profiler.stage('get_release_report') as stage:
+        report = get_release_report(release_table=release_table, today=today)
+        stage['items'] = len(release_table)
+    print_release_report(release_table=release_table, report=report)
+    grand_total = report['grand_total']
+
+    if theargs.no_plots is False:
+        plot_kwargs = {'release_table': release_table,
+                       'outdir': theargs.outdir}
+        jobs = []
+        if theargs.plot_totaldownloads is True:
+            jobs.append(('plot_downloads', plot_downloads,
+                         dict(plot_kwargs, total_downloads=grand_total)))
+        jobs.append(('plot_downloads_by_day', plot_downloads_by_day,
+                     dict(plot_kwargs, total_downloads=grand_total)))
+        jobs.append(('plot_downloads_by_platform', plot_downloads_by_platform,
+                     plot_kwargs))
+        with profiler.stage('render_figures') as stage:
+            plotting.render_figures(jobs, workers=theargs.plot_workers,
+                                    backend=theargs.matplotlibgui)
+            stage['items'] = len(jobs)
+    with profiler.stage('save_reports'):
+        save_cumulative_downloads(release_table=release_table, report=report,
+                                  outfile=os.path.join(theargs.outdir,
+                                                       'cumulative_downloads.csv'))
+        save_release_report(release_table=release_table, report=report,
+                            outfile=os.path.join(theargs.outdir,
+                                                 'release_report.csv'))
+    profiler.write_report()
 
 
 if __name__ == '__main__':  # pragma: no cover
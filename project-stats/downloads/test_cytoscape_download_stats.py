@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+
+"""
+Tests for fetching releases from Github with
+:py:func:`cytoscape_download_stats.fetch_releases`, run with::
+
+    python -m pytest project-stats/downloads
+
+Github is stood in for by a local HTTP server that serves pages of
+releases with ``Link`` and ``ETag`` headers like the real API.
+"""
+
+import os
+import sys
+import json
+import hashlib
+import threading
+import http.server
+import urllib.parse
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import cytoscape_download_stats
+
+
+class GithubStandIn(http.server.ThreadingHTTPServer):
+    """
+    Serves **pages** of releases under
+    :py:const:`cytoscape_download_stats.RELEASES_PATH` and records
+    each request as (page, If-None-Match header, status)
+    """
+    def __init__(self, pages):
+        super().__init__(('127.0.0.1', 0), GithubStandInHandler)
+        self.pages = pages
+        self.requests = []
+        self._lock = threading.Lock()
+
+    def get_etag(self, page):
+        body = json.dumps(self.pages[page - 1]).encode('utf-8')
+        return '"' + hashlib.sha1(body).hexdigest() + '"'
+
+    def record(self, page, if_none_match, status):
+        with self._lock:
+            self.requests.append((page, if_none_match, status))
+
+
+class GithubStandInHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        url = urllib.parse.urlparse(self.path)
+        query = urllib.parse.parse_qs(url.query)
+        page = int(query.get('page', ['1'])[0])
+        if url.path != cytoscape_download_stats.RELEASES_PATH or \
+                page > len(self.server.pages):
+            self._reply(404, b'[]')
+            return
+        etag = self.server.get_etag(page)
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match == etag:
+            self.server.record(page, if_none_match, 304)
+            self._reply(304, b'', etag=etag)
+            return
+        self.server.record(page, if_none_match, 200)
+        base_url = ('http://127.0.0.1:' + str(self.server.server_address[1]) +
+                    url.path + '?per_page=' + query['per_page'][0] + '&page=')
+        self._reply(200, json.dumps(self.server.pages[page - 1]).encode('utf-8'),
+                    etag=etag,
+                    link='<' + base_url + str(len(self.server.pages)) +
+                         '>; rel="last"')
+
+    def _reply(self, status, body, etag=None, link=None):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        if etag is not None:
+            self.send_header('ETag', etag)
+        if link is not None:
+            self.send_header('Link', link)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _make_release(tag_name):
+    return {'tag_name': tag_name, 'name': 'Cytoscape ' + tag_name,
+            'assets': [{'id': int(tag_name.replace('.', '')),
+                        'name': 'Cytoscape_' + tag_name.replace('.', '_') +
+                                '_macos.dmg',
+                        'download_count': 10,
+                        'created_at': '2023-01-01T00:00:00Z'}]}
+
+
+@pytest.fixture
+def github():
+    pages = [[_make_release('3.10.' + str(bugfix)) for bugfix in (2, 1, 0)],
+             [_make_release('3.9.' + str(bugfix)) for bugfix in (2, 1, 0)],
+             [_make_release('3.8.0')]]
+    server = GithubStandIn(pages)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _fetch(github, cachedir):
+    return cytoscape_download_stats.fetch_releases(
+        github_api='http://127.0.0.1:' + str(github.server_address[1]),
+        cachedir=str(cachedir), workers=3)
+
+
+def test_fetch_releases_returns_every_page_in_order(github, tmp_path):
+    releases = _fetch(github, tmp_path)
+    assert releases == github.pages[0] + github.pages[1] + github.pages[2]
+    assert github.requests[0] == (1, None, 200)
+    assert sorted(github.requests) == [(1, None, 200), (2, None, 200),
+                                       (3, None, 200)]
+
+
+def test_second_fetch_reuses_cached_pages(github, tmp_path):
+    first = _fetch(github, tmp_path)
+    github.requests.clear()
+
+    second = _fetch(github, tmp_path)
+    assert second == first
+    assert sorted(github.requests) == [(page, github.get_etag(page), 304)
+                                       for page in (1, 2, 3)]
+
+
+def test_changed_page_replaces_cache_entry(github, tmp_path):
+    _fetch(github, tmp_path)
+    old_etag = github.get_etag(2)
+    github.pages[1][0]['assets'][0]['download_count'] = 99
+    github.requests.clear()
+
+    releases = _fetch(github, tmp_path)
+    assert releases[3]['assets'][0]['download_count'] == 99
+    assert sorted(github.requests) == [(1, github.get_etag(1), 304),
+                                       (2, old_etag, 200),
+                                       (3, github.get_etag(3), 304)]
+
+    cache = cytoscape_download_stats.GithubPageCache(cachedir=str(tmp_path))
+    url = cytoscape_download_stats.get_releases_page_url(
+        github_api='http://127.0.0.1:' + str(github.server_address[1]),
+        page=2)
+    entry = cache.get(url)
+    assert entry['etag'] == github.get_etag(2)
+    assert entry['body'] == github.pages[1]
+
+    github.requests.clear()
+    assert _fetch(github, tmp_path) == releases
+    assert (2, github.get_etag(2), 304) in github.requests
@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+
+"""
+Code shared by the scripts under project-stats. Scripts add the
+project-stats directory to ``sys.path`` before importing from here
+so they can still be run directly from their own directories.
+"""
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+
+import sys
+import importlib.util
+
+
+def lazy_import(name):
+    """
+    Returns module **name** without running it. The module is
+    only imported the first time one of its attributes is used, so
+    scripts can bind heavy modules such as numpy at the top of the
+    file without ``--help`` and runs that never touch them paying
+    for the import.
+
+    Example:
+
+    .. code-block:: python
+
+        np = lazy_import('numpy')
+
+        def get_total(counts):
+            # numpy is imported here, on first use
+            return int(np.sum(counts))
+
+    :param name: name of module to import
+    :type name: str
+    :raises ImportError: if module **name** cannot be found
+    :return: module that is imported on first attribute access
+    :rtype: module
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ImportError('No module named ' + name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+
+import os
+import time
+import logging
+import multiprocessing
+
+from statscommon.timeseries import decimate
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+DEFAULT_BACKEND = 'svg'
+"""
+Non-interactive matplotlib backend used to render figures
+"""
+
+
+def add_plot_arguments(parser):
+    """
+    Adds ``--plot-workers`` argument to **parser**
+
+    :param parser: parser to add arguments to
+    :type parser: :py:class:`argparse.ArgumentParser`
+    :return: None
+    """
+    parser.add_argument('--plot-workers', type=int,
+                        default=min(3, os.cpu_count() or 1),
+                        help='Number of processes used to render figures. '
+                             'Each figure is rendered in its own process '
+                             'so the figures take about as long as the '
+                             'slowest one. 1 renders them one after '
+                             'another in this process')
+
+
+def save_figure(fig, path):
+    """
+    Saves **fig** to **path** and closes it. The figure is written
+    under a temporary name and renamed so a reader never sees a
+    partially written file. The format is taken from the extension
+    of **path**
+
+    :param fig: figure to save
+    :type fig: :py:class:`matplotlib.figure.Figure`
+    :param path: file to write, ie ``/tmp/out/downloads.svg``
+    :type path: str
+    :return: None
+    """
+    import matplotlib.pyplot as plt
+
+    tmp_path = path + '.tmp'
+    try:
+        fig.savefig(tmp_path, format=os.path.splitext(path)[1][1:])
+        os.replace(tmp_path, path)
+    finally:
+        plt.close(fig)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def plot_daily_counts(daily_counts, path, label='Starts', title=None,
+                      tick_rotation=-45, rolling_window=None,
+                      max_points=None):
+    """
+    Plots count for each day as a line with a tick at the
+    start of each year and saves it with :py:func:`save_figure`.
+    If set, the **rolling_window** day mean is drawn over the
+    daily counts and **max_points** limits the number of points
+    of each line, see :py:func:`statscommon.timeseries.decimate`,
+    which keeps svg output small for series spanning many years
+
+    :param daily_counts: counts for each day
+    :type daily_counts: :py:class:`statscommon.timeseries.DailyCounts`
+    :param path: file to write, ie ``/tmp/out/starts_per_day.svg``
+    :type path: str
+    :param label: what is being counted, used in axis label and title
+    :type label: str
+    :param title: title, total is appended in parenthesis, defaults to
+                  ``Total <label> by Day``
+    :type title: str
+    :param tick_rotation: rotation in degrees of year tick labels
+    :type tick_rotation: int
+    :param rolling_window: number of days to average over for
+                           mean line, ``None`` or ``0`` for no mean line
+    :type rolling_window: int
+    :param max_points: maximum number of points to draw for each line,
+                       ``None`` or ``0`` to draw every day
+    :type max_points: int
+    :return: None
+    """
+    import numpy as np
+    import matplotlib.pyplot as plt
+
+    if title is None:
+        title = 'Total ' + label + ' by Day'
+    x_pos, x_years = daily_counts.get_year_start_positions()
+
+    fig, ax = plt.subplots()
+    indexes = decimate(daily_counts.counts, max_points)
+    if rolling_window:
+        ax.plot(indexes, daily_counts.counts[indexes], alpha=0.4,
+                label='Per day')
+        means = daily_counts.rolling_mean(window=rolling_window)
+        # the mean is smooth so evenly spaced points are enough
+        step = max(1, -(-len(means) // max_points)) if max_points else 1
+        mean_indexes = np.arange(rolling_window - 1, len(means), step)
+        ax.plot(mean_indexes, means[mean_indexes], color='C1',
+                label=str(rolling_window) + ' day mean')
+        ax.legend(loc='upper left')
+    else:
+        ax.plot(indexes, daily_counts.counts[indexes])
+    ax.set_xticks(x_pos)
+    ax.set_xticklabels([str(year) for year in x_years.tolist()],
+                       rotation=tick_rotation)
+    ax.set_xlabel('Year', fontweight='bold')
+    ax.set_ylabel('# ' + label, fontweight='bold')
+
+    ax.set_title(title + ' (' + '{:,}'.format(daily_counts.get_total()) + ')',
+                 fontweight='bold')
+
+    fig.patches.extend([plt.Rectangle((0, 0), 1, 1,
+                                      fill=False, color='black', alpha=1,
+                                      zorder=1000,
+                                      transform=fig.transFigure, figure=fig,
+                                      linewidth=2.0)])
+    fig.set_tight_layout(True)
+    save_figure(fig, path)
+
+
+def _use_backend(backend):
+    """
+    Selects matplotlib **backend**, run in each process that
+    renders figures before :py:mod:`matplotlib.pyplot` is imported
+
+    :param backend: matplotlib backend
+    :type backend: str
+    :return: None
+    """
+    import matplotlib
+    matplotlib.use(backend)
+
+
+def _render_figure(job):
+    """
+    Calls the plot function of **job**
+
+    :param job: (name, plot function, dict of keyword arguments)
+    :type job: tuple
+    :return: (name, seconds it took to render)
+    :rtype: tuple
+    """
+    name, plot_func, kwargs = job
+    start = time.perf_counter()
+    plot_func(**kwargs)
+    return name, time.perf_counter() - start
+
+
+def render_figures(jobs, workers=3, backend=DEFAULT_BACKEND):
+    """
+    Renders independent figures. Each job is a tuple of
+    (name, plot function, dict of keyword arguments). Plot functions
+    must be defined at module level so they can be passed to other
+    processes, and should write their output with
+    :py:func:`save_figure`.
+
+    Example:
+
+    .. code-block:: python
+
+        render_figures([('plot_downloads', plot_downloads,
+                         {'release_dict': release_dict,
+                          'outdir': outdir})], workers=3)
+
+    :param jobs: figures to render
+    :type jobs: list
+    :param workers: number of processes to render with, if
+                    ``1`` or less or there is only one job the
+                    figures are rendered in this process
+    :type workers: int
+    :param backend: matplotlib backend, should be non-interactive
+                    when **workers** is greater than 1
+    :type backend: str
+    :return: seconds each figure took to render keyed by name
+    :rtype: dict
+    """
+    if workers is None or workers <= 1 or len(jobs) <= 1:
+        _use_backend(backend)
+        results = [_render_figure(job) for job in jobs]
+    else:
+        with multiprocessing.Pool(processes=min(workers, len(jobs)),
+                                  initializer=_use_backend,
+                                  initargs=(backend,)) as pool:
+            results = pool.map(_render_figure, jobs, chunksize=1)
+    for name, seconds in results:
+        LOGGER.info('Rendered ' + name + ' in ' +
+                    str(round(seconds, 3)) + ' seconds')
+    return dict(results)
@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import time
+import json
+import logging
+import contextlib
+
+try:
+    import resource
+except ImportError:  # pragma: no cover
+    resource = None
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+PROFILE_REPORT = 'profile_report.json'
+"""
+Name of file written to output directory
+of a script when --profile is set
+"""
+
+
+def add_profile_arguments(parser):
+    """
+    Adds ``--profile`` and ``--profile-stage`` arguments to **parser**
+
+    :param parser: parser to add arguments to
+    :type parser: :py:class:`argparse.ArgumentParser`
+    :return: None
+    """
+    parser.add_argument('--profile', action='store_true',
+                        help='If set, wall time, CPU time, peak memory and '
+                             'number of items processed by each stage are '
+                             'written to ' + PROFILE_REPORT + ' in the '
+                             'output directory and printed to standard out')
+    parser.add_argument('--profile-stage', default=None,
+                        help='Name of stage, as listed in ' +
+                             PROFILE_REPORT + ', to also run under cProfile '
+                             'when --profile is set. Statistics are dumped '
+                             'to profile_<stage>.pstats in the output '
+                             'directory and the functions with the most '
+                             'cumulative time are written to '
+                             'profile_<stage>.txt')
+
+
+def get_peak_rss_mb():
+    """
+    Gets peak resident set size of this process and of its largest
+    finished child process
+
+    :return: (peak of this process, peak of largest child) in
+             megabytes or (``None``, ``None``) if not available
+             on this platform
+    :rtype: tuple
+    """
+    if resource is None:
+        return None, None
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale,
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale)
+
+
+def _get_cpu_seconds():
+    """
+    :return: user plus system CPU seconds of this process and its
+             finished child processes
+    :rtype: float
+    """
+    usage = os.times()
+    return usage.user + usage.system + usage.children_user +\
+        usage.children_system
+
+
+class StageProfiler(object):
+    """
+    Records wall time, CPU time, peak memory and number of
+    items processed for named stages of a script. Stages run
+    more than once, ie a download done per app, are added
+    together. When not enabled :py:func:`stage` does nothing
+    so scripts can always wrap their stages.
+
+    Example:
+
+    .. code-block:: python
+
+        profiler = StageProfiler(enabled=True, outdir='/tmp/out')
+        with profiler.stage('load_json') as stage:
+            data = load_json_file(jsonfile)
+            stage['items'] = len(data)
+        profiler.write_report()
+    """
+    def __init__(self, enabled=False, outdir=None, cprofile_stage=None):
+        """
+        Constructor
+
+        :param enabled: if ``False`` nothing is recorded
+        :type enabled: bool
+        :param outdir: directory to write report to
+        :type outdir: str
+        :param cprofile_stage: name of stage to run under cProfile
+        :type cprofile_stage: str
+        """
+        self.enabled = enabled
+        self.outdir = outdir
+        self.cprofile_stage = cprofile_stage
+        self._stages = {}
+        self._cprofile = None
+        self._start_wall = time.perf_counter()
+
+    @staticmethod
+    def from_args(theargs, outdir):
+        """
+        Creates profiler from arguments added by
+        :py:func:`add_profile_arguments`
+
+        :param theargs: parsed command line arguments
+        :param outdir: directory to write report to
+        :type outdir: str
+        :return: profiler
+        :rtype: :py:class:`StageProfiler`
+        """
+        return StageProfiler(enabled=theargs.profile, outdir=outdir,
+                             cprofile_stage=theargs.profile_stage)
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """
+        Context manager that records the code run within it as stage
+        **name**. It yields a dict, setting ``items`` in that dict
+        records the number of items the stage processed
+
+        :param name: name of stage
+        :type name: str
+        :return: dict to put ``items`` in
+        """
+        record = {}
+        if self.enabled is not True:
+            yield record
+            return
+        if name == self.cprofile_stage:
+            if self._cprofile is None:
+                import cProfile
+                self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        peak_before, _ = get_peak_rss_mb()
+        start_cpu = _get_cpu_seconds()
+        start_wall = time.perf_counter()
+        try:
+            yield record
+        finally:
+            wall_seconds = time.perf_counter() - start_wall
+            cpu_seconds = _get_cpu_seconds() - start_cpu
+            if name == self.cprofile_stage:
+                self._cprofile.disable()
+            self._add_stage(name, wall_seconds, cpu_seconds, peak_before,
+                            record.get('items'))
+
+    def _add_stage(self, name, wall_seconds, cpu_seconds, peak_before,
+                   items):
+        """
+        Adds measurements of one run of stage **name**
+
+        :return: None
+        """
+        peak_rss, peak_child_rss = get_peak_rss_mb()
+        stage = self._stages.get(name)
+        if stage is None:
+            stage = {'name': name, 'calls': 0, 'wall_seconds': 0.0,
+                     'cpu_seconds': 0.0, 'peak_rss_increase_mb': 0.0,
+                     'items': None}
+            self._stages[name] = stage
+        stage['calls'] += 1
+        stage['wall_seconds'] += wall_seconds
+        stage['cpu_seconds'] += cpu_seconds
+        stage['peak_rss_mb'] = peak_rss
+        stage['peak_child_rss_mb'] = peak_child_rss
+        if peak_rss is not None:
+            stage['peak_rss_increase_mb'] += peak_rss - peak_before
+        if items is not None:
+            stage['items'] = (stage['items'] or 0) + items
+        LOGGER.debug('Stage ' + name + ' took ' +
+                     str(round(wall_seconds, 4)) + ' seconds')
+
+    def get_report(self):
+        """
+        :return: stages in the order they first ran along with
+                 totals for the whole run
+        :rtype: dict
+        """
+        stages = []
+        for stage in self._stages.values():
+            stage = dict(stage)
+            for key in ['wall_seconds', 'cpu_seconds']:
+                stage[key] = round(stage[key], 4)
+            for key in ['peak_rss_mb', 'peak_child_rss_mb',
+                        'peak_rss_increase_mb']:
+                if stage[key] is not None:
+                    stage[key] = round(stage[key], 1)
+            if stage['items'] is not None and stage['wall_seconds'] > 0:
+                stage['items_per_second'] = round(stage['items'] /
+                                                  stage['wall_seconds'], 1)
+            stages.append(stage)
+        peak_rss, peak_child_rss = get_peak_rss_mb()
+        return {'script': os.path.basename(sys.argv[0]),
+                'stages': stages,
+                'total_wall_seconds': round(time.perf_counter() -
+                                            self._start_wall, 4),
+                'peak_rss_mb': peak_rss,
+                'peak_child_rss_mb': peak_child_rss}
+
+    def write_report(self):
+        """
+        Writes :py:const:`PROFILE_REPORT` and cProfile output, if
+        requested, to output directory and prints a table of the
+        stages to standard out. Does nothing if not enabled
+
+        :return: None
+        """
+        if self.enabled is not True:
+            return
+        report = self.get_report()
+        with open(os.path.join(self.outdir, PROFILE_REPORT), 'w') as f:
+            json.dump(report, f, indent=2)
+
+        print('{:<32}{:>7}{:>12}{:>12}{:>14}{:>12}'.format('Stage', 'Calls',
+                                                           'Wall (s)',
+                                                           'CPU (s)',
+                                                           'Peak RSS (MB)',
+                                                           'Items'))
+        for stage in report['stages']:
+            print('{:<32}{:>7}{:>12.3f}{:>12.3f}{:>14}{:>12}'.format(stage['name'],
+                                                                     stage['calls'],
+                                                                     stage['wall_seconds'],
+                                                                     stage['cpu_seconds'],
+                                                                     str(stage['peak_rss_mb']),
+                                                                     str(stage['items'] if stage['items']
+                                                                         is not None else '')))
+        print('Total wall time: ' + str(report['total_wall_seconds']) +
+              ' seconds')
+
+        if self.cprofile_stage is None:
+            return
+        if self._cprofile is None:
+            LOGGER.warning('Stage ' + self.cprofile_stage +
+                           ' passed to --profile-stage never ran')
+            return
+        prefix = os.path.join(self.outdir, 'profile_' + self.cprofile_stage)
+        self._cprofile.dump_stats(prefix + '.pstats')
+        import pstats
+        with open(prefix + '.txt', 'w') as f:
+            stats = pstats.Stats(self._cprofile, stream=f)
+            stats.sort_stats('cumulative').print_stats(40)
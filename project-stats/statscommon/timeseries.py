@@ -0,0 +1,544 @@
+# -*- coding: utf-8 -*-
+
+from datetime import date
+
+from statscommon.lazyimport import lazy_import
+
+np = lazy_import('numpy')
+
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+"""
+Proleptic Gregorian ordinal of 1970-01-01
+"""
+
+MONTH_NUMBERS = {b'Jan': 1, b'Feb': 2, b'Mar': 3, b'Apr': 4,
+                 b'May': 5, b'Jun': 6, b'Jul': 7, b'Aug': 8,
+                 b'Sep': 9, b'Oct': 10, b'Nov': 11, b'Dec': 12}
+"""
+Month abbreviations in access log timestamps mapped to month number
+"""
+
+MONTH_NAMES = {value: key.decode('ascii')
+               for key, value in MONTH_NUMBERS.items()}
+"""
+Month number mapped to month abbreviation used in access logs
+"""
+
+ACCESS_LOG_DAY = 'access_log'
+"""
+Day format of Apache access logs, ie ``03/Apr/2022``
+"""
+
+ISO_DAY = 'iso'
+"""
+ISO 8601 day format, ie ``2022-04-03``
+"""
+
+RESAMPLE_PERIODS = ['day', 'week', 'month', 'year']
+"""
+Periods :py:func:`DailyCounts.resample` can sum counts by.
+Weeks start on Monday
+"""
+
+
+def get_day_ordinal(day):
+    """
+    Converts **day**, either in access log format, ie ``03/Apr/2022``,
+    or ISO format, ie ``2022-04-03``, to its proleptic Gregorian
+    ordinal without going through :py:func:`datetime.strptime`
+
+    :param day: day, any text after the day is ignored
+    :type day: str or bytes
+    :return: ordinal of day
+    :rtype: int
+    """
+    if isinstance(day, str):
+        day = day.encode('ascii')
+    if day[4:5] == b'-':
+        return date(int(day[0:4]), int(day[5:7]),
+                    int(day[8:10])).toordinal()
+    return date(int(day[7:11]), MONTH_NUMBERS[day[3:6]],
+                int(day[0:2])).toordinal()
+
+
+def format_day(ordinal, day_format=ACCESS_LOG_DAY):
+    """
+    Converts proleptic Gregorian **ordinal** to a day string
+
+    :param ordinal: ordinal of day
+    :type ordinal: int
+    :param day_format: :py:const:`ACCESS_LOG_DAY` or :py:const:`ISO_DAY`
+    :type day_format: str
+    :return: day, ie ``03/Apr/2022`` or ``2022-04-03``
+    :rtype: str
+    """
+    day = date.fromordinal(ordinal)
+    if day_format == ISO_DAY:
+        return day.isoformat()
+    return '{:02d}/{}/{:04d}'.format(day.day, MONTH_NAMES[day.month],
+                                     day.year)
+
+
+def get_year_ticks(days):
+    """
+    Finds the positions of 01/Jan of each year in **days**, used to
+    place year ticks on plots
+
+    :param days: ascending days
+    :type days: :py:class:`numpy.ndarray` of ``datetime64[D]``
+    :return: (indexes into **days**, year at each index)
+    :rtype: tuple
+    """
+    years = days.astype('datetime64[Y]')
+    positions = np.flatnonzero(days == years)
+    return positions, years[positions].astype(np.int64) + 1970
+
+
+def get_period_boundaries(days, period='month'):
+    """
+    Finds where each **period** starts in **days**
+
+    :param days: consecutive days
+    :type days: :py:class:`numpy.ndarray` of ``datetime64[D]``
+    :param period: one of :py:const:`RESAMPLE_PERIODS`
+    :type period: str
+    :raises ValueError: if **period** is not supported
+    :return: (first day of each period, index into **days** where each
+              period starts)
+    :rtype: tuple
+    """
+    if period not in RESAMPLE_PERIODS:
+        raise ValueError('Unsupported period: ' + str(period))
+    if period == 'day' or len(days) == 0:
+        return days, np.arange(len(days))
+    if period == 'week':
+        # 1970-01-01 was a Thursday, so Monday is 3 days before
+        weekdays = (days.astype(np.int64) + 3) % 7
+        period_starts = (days - weekdays).astype('datetime64[D]')
+    elif period == 'month':
+        period_starts = days.astype('datetime64[M]').astype('datetime64[D]')
+    else:
+        period_starts = days.astype('datetime64[Y]').astype('datetime64[D]')
+    boundaries = np.flatnonzero(np.diff(period_starts.astype(np.int64),
+                                        prepend=np.int64(-2**62)))
+    return period_starts[boundaries], boundaries
+
+
+def resample_counts(days, counts, period='month'):
+    """
+    Sums **counts** by **period**
+
+    :param days: consecutive days
+    :type days: :py:class:`numpy.ndarray` of ``datetime64[D]``
+    :param counts: count for each of **days**, a 2 dimensional array
+                   holds one series per row
+    :type counts: :py:class:`numpy.ndarray`
+    :param period: one of :py:const:`RESAMPLE_PERIODS`
+    :type period: str
+    :raises ValueError: if **period** is not supported
+    :return: (first day of each period, total for each period).
+             Only periods from the first to the last day are
+             included, so the first and last period may be partial
+    :rtype: tuple
+    """
+    period_starts, boundaries = get_period_boundaries(days, period=period)
+    if period == 'day' or len(days) == 0:
+        return period_starts, counts.copy()
+    return period_starts, np.add.reduceat(counts, boundaries, axis=-1)
+
+
+def decimate(values, max_points):
+    """
+    Picks at most about **max_points** indexes of **values** to plot.
+    **values** is split into ``max_points / 2`` equal buckets and the
+    smallest and largest value of each bucket are kept, in order, so
+    spikes and dips still show up on a line plot of the picked points.
+    The first and last index are always kept
+
+    :param values: values to plot, without ``NaN``
+    :type values: :py:class:`numpy.ndarray`
+    :param max_points: number of points to keep, ``None`` or values
+                       less than 2 keep every point
+    :type max_points: int
+    :return: sorted indexes into **values**
+    :rtype: :py:class:`numpy.ndarray`
+    """
+    num_values = len(values)
+    if max_points is None or max_points < 2 or num_values <= max_points:
+        return np.arange(num_values)
+    bucket_size = -(-num_values // (max_points // 2))
+    num_buckets = -(-num_values // bucket_size)
+    # pad last bucket with the last value, padded indexes are
+    # clipped back onto the last value below
+    padded = np.concatenate((values, np.repeat(values[-1:],
+                                               num_buckets * bucket_size -
+                                               num_values)))
+    buckets = padded.reshape(num_buckets, bucket_size)
+    bucket_starts = np.arange(num_buckets) * bucket_size
+    picked = np.stack((bucket_starts + buckets.argmin(axis=1),
+                       bucket_starts + buckets.argmax(axis=1)), axis=1)
+    return np.unique(np.concatenate(([0, num_values - 1],
+                                     np.minimum(picked.ravel(),
+                                                num_values - 1))))
+
+
+class DailyCounts(object):
+    """
+    Counts for each day held in a dense numpy array where
+    index ``i`` is the count for the day whose proleptic Gregorian
+    ordinal is ``first_ordinal + i``. Days between the first and
+    last day that have no entries are zero so sorting, gap filling,
+    resampling and year roll ups are array operations instead of
+    work on date strings.
+
+    Example:
+
+    .. code-block:: python
+
+        daily_counts = DailyCounts.from_dict({'2022-04-03': 5,
+                                              '2022-04-05': 2})
+        daily_counts.counts                   # array([5, 0, 2])
+        days, totals = daily_counts.resample('month')
+    """
+    def __init__(self, first_ordinal=EPOCH_ORDINAL, counts=None):
+        """
+        Constructor
+
+        :param first_ordinal: ordinal of day at index 0 of **counts**
+        :type first_ordinal: int
+        :param counts: count for each day
+        :type counts: :py:class:`numpy.ndarray`
+        """
+        self.first_ordinal = first_ordinal
+        if counts is None:
+            counts = np.zeros(0, dtype=np.int64)
+        self.counts = counts
+
+    @staticmethod
+    def from_dict(day_dict=None):
+        """
+        Creates :py:class:`DailyCounts` from **day_dict**
+
+        :param day_dict: dict where key is day in any format
+                         :py:func:`get_day_ordinal` accepts, ie
+                         ``03/Apr/2022`` or ``2022-04-03``, and
+                         value is count
+        :type day_dict: dict
+        :return: counts for every day from first to last day
+        :rtype: :py:class:`DailyCounts`
+        """
+        if day_dict is None or len(day_dict) == 0:
+            return DailyCounts()
+        ordinals = np.fromiter((get_day_ordinal(key) for key in day_dict),
+                               dtype=np.int64, count=len(day_dict))
+        values = np.fromiter(day_dict.values(), dtype=np.int64,
+                             count=len(day_dict))
+        return DailyCounts.from_ordinals(ordinals, values)
+
+    @staticmethod
+    def from_ordinals(ordinals, values):
+        """
+        Creates :py:class:`DailyCounts` by adding up **values**
+        by day
+
+        :param ordinals: proleptic Gregorian ordinal of day of each value,
+                         in any order and with repeats
+        :type ordinals: :py:class:`numpy.ndarray`
+        :param values: counts
+        :type values: :py:class:`numpy.ndarray`
+        :return: counts for every day from first to last day
+        :rtype: :py:class:`DailyCounts`
+        """
+        if len(ordinals) == 0:
+            return DailyCounts()
+        first_ordinal = int(ordinals.min())
+        counts = np.zeros(int(ordinals.max()) - first_ordinal + 1,
+                          dtype=np.int64)
+        np.add.at(counts, ordinals - first_ordinal, values)
+        return DailyCounts(first_ordinal=first_ordinal, counts=counts)
+
+    def __len__(self):
+        """
+        :return: number of days from first to last day
+        :rtype: int
+        """
+        return len(self.counts)
+
+    def get_last_ordinal(self):
+        """
+        :return: ordinal of last day
+        :rtype: int
+        """
+        return self.first_ordinal + len(self.counts) - 1
+
+    def get_total(self):
+        """
+        :return: sum of counts for all days
+        :rtype: int
+        """
+        return int(self.counts.sum())
+
+    def get_days(self):
+        """
+        :return: each day from first to last day
+        :rtype: :py:class:`numpy.ndarray` of ``datetime64[D]``
+        """
+        return (np.arange(len(self.counts), dtype=np.int64) +
+                (self.first_ordinal - EPOCH_ORDINAL)).astype('datetime64[D]')
+
+    def get_years(self):
+        """
+        :return: year of each day from first to last day
+        :rtype: :py:class:`numpy.ndarray`
+        """
+        return self.get_days().astype('datetime64[Y]').astype(np.int64) + 1970
+
+    def fill_to(self, first_ordinal, last_ordinal):
+        """
+        Gets counts for every day from **first_ordinal** to
+        **last_ordinal**. Days outside of this series are zero,
+        used to line up series that cover different days
+
+        :param first_ordinal: ordinal of first day
+        :type first_ordinal: int
+        :param last_ordinal: ordinal of last day
+        :type last_ordinal: int
+        :return: counts for each day in range
+        :rtype: :py:class:`DailyCounts`
+        """
+        counts = np.zeros(max(last_ordinal - first_ordinal + 1, 0),
+                          dtype=np.int64)
+        start = max(first_ordinal, self.first_ordinal)
+        end = min(last_ordinal, self.get_last_ordinal())
+        if start <= end:
+            counts[start - first_ordinal:end - first_ordinal + 1] =\
+                self.counts[start - self.first_ordinal:end - self.first_ordinal + 1]
+        return DailyCounts(first_ordinal=first_ordinal, counts=counts)
+
+    def resample(self, period='month'):
+        """
+        Sums counts by **period**
+
+        :param period: one of :py:const:`RESAMPLE_PERIODS`
+        :type period: str
+        :raises ValueError: if **period** is not supported
+        :return: (first day of each period, total for each period).
+                 Only periods from the first to the last day are
+                 included, so the first and last period may be partial
+        :rtype: tuple
+        """
+        return resample_counts(self.get_days(), self.counts, period=period)
+
+    def get_counts_per_year(self):
+        """
+        Sums counts by year
+
+        :return: (years, total count for each year)
+        :rtype: tuple
+        """
+        period_starts, totals = self.resample('year')
+        return (period_starts.astype('datetime64[Y]').astype(np.int64) + 1970,
+                totals)
+
+    def rolling_sum(self, window=7):
+        """
+        Sum of each day and the **window** - 1 days before it,
+        computed from a cumulative sum so the cost does not depend
+        on **window**
+
+        :param window: number of days to sum over
+        :type window: int
+        :return: sum for each day, days with fewer than **window**
+                 days of history are ``NaN``
+        :rtype: :py:class:`numpy.ndarray`
+        """
+        sums = np.full(len(self.counts), np.nan)
+        if window < 1 or len(self.counts) < window:
+            return sums
+        cumulative = np.concatenate(([0], np.cumsum(self.counts)))
+        sums[window - 1:] = cumulative[window:] - cumulative[:-window]
+        return sums
+
+    def rolling_mean(self, window=7):
+        """
+        Mean of each day and the **window** - 1 days before it,
+        see :py:meth:`rolling_sum`
+
+        :param window: number of days to average over
+        :type window: int
+        :return: mean for each day, days with fewer than **window**
+                 days of history are ``NaN``
+        :rtype: :py:class:`numpy.ndarray`
+        """
+        return self.rolling_sum(window=window) / max(window, 1)
+
+    def get_year_start_positions(self):
+        """
+        Finds the indexes of 01/Jan of each year, used to place
+        year ticks on plots
+
+        :return: (indexes into counts, year at each index)
+        :rtype: tuple
+        """
+        return get_year_ticks(self.get_days())
+
+    def get_date_label(self, index, day_format=ACCESS_LOG_DAY):
+        """
+        :param index: index into counts, negative values count from the end
+        :type index: int
+        :param day_format: :py:const:`ACCESS_LOG_DAY` or :py:const:`ISO_DAY`
+        :type day_format: str
+        :return: day at **index**, ie ``03/Apr/2022``
+        :rtype: str
+        """
+        if index < 0:
+            index += len(self.counts)
+        return format_day(self.first_ordinal + index, day_format=day_format)
+
+    def get_date_labels(self, day_format=ACCESS_LOG_DAY):
+        """
+        :param day_format: :py:const:`ACCESS_LOG_DAY` or :py:const:`ISO_DAY`
+        :type day_format: str
+        :return: every day, ie ``03/Apr/2022``
+        :rtype: list
+        """
+        days = self.get_days()
+        if day_format == ISO_DAY:
+            return np.datetime_as_string(days, unit='D').tolist()
+        months = days.astype('datetime64[M]')
+        years = self.get_years().tolist()
+        month_numbers = (months - days.astype('datetime64[Y]')).astype(np.int64) + 1
+        day_numbers = (days - months).astype(np.int64) + 1
+        return ['{:02d}/{}/{:04d}'.format(day_num, MONTH_NAMES[month_num], year)
+                for day_num, month_num, year in zip(day_numbers.tolist(),
+                                                    month_numbers.tolist(),
+                                                    years)]
+
+
+class DailyCountsTable(object):
+    """
+    Counts for each day of many named series, ie downloads of each
+    app, held in a 2 dimensional numpy array with one row per series
+    and one column per day. Column ``i`` is the day whose proleptic
+    Gregorian ordinal is ``first_ordinal + i`` and, as with
+    :py:class:`DailyCounts`, days without entries are zero so every
+    series covers the same days and totals, resampling and growth
+    are computed for all series at once
+    """
+    def __init__(self, names=None, first_ordinal=EPOCH_ORDINAL,
+                 counts=None):
+        """
+        Constructor
+
+        :param names: name of each series, one per row of **counts**
+        :type names: list
+        :param first_ordinal: ordinal of day in column 0 of **counts**
+        :type first_ordinal: int
+        :param counts: count for each series and day
+        :type counts: :py:class:`numpy.ndarray`
+        """
+        if names is None:
+            names = []
+        self.names = names
+        self.first_ordinal = first_ordinal
+        if counts is None:
+            counts = np.zeros((len(names), 0), dtype=np.int64)
+        self.counts = counts
+
+    @staticmethod
+    def from_series(names, series):
+        """
+        Creates :py:class:`DailyCountsTable` from one
+        :py:class:`DailyCounts` per name. Series are zero filled
+        to cover the first to last day of any series
+
+        :param names: name of each series
+        :type names: list
+        :param series: counts for each day of each series
+        :type series: list
+        :return: counts for every series
+        :rtype: :py:class:`DailyCountsTable`
+        """
+        non_empty = [daily_counts for daily_counts in series
+                     if len(daily_counts) > 0]
+        if len(non_empty) == 0:
+            return DailyCountsTable(names=names)
+        first_ordinal = min(daily_counts.first_ordinal
+                            for daily_counts in non_empty)
+        last_ordinal = max(daily_counts.get_last_ordinal()
+                           for daily_counts in non_empty)
+        counts = np.zeros((len(names), last_ordinal - first_ordinal + 1),
+                          dtype=np.int64)
+        for row, daily_counts in zip(counts, series):
+            start = daily_counts.first_ordinal - first_ordinal
+            row[start:start + len(daily_counts)] = daily_counts.counts
+        return DailyCountsTable(names=names, first_ordinal=first_ordinal,
+                                counts=counts)
+
+    def __len__(self):
+        """
+        :return: number of series
+        :rtype: int
+        """
+        return len(self.names)
+
+    def get_days(self):
+        """
+        :return: each day from first to last day
+        :rtype: :py:class:`numpy.ndarray` of ``datetime64[D]``
+        """
+        return (np.arange(self.counts.shape[1], dtype=np.int64) +
+                (self.first_ordinal - EPOCH_ORDINAL)).astype('datetime64[D]')
+
+    def get_series(self, index):
+        """
+        :param index: row of series
+        :type index: int
+        :return: counts for each day of one series
+        :rtype: :py:class:`DailyCounts`
+        """
+        return DailyCounts(first_ordinal=self.first_ordinal,
+                           counts=self.counts[index])
+
+    def get_totals(self):
+        """
+        :return: sum of counts of each series
+        :rtype: :py:class:`numpy.ndarray`
+        """
+        return self.counts.sum(axis=1)
+
+    def resample(self, period='month'):
+        """
+        Sums counts of every series by **period**
+
+        :param period: one of :py:const:`RESAMPLE_PERIODS`
+        :type period: str
+        :raises ValueError: if **period** is not supported
+        :return: (first day of each period, 2 dimensional array of
+                  total for each series and period)
+        :rtype: tuple
+        """
+        return resample_counts(self.get_days(), self.counts, period=period)
+
+    def get_growth(self, window=365):
+        """
+        Compares the total of each series over the last **window**
+        days with the **window** days before that
+
+        :param window: number of days in each of the two periods
+        :type window: int
+        :return: (totals over last **window** days, totals over the
+                  **window** days before, growth as
+                  ``(last - before) / before`` which is ``NaN``
+                  where the earlier total is 0)
+        :rtype: tuple
+        """
+        middle = max(self.counts.shape[1] - window, 0)
+        start = max(self.counts.shape[1] - 2 * window, 0)
+        recent = self.counts[:, middle:].sum(axis=1)
+        previous = self.counts[:, start:middle].sum(axis=1)
+        growth = np.full(len(self.names), np.nan)
+        np.divide(recent - previous, previous, out=growth,
+                  where=previous > 0)
+        return recent, previous, growth